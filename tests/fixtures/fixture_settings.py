@@ -0,0 +1,16 @@
+import shutil
+import tempfile
+
+from core.testing import isolated_settings
+
+
+def pytest_configure(config):
+    # раньше сбора тестов: сбор трогает cache, импортированный в модули
+    config.isolated_directory = tempfile.mkdtemp()
+    config.isolated_settings = isolated_settings(config.isolated_directory)
+    config.isolated_settings.enable()
+
+
+def pytest_unconfigure(config):
+    config.isolated_settings.disable()
+    shutil.rmtree(config.isolated_directory, ignore_errors=True)
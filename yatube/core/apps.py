@@ -3,3 +3,12 @@ from django.apps import AppConfig
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from django.db.backends.signals import (  # type: ignore
+            connection_created
+        )
+
+        from .metrics import install_sql_timer
+
+        connection_created.connect(install_sql_timer)
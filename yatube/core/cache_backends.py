@@ -0,0 +1,321 @@
+"""Двухуровневый кэш: LRU в памяти процесса поверх общего SQLite.
+
+Второй уровень (L2) - файл SQLite, общий для всех воркеров на одной
+машине. Первый уровень (L1) - ограниченный LRU внутри процесса.
+
+Согласованность L1 держится на файле версий, отображённом в память
+(mmap): ключ попадает в один из слотов, и каждая запись в L2 сдвигает
+счётчик слота. Запись L1 помнит версию слота на момент чтения и
+отбрасывается, как только версия в общем файле ушла вперёд. Проверка
+версии - чтение восьми байт из памяти, без обращения к SQLite.
+"""
+import fcntl
+import mmap
+import os
+import pickle
+import random
+import sqlite3
+import struct
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+from django.core.cache.backends.base import (  # type: ignore
+    DEFAULT_TIMEOUT,
+    BaseCache
+)
+
+from . import metrics
+
+SLOT_FORMAT = '<Q'
+SLOT_SIZE = struct.calcsize(SLOT_FORMAT)
+# доля записей, после которых L2 чистится от просроченных ключей
+CULL_PROBABILITY = 0.01
+# предел переменных в одном запросе SQLite
+MAX_VARIABLES = 500
+
+
+class SlotVersions:
+    """Счётчики версий слотов в общем файле, отображённом в память."""
+
+    def __init__(self, path, slots):
+        self.slots = slots
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        size = slots * SLOT_SIZE
+        fcntl.flock(self.fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(self.fd).st_size < size:
+                os.ftruncate(self.fd, size)
+        finally:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+        self.map = mmap.mmap(self.fd, size)
+
+    def slot(self, key):
+        return zlib.crc32(key.encode()) % self.slots
+
+    def get(self, slot):
+        return struct.unpack_from(SLOT_FORMAT, self.map, slot * SLOT_SIZE)[0]
+
+    def bump(self, *slots):
+        fcntl.flock(self.fd, fcntl.LOCK_EX)
+        try:
+            for slot in slots:
+                struct.pack_into(
+                    SLOT_FORMAT, self.map, slot * SLOT_SIZE,
+                    self.get(slot) + 1
+                )
+        finally:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+
+    def bump_all(self):
+        self.bump(*range(self.slots))
+
+
+class TieredCache(BaseCache):
+    """Кэш Django: LRU процесса (L1) перед общим SQLite (L2).
+
+    LOCATION - путь к файлу SQLite. OPTIONS, кроме стандартных:
+    L1_MAX_ENTRIES - размер LRU в процессе (по умолчанию 1000),
+    SLOTS - число слотов версий (по умолчанию 4096).
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.path = location
+        directory = os.path.dirname(location)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.l1_max_entries = int(options.get('L1_MAX_ENTRIES', 1000))
+        self.versions = SlotVersions(
+            f'{location}.versions', int(options.get('SLOTS', 4096))
+        )
+        self._l1 = OrderedDict()
+        self._l1_lock = threading.Lock()
+        self._local = threading.local()
+        self._create_table()
+
+    # L2: SQLite
+
+    @property
+    def _db(self):
+        db = getattr(self._local, 'db', None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(
+                self.path, timeout=30, isolation_level=None,
+                check_same_thread=False
+            )
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            self._local.db = db
+            self._local.pid = os.getpid()
+        return db
+
+    def _create_table(self):
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS cache ('
+            'key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL)'
+        )
+        self._db.execute(
+            'CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)'
+        )
+
+    def _expiry(self, timeout):
+        # абсолютное время истечения или None для вечного ключа
+        return self.get_backend_timeout(timeout)
+
+    def _cull(self):
+        if random.random() > CULL_PROBABILITY:
+            return
+        db = self._db
+        db.execute('DELETE FROM cache WHERE expires < ?', (time.time(),))
+        (count,) = db.execute('SELECT COUNT(*) FROM cache').fetchone()
+        if count > self._max_entries:
+            culled = db.execute(
+                'DELETE FROM cache WHERE key IN (SELECT key FROM cache '
+                'ORDER BY expires IS NULL, expires LIMIT ?) RETURNING key',
+                (count // self._cull_frequency,)
+            ).fetchall()
+            # иначе другие воркеры продолжат отдавать их из своего L1;
+            # просроченные ключи L1 отбрасывает и сам
+            self.versions.bump(
+                *{self.versions.slot(key) for (key,) in culled}
+            )
+
+    # L1: LRU процесса
+
+    def _l1_get(self, key):
+        with self._l1_lock:
+            entry = self._l1.get(key)
+            if entry is None:
+                return None
+            value, expires, version = entry
+            if version != self.versions.get(self.versions.slot(key)) or (
+                expires is not None and expires < time.time()
+            ):
+                del self._l1[key]
+                return None
+            self._l1.move_to_end(key)
+            return value
+
+    def _l1_set(self, key, value, expires, version):
+        with self._l1_lock:
+            self._l1[key] = (value, expires, version)
+            self._l1.move_to_end(key)
+            while len(self._l1) > self.l1_max_entries:
+                self._l1.popitem(last=False)
+
+    def _l1_drop(self, key):
+        with self._l1_lock:
+            self._l1.pop(key, None)
+
+    # API кэша Django
+
+    def _read(self, keys):
+        """Читает ключи из L1, недостающие - одним запросом из L2."""
+        found = {}
+        missing = []
+        for key in keys:
+            value = self._l1_get(key)
+            if value is None:
+                missing.append(key)
+            else:
+                found[key] = value
+        if missing:
+            versions = {
+                key: self.versions.get(self.versions.slot(key))
+                for key in missing
+            }
+            now = time.time()
+            rows = []
+            for start in range(0, len(missing), MAX_VARIABLES):
+                chunk = missing[start:start + MAX_VARIABLES]
+                placeholders = ', '.join('?' * len(chunk))
+                rows += self._db.execute(
+                    f'SELECT key, value, expires FROM cache '
+                    f'WHERE key IN ({placeholders})',
+                    chunk
+                ).fetchall()
+            for key, value, expires in rows:
+                if expires is not None and expires < now:
+                    continue
+                found[key] = value
+                self._l1_set(key, value, expires, versions[key])
+        metrics.record_cache(len(found), len(keys) - len(found))
+        return {key: pickle.loads(value) for key, value in found.items()}
+
+    def _write(self, key, value, timeout, only_new=False):
+        expires = self._expiry(timeout)
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        db = self._db
+        if only_new:
+            db.execute('BEGIN IMMEDIATE')
+            try:
+                row = db.execute(
+                    'SELECT expires FROM cache WHERE key = ?', (key,)
+                ).fetchone()
+                if row is not None and (
+                    row[0] is None or row[0] >= time.time()
+                ):
+                    db.execute('COMMIT')
+                    return False
+                db.execute(
+                    'INSERT OR REPLACE INTO cache VALUES (?, ?, ?)',
+                    (key, data, expires)
+                )
+                db.execute('COMMIT')
+            except BaseException:
+                db.execute('ROLLBACK')
+                raise
+        else:
+            db.execute(
+                'INSERT OR REPLACE INTO cache VALUES (?, ?, ?)',
+                (key, data, expires)
+            )
+        self._l1_drop(key)
+        self.versions.bump(self.versions.slot(key))
+        self._cull()
+        return True
+
+    def get(self, key, default=None, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return self._read([key]).get(key, default)
+
+    def get_many(self, keys, version=None):
+        made = {self.make_key(key, version=version): key for key in keys}
+        for key in made:
+            self.validate_key(key)
+        return {
+            made[key]: value
+            for key, value in self._read(list(made)).items()
+        }
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        self._write(key, value, timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return self._write(key, value, timeout, only_new=True)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        cursor = self._db.execute(
+            'UPDATE cache SET expires = ? WHERE key = ?',
+            (self._expiry(timeout), key)
+        )
+        self._l1_drop(key)
+        self.versions.bump(self.versions.slot(key))
+        return cursor.rowcount > 0
+
+    def delete(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        self._db.execute('DELETE FROM cache WHERE key = ?', (key,))
+        self._l1_drop(key)
+        self.versions.bump(self.versions.slot(key))
+
+    def has_key(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key in self._read([key])
+
+    def incr(self, key, delta=1, version=None):
+        """Атомарно для всех процессов: чтение и запись в одной транзакции."""
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        db = self._db
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            row = db.execute(
+                'SELECT value, expires FROM cache WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None or (row[1] is not None and row[1] < time.time()):
+                raise ValueError(f"Key '{key}' not found")
+            value = pickle.loads(row[0]) + delta
+            db.execute(
+                'UPDATE cache SET value = ? WHERE key = ?',
+                (pickle.dumps(value, pickle.HIGHEST_PROTOCOL), key)
+            )
+            db.execute('COMMIT')
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        self._l1_drop(key)
+        self.versions.bump(self.versions.slot(key))
+        return value
+
+    def clear(self):
+        self._db.execute('DELETE FROM cache')
+        with self._l1_lock:
+            self._l1.clear()
+        self.versions.bump_all()
+
+    def close(self, **kwargs):
+        # соединение с SQLite переиспользуется между запросами потока
+        pass
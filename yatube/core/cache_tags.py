@@ -0,0 +1,58 @@
+import time
+from datetime import datetime, timezone
+
+from django.core.cache import cache  # type: ignore
+
+
+def _key(tag):
+    return f'cache-tag:{tag}'
+
+
+def _modified_key(tag):
+    return f'cache-tag-modified:{tag}'
+
+
+def tag_versions(tags):
+    """Строка из текущих версий тегов для ключа фрагмента кэша.
+
+    Пропавшая версия заводится заново из текущего времени, чтобы
+    не совпасть ни с одной из версий, под которыми уже лежат фрагменты.
+    """
+    keys = [_key(tag) for tag in tags]
+    versions = cache.get_many(keys)
+    missing = {
+        key: time.time_ns() for key in keys if key not in versions
+    }
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return '.'.join(str(versions[key]) for key in keys)
+
+
+def tags_modified(tags):
+    """Время последнего изменения по любому из тегов.
+
+    Если отметки нет, она ставится на текущий момент: это не раньше
+    настоящего изменения, потому что каждое изменение её обновляет.
+    """
+    keys = [_modified_key(tag) for tag in tags]
+    stamps = cache.get_many(keys)
+    now = time.time()
+    missing = {key: now for key in keys if key not in stamps}
+    if missing:
+        cache.set_many(missing, None)
+        stamps.update(missing)
+    return datetime.fromtimestamp(max(stamps.values()), tz=timezone.utc)
+
+
+def invalidate(*tags):
+    """Сдвигает версии тегов: все помеченные ими фрагменты устаревают."""
+    for tag in tags:
+        try:
+            cache.incr(_key(tag))
+        except ValueError:
+            # версию вытеснили из кэша: новая из текущего времени не
+            # совпадёт ни с одной из прежних
+            cache.set(_key(tag), time.time_ns(), None)
+    now = time.time()
+    cache.set_many({_modified_key(tag): now for tag in tags}, None)
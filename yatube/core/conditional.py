@@ -0,0 +1,91 @@
+import hashlib
+import threading
+from collections import Counter
+from functools import wraps
+
+from django.conf import settings  # type: ignore
+from django.views.decorators.http import condition  # type: ignore
+
+from .cache_tags import tag_versions, tags_modified
+
+
+# счётчики процесса: запись в общий кэш на каждый GET стоила бы
+# блокировки SQLite; сумму по воркерам отдаёт /metrics/ (code="304")
+_requests = Counter()
+_not_modified = Counter()
+_stats_lock = threading.Lock()
+
+
+def _record(view_name, not_modified):
+    """Считает запросы и ответы 304 по каждой странице."""
+    with _stats_lock:
+        _requests[view_name] += 1
+        if not_modified:
+            _not_modified[view_name] += 1
+
+
+def conditional_stats(view_names):
+    """Число запросов и ответов 304 по страницам в этом процессе."""
+    with _stats_lock:
+        return {
+            name: (_requests[name], _not_modified[name])
+            for name in view_names
+        }
+
+
+def _get_tags(tags_func, request, *args, **kwargs):
+    if not hasattr(request, '_condition_tags'):
+        request._condition_tags = tags_func(request, *args, **kwargs)
+    return request._condition_tags
+
+
+def _etag(tags_func):
+    def etag(request, *args, **kwargs):
+        tags = _get_tags(tags_func, request, *args, **kwargs)
+        if tags is None:
+            return None
+        seed = '|'.join((
+            tag_versions(tags),
+            str(request.user.pk),
+            request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+        ))
+        return hashlib.md5(seed.encode()).hexdigest()
+    return etag
+
+
+def _last_modified(tags_func):
+    def last_modified(request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return None
+        tags = _get_tags(tags_func, request, *args, **kwargs)
+        if tags is None:
+            return None
+        return tags_modified(tags)
+    return last_modified
+
+
+def tagged_condition(tags_func):
+    """Отвечает 304, пока не изменились теги, которыми помечена страница.
+
+    tags_func(request, *args, **kwargs) возвращает список тегов
+    core.cache_tags или None, если страницу нужно построить заново.
+    ETag зависит от пользователя и его CSRF-cookie, потому что они
+    попадают в разметку. Last-Modified отдаётся только анонимам.
+    """
+
+    def decorator(view):
+        conditional_view = condition(
+            etag_func=_etag(tags_func),
+            last_modified_func=_last_modified(tags_func)
+        )(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            if request.method in ('GET', 'HEAD'):
+                _record(view.__name__, response.status_code == 304)
+            return response
+
+        return wrapper
+
+    return decorator
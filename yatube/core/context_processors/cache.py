@@ -0,0 +1,8 @@
+from django.conf import settings  # type: ignore
+
+
+def fragment_cache(request):
+    """Добавляет время жизни фрагментов кэша, помеченных тегами."""
+    return {
+        'fragment_timeout': settings.FRAGMENT_CACHE_TIMEOUT
+    }
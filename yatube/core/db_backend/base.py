@@ -0,0 +1,60 @@
+"""SQLite для нескольких воркеров: WAL, busy timeout и соединения на чтение.
+
+Настройки соединения (PRAGMA) применяются при каждом подключении,
+поэтому действуют и после перезапуска процесса. OPTIONS, кроме
+параметров sqlite3.connect():
+pragmas - словарь PRAGMA поверх PRAGMAS,
+read_only - открыть файл только на чтение (mode=ro и query_only).
+
+В WAL читатели не ждут писателя, а писатели встают в очередь по
+busy timeout. Транзакции пишущего соединения начинаются с BEGIN
+IMMEDIATE: отложенная транзакция, которая сначала читает, а потом
+пишет, получает «database is locked» сразу, без ожидания.
+"""
+from urllib.request import pathname2url
+
+from django.db.backends.sqlite3 import base  # type: ignore
+
+PRAGMAS = {
+    'journal_mode': 'WAL',
+    # в WAL NORMAL не теряет целостность, только последние коммиты
+    # при отключении питания
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    # отрицательное значение - в килобайтах: 64 МБ на соединение
+    'cache_size': -64 * 1024,
+    'temp_store': 'MEMORY',
+}
+# секунды ожидания блокировки, если в OPTIONS не задано timeout
+BUSY_TIMEOUT = 20
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.setdefault('timeout', BUSY_TIMEOUT)
+        self.read_only = params.pop('read_only', False)
+        self.pragmas = {**PRAGMAS, **params.pop('pragmas', {})}
+        if self.read_only and not params['database'].startswith('file:'):
+            params['database'] = (
+                f'file:{pathname2url(params["database"])}?mode=ro'
+            )
+        return params
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        pragmas = dict(self.pragmas)
+        if self.read_only:
+            # режим журнала хранится в файле, его задаёт пишущее соединение
+            pragmas.pop('journal_mode', None)
+            pragmas['query_only'] = 'ON'
+        for name, value in pragmas.items():
+            connection.execute(f'PRAGMA {name} = {value}')
+        return connection
+
+    def _start_transaction_under_autocommit(self):
+        if self.read_only:
+            super()._start_transaction_under_autocommit()
+        else:
+            self.cursor().execute('BEGIN IMMEDIATE')
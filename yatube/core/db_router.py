@@ -0,0 +1,33 @@
+"""Роутер: чтение - через соединение только на чтение, запись - в default.
+
+Обе базы - один файл SQLite, поэтому отставания реплики нет: читатель
+видит всё, что уже закоммичено. Внутри транзакции на default чтение
+остаётся на ней, чтобы видеть собственные незакоммиченные записи.
+Если соединение на чтение не открыто как read_only или база в памяти
+(тесты: отдельное соединение не видит транзакцию теста), чтение тоже
+идёт в default.
+"""
+from django.db import DEFAULT_DB_ALIAS, connections  # type: ignore
+
+READ_ALIAS = 'replica'
+
+
+class ReadReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        default = connections[DEFAULT_DB_ALIAS]
+        if default.in_atomic_block or default.is_in_memory_db():
+            return DEFAULT_DB_ALIAS
+        options = connections[READ_ALIAS].settings_dict.get('OPTIONS', {})
+        if not options.get('read_only'):
+            return DEFAULT_DB_ALIAS
+        return READ_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,180 @@
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand  # type: ignore
+from django.db import OperationalError, connections  # type: ignore
+from django.db import transaction  # type: ignore
+
+SCHEMA = (
+    'CREATE TABLE bench_post (id INTEGER PRIMARY KEY, '
+    'author_id INTEGER NOT NULL, text TEXT NOT NULL, pub_date REAL)',
+    'CREATE INDEX bench_post_author ON bench_post (author_id, id)',
+    'CREATE TABLE bench_stats (author_id INTEGER PRIMARY KEY, '
+    'posts_count INTEGER NOT NULL)',
+)
+AUTHORS = 100
+# конфигурации: (пишущее соединение, читающее соединение)
+CONFIGS = {
+    'before': (
+        {'ENGINE': 'django.db.backends.sqlite3'},
+        None,
+    ),
+    'after': (
+        {'ENGINE': 'core.db_backend'},
+        {'ENGINE': 'core.db_backend', 'OPTIONS': {'read_only': True}},
+    ),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность SQLite на чтение и запись при '
+        'параллельных потоках: стандартный бэкенд против core.db_backend '
+        '(WAL, PRAGMA, BEGIN IMMEDIATE, соединение на чтение). Работает '
+        'на временном файле, рабочая база не затрагивается.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--readers',
+            type=int,
+            default=8,
+            help='Сколько потоков читают.'
+        )
+        parser.add_argument(
+            '--writers',
+            type=int,
+            default=4,
+            help='Сколько потоков пишут.'
+        )
+        parser.add_argument(
+            '--seconds',
+            type=float,
+            default=5,
+            help='Сколько длится каждый прогон.'
+        )
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=10000,
+            help='Сколько записей в таблице до начала прогона.'
+        )
+
+    def seed(self, alias, rows):
+        connection = connections[alias]
+        with transaction.atomic(using=alias), connection.cursor() as cursor:
+            for statement in SCHEMA:
+                cursor.execute(statement)
+            cursor.executemany(
+                'INSERT INTO bench_stats VALUES (%s, %s)',
+                [(author, 0) for author in range(AUTHORS)]
+            )
+            cursor.executemany(
+                'INSERT INTO bench_post (author_id, text, pub_date) '
+                'VALUES (%s, %s, %s)',
+                [
+                    (number % AUTHORS, f'Запись {number}', time.time())
+                    for number in range(rows)
+                ]
+            )
+
+    def write(self, alias):
+        # как post_create: прочитать счётчик, вставить запись, сдвинуть
+        author = random.randrange(AUTHORS)
+        with transaction.atomic(using=alias):
+            with connections[alias].cursor() as cursor:
+                cursor.execute(
+                    'SELECT posts_count FROM bench_stats '
+                    'WHERE author_id = %s', [author]
+                )
+                cursor.fetchone()
+                cursor.execute(
+                    'INSERT INTO bench_post (author_id, text, pub_date) '
+                    'VALUES (%s, %s, %s)', [author, 'Новая', time.time()]
+                )
+                cursor.execute(
+                    'UPDATE bench_stats SET posts_count = posts_count + 1 '
+                    'WHERE author_id = %s', [author]
+                )
+
+    def read(self, alias):
+        # как страница профиля: последние записи автора и счётчик
+        with connections[alias].cursor() as cursor:
+            cursor.execute(
+                'SELECT p.id, p.text, s.posts_count FROM bench_post p '
+                'JOIN bench_stats s ON s.author_id = p.author_id '
+                'WHERE p.author_id = %s ORDER BY p.id DESC LIMIT 10',
+                [random.randrange(AUTHORS)]
+            )
+            cursor.fetchall()
+
+    def worker(self, operation, alias, deadline, totals, key):
+        done = locked = 0
+        try:
+            while time.monotonic() < deadline:
+                try:
+                    operation(alias)
+                    done += 1
+                except OperationalError:
+                    locked += 1
+        finally:
+            connections[alias].close()
+        with self.lock:
+            totals[key] += done
+            totals['locked'] += locked
+
+    def run(self, name, path, options):
+        write_settings, read_settings = CONFIGS[name]
+        write_alias = f'benchmark_{name}_write'
+        read_alias = f'benchmark_{name}_read'
+        connections.databases[write_alias] = {**write_settings, 'NAME': path}
+        connections.databases[read_alias] = {
+            **(read_settings or write_settings), 'NAME': path
+        }
+        try:
+            self.seed(write_alias, options['rows'])
+            connections[write_alias].close()
+            totals = {'reads': 0, 'writes': 0, 'locked': 0}
+            deadline = time.monotonic() + options['seconds']
+            threads = [
+                threading.Thread(
+                    target=self.worker,
+                    args=(self.write, write_alias, deadline, totals, 'writes')
+                )
+                for _ in range(options['writers'])
+            ] + [
+                threading.Thread(
+                    target=self.worker,
+                    args=(self.read, read_alias, deadline, totals, 'reads')
+                )
+                for _ in range(options['readers'])
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            del connections.databases[write_alias]
+            del connections.databases[read_alias]
+        return totals
+
+    def handle(self, *args, **options):
+        self.lock = threading.Lock()
+        seconds = options['seconds']
+        directory = tempfile.mkdtemp()
+        try:
+            self.stdout.write('config\treads/s\twrites/s\tlocked')
+            for name in CONFIGS:
+                totals = self.run(
+                    name, os.path.join(directory, f'{name}.sqlite3'), options
+                )
+                self.stdout.write(
+                    f'{name}\t{totals["reads"] / seconds:.0f}\t'
+                    f'{totals["writes"] / seconds:.0f}\t{totals["locked"]}'
+                )
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
@@ -0,0 +1,289 @@
+"""Метрики запросов по вьюхам в формате Prometheus.
+
+На горячем пути запрос только складывает числа в словарь процесса:
+время ответа, число и время SQL, время рендера шаблонов, попадания и
+промахи кэша. Раз в METRICS_FLUSH_INTERVAL секунд накопленное
+прибавляется к общему файлу SQLite одной транзакцией, поэтому метрики
+всех воркеров суммируются в одном месте, а при перезапуске воркера
+теряется не больше одного интервала.
+
+Хранятся приращения бакетов гистограммы, а не накопленные значения:
+сумма по бакетам собирается уже при отдаче /metrics/.
+"""
+import math
+import os
+import sqlite3
+import threading
+import time
+
+from django.conf import settings  # type: ignore
+
+# метрики текущего запроса в этом потоке
+_local = threading.local()
+
+METRICS = {
+    'requests': (
+        'yatube_requests_total', 'counter',
+        'Ответы по вьюхам и кодам статуса.'
+    ),
+    'duration': (
+        'yatube_request_duration_seconds', 'histogram',
+        'Время ответа по вьюхам.'
+    ),
+    'sql_queries': (
+        'yatube_sql_queries_total', 'counter',
+        'SQL-запросы по вьюхам.'
+    ),
+    'sql_seconds': (
+        'yatube_sql_seconds_total', 'counter',
+        'Время SQL по вьюхам.'
+    ),
+    'template_seconds': (
+        'yatube_template_render_seconds_total', 'counter',
+        'Время рендера шаблонов по вьюхам.'
+    ),
+    'cache_hits': (
+        'yatube_cache_hits_total', 'counter',
+        'Попадания в кэш по вьюхам.'
+    ),
+    'cache_misses': (
+        'yatube_cache_misses_total', 'counter',
+        'Промахи кэша по вьюхам.'
+    ),
+}
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class RequestMetrics:
+    """Счётчики одного запроса, которые заполняют хуки."""
+
+    __slots__ = (
+        'sql_queries', 'sql_seconds', 'template_seconds',
+        'cache_hits', 'cache_misses'
+    )
+
+    def __init__(self):
+        self.sql_queries = 0
+        self.sql_seconds = 0.0
+        self.template_seconds = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+
+def start_request():
+    _local.current = RequestMetrics()
+    return _local.current
+
+
+def finish_request():
+    current = getattr(_local, 'current', None)
+    _local.current = None
+    return current
+
+
+def current_request():
+    return getattr(_local, 'current', None)
+
+
+def sql_timer(execute, sql, params, many, context):
+    """Обёртка execute_wrapper: время и число запросов к базе."""
+    current = current_request()
+    if current is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        current.sql_queries += 1
+        current.sql_seconds += time.perf_counter() - started
+
+
+def install_sql_timer(sender, connection, **kwargs):
+    """Ставит sql_timer на каждое новое соединение с базой."""
+    if sql_timer not in connection.execute_wrappers:
+        connection.execute_wrappers.append(sql_timer)
+
+
+def record_cache(hits, misses):
+    current = current_request()
+    if current is not None:
+        current.cache_hits += hits
+        current.cache_misses += misses
+
+
+def record_template(seconds):
+    current = current_request()
+    if current is not None:
+        current.template_seconds += seconds
+
+
+class MetricsStore:
+    """Общий для воркеров файл SQLite с суммами метрик."""
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS metrics ('
+            'name TEXT NOT NULL, view TEXT NOT NULL, label TEXT NOT NULL, '
+            'value REAL NOT NULL, PRIMARY KEY (name, view, label))'
+        )
+
+    @property
+    def _db(self):
+        db = getattr(self._local, 'db', None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(
+                self.path, timeout=30, isolation_level=None,
+                check_same_thread=False
+            )
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            self._local.db = db
+            self._local.pid = os.getpid()
+        return db
+
+    def add(self, rows):
+        """Прибавляет строки (метрика, вьюха, метка, приращение)."""
+        db = self._db
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            db.executemany(
+                'INSERT INTO metrics VALUES (?, ?, ?, ?) '
+                'ON CONFLICT (name, view, label) '
+                'DO UPDATE SET value = value + excluded.value',
+                rows
+            )
+            db.execute('COMMIT')
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+
+    def rows(self):
+        return self._db.execute(
+            'SELECT name, view, label, value FROM metrics '
+            'ORDER BY name, view, label'
+        ).fetchall()
+
+    def clear(self):
+        self._db.execute('DELETE FROM metrics')
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def store():
+    path = settings.METRICS_DB
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = MetricsStore(path)
+        return _stores[path]
+
+
+def bucket_label(bound):
+    return '+Inf' if bound == math.inf else repr(float(bound))
+
+
+class Collector:
+    """Суммы метрик процесса до следующей записи в общий файл."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.flushed = time.monotonic()
+
+    def _add(self, key, value):
+        self.pending[key] = self.pending.get(key, 0) + value
+
+    def add(self, view, status, duration, metrics):
+        bounds = settings.METRICS_BUCKETS
+        bound = next(
+            (bound for bound in bounds if duration <= bound), math.inf
+        )
+        with self.lock:
+            self._add(('requests', view, str(status)), 1)
+            self._add(('duration_bucket', view, bucket_label(bound)), 1)
+            self._add(('duration_sum', view, ''), duration)
+            for name in RequestMetrics.__slots__:
+                value = getattr(metrics, name)
+                if value:
+                    self._add((name, view, ''), value)
+
+    def flush(self, force=False):
+        now = time.monotonic()
+        with self.lock:
+            if not self.pending or not force and (
+                now - self.flushed < settings.METRICS_FLUSH_INTERVAL
+            ):
+                return
+            pending, self.pending = self.pending, {}
+            self.flushed = now
+        store().add(
+            [(name, view, label, value)
+             for (name, view, label), value in pending.items()]
+        )
+
+
+collector = Collector()
+
+
+def _escape(value):
+    return (
+        value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    )
+
+
+def _number(value):
+    # большие счётчики в формате :g ушли бы в экспоненту с потерей точности
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def _histogram(name, rows):
+    """Строки гистограммы: накопленные бакеты, сумма и число."""
+    views = {}
+    for metric, view, label, value in rows:
+        views.setdefault(view, {'buckets': {}, 'sum': 0})
+        if metric == 'duration_bucket':
+            views[view]['buckets'][label] = value
+        else:
+            views[view]['sum'] = value
+    bounds = [bucket_label(bound) for bound in settings.METRICS_BUCKETS]
+    bounds.append('+Inf')
+    lines = []
+    for view, data in sorted(views.items()):
+        view = _escape(view)
+        total = 0
+        for label in bounds:
+            total += data['buckets'].get(label, 0)
+            lines.append(
+                f'{name}_bucket{{view="{view}",le="{label}"}} '
+                f'{_number(total)}'
+            )
+        lines.append(f'{name}_sum{{view="{view}"}} {_number(data["sum"])}')
+        lines.append(f'{name}_count{{view="{view}"}} {_number(total)}')
+    return lines
+
+
+def render(rows):
+    """Текст в формате Prometheus из строк MetricsStore.rows()."""
+    grouped = {}
+    for row in rows:
+        key = 'duration' if row[0].startswith('duration_') else row[0]
+        grouped.setdefault(key, []).append(row)
+    lines = []
+    for key, (name, kind, help_text) in METRICS.items():
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+        if key == 'duration':
+            lines += _histogram(name, grouped.get(key, []))
+            continue
+        for _, view, label, value in grouped.get(key, []):
+            labels = f'view="{_escape(view)}"'
+            if key == 'requests':
+                labels += f',code="{label}"'
+            lines.append(f'{name}{{{labels}}} {_number(value)}')
+    return '\n'.join(lines) + '\n'
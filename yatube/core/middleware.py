@@ -0,0 +1,30 @@
+import time
+
+from . import metrics
+
+# для неразрешённых адресов: случайные пути не плодят серии
+UNRESOLVED = 'unresolved'
+
+
+class MetricsMiddleware:
+    """Собирает метрики запроса по имени вьюхи (core.metrics).
+
+    Стоит первым в MIDDLEWARE, чтобы время включало остальные слои.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        current = metrics.start_request()
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.finish_request()
+        duration = time.perf_counter() - started
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match is not None else UNRESOLVED
+        metrics.collector.add(view, response.status_code, duration, current)
+        metrics.collector.flush()
+        return response
@@ -0,0 +1,80 @@
+"""Временная база SQLite со схемой рабочей для команд с замерами.
+
+Команды, которые наполняют базу данными ради замеров, пишут их в
+пустую копию схемы во временном файле: рабочая база не блокируется на
+запись и не засоряется.
+"""
+import os
+import shutil
+import sqlite3
+import tempfile
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections  # type: ignore
+from django.db.utils import load_backend  # type: ignore
+
+# порядок схемы: сначала таблицы, потом индексы и триггеры
+SCHEMA_SQL = (
+    "SELECT name, sql FROM sqlite_master "
+    "WHERE sql IS NOT NULL AND name NOT LIKE 'sqlite_%' "
+    "ORDER BY type != 'table', type != 'index', rowid"
+)
+
+
+def copy_schema(source, path):
+    """Пустая база в файле path со схемой базы source.
+
+    Схема читается через соединение source, поэтому видны и его
+    незакоммиченные изменения. Теневые таблицы FTS5 создаёт сама
+    виртуальная таблица, их CREATE пропускается.
+    """
+    with source.cursor() as cursor:
+        cursor.execute(SCHEMA_SQL)
+        schema = cursor.fetchall()
+    target = sqlite3.connect(path, isolation_level=None)
+    try:
+        for name, sql in schema:
+            exists = target.execute(
+                'SELECT 1 FROM sqlite_master WHERE name = ?', (name,)
+            ).fetchone()
+            if not exists:
+                target.execute(sql)
+    finally:
+        target.close()
+
+
+@contextmanager
+def scratch_database(path):
+    """Все соединения Django на время блока смотрят в файл path.
+
+    Настройки у всех - как у default, без read_only: роутер тогда
+    оставляет чтение в default, и запросы к connection видны целиком.
+    """
+    saved = {alias: connections[alias] for alias in connections.databases}
+    settings_dict = {
+        **connections.databases[DEFAULT_DB_ALIAS], 'NAME': path
+    }
+    backend = load_backend(settings_dict['ENGINE'])
+    scratch = {}
+    for alias in saved:
+        scratch[alias] = backend.DatabaseWrapper(dict(settings_dict), alias)
+        connections[alias] = scratch[alias]
+    try:
+        yield
+    finally:
+        for alias, wrapper in saved.items():
+            scratch[alias].close()
+            connections[alias] = wrapper
+
+
+@contextmanager
+def scratch_copy(source):
+    """scratch_database в пустой копии схемы source; файл потом удаляется."""
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, 'scratch.sqlite3')
+        copy_schema(source, path)
+        with scratch_database(path):
+            yield path
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
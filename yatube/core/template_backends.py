@@ -0,0 +1,34 @@
+"""Шаблоны Django, которые сообщают время рендера в core.metrics.
+
+Оборачивается только шаблон верхнего уровня: include и extends
+рендерятся внутри него и в общее время уже входят.
+"""
+import time
+
+from django.template.backends.django import (  # type: ignore
+    DjangoTemplates,
+    Template
+)
+
+from . import metrics
+
+
+class TimedTemplate(Template):
+
+    def render(self, context=None, request=None):
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.record_template(time.perf_counter() - started)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+
+    def from_string(self, template_code):
+        template = super().from_string(template_code)
+        return TimedTemplate(template.template, self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return TimedTemplate(template.template, self)
@@ -0,0 +1,11 @@
+from django import template  # type: ignore
+
+from core import cache_tags
+
+
+register = template.Library()
+
+
+@register.simple_tag
+def tag_versions(tags):
+    return cache_tags.tag_versions(tags)
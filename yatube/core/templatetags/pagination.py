@@ -0,0 +1,28 @@
+from django import template  # type: ignore
+from django.conf import settings  # type: ignore
+
+
+register = template.Library()
+
+
+@register.filter
+def page_window(page):
+    """Номера страниц вокруг текущей вместо полного page_range."""
+    on_each_side = settings.POSTS_PAGE_WINDOW
+    first = max(page.number - on_each_side, 1)
+    last = min(page.number + on_each_side, page.paginator.num_pages)
+    return range(first, last + 1)
+
+
+@register.simple_tag(takes_context=True)
+def page_query(context, **params):
+    """Строка запроса текущей страницы с другой позицией пагинации.
+
+    Остальные параметры, например поисковый запрос, сохраняются.
+    """
+    query = context['request'].GET.copy()
+    for name in ('page', 'cursor'):
+        query.pop(name, None)
+    for name, value in params.items():
+        query[name] = value
+    return query.urlencode()
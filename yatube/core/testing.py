@@ -0,0 +1,45 @@
+"""Окружение тестов без общих файлов с сервером разработки.
+
+Кэши из settings.CACHES и файл метрик лежат в BASE_DIR/cache вместе с
+кэшем запущенного сервера: cache.clear() в тестах стирал бы его, а id,
+закэшированные без срока, переходили бы между тестовой и рабочей базой.
+На время тестов те же кэши и метрики пишутся во временный каталог,
+свой у каждого прогона.
+"""
+import os
+import shutil
+import tempfile
+
+from django.conf import settings  # type: ignore
+from django.test.runner import DiscoverRunner  # type: ignore
+from django.test.utils import override_settings  # type: ignore
+
+
+def isolated_settings(directory):
+    """Настройки, которые переносят файлы кэшей и метрик в directory."""
+    caches = {
+        alias: {
+            **params,
+            'LOCATION': os.path.join(directory, f'{alias}.sqlite3'),
+        }
+        for alias, params in settings.CACHES.items()
+    }
+    return override_settings(
+        CACHES=caches,
+        METRICS_DB=os.path.join(directory, 'metrics.sqlite3'),
+    )
+
+
+class IsolatedTestRunner(DiscoverRunner):
+    """DiscoverRunner с кэшами и метриками тестов отдельно от сервера."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.directory = tempfile.mkdtemp()
+        self.isolated = isolated_settings(self.directory)
+        self.isolated.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.isolated.disable()
+        shutil.rmtree(self.directory, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
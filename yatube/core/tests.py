@@ -1,6 +1,23 @@
+import os
+import shutil
+import sqlite3
+import tempfile
 from http import HTTPStatus
+from unittest import mock
 
-from django.test import TestCase  # type:ignore
+from django.conf import settings  # type:ignore
+from django.contrib.auth import get_user_model  # type:ignore
+from django.core.cache import cache  # type:ignore
+from django.db import OperationalError, router  # type:ignore
+from django.db.utils import ConnectionHandler  # type:ignore
+from django.test import TestCase, override_settings  # type:ignore
+
+from core import cache_backends, metrics
+from core.cache_backends import TieredCache
+from core.cache_tags import invalidate, tag_versions
+from posts.models import Post
+
+User = get_user_model()
 
 
 class ViewTestClass(TestCase):
@@ -10,3 +27,232 @@ class ViewTestClass(TestCase):
         response = self.client.get('/nonexist-page/')
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
         self.assertTemplateUsed(response, 'core/404.html')
+
+
+class TieredCacheTest(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        location = os.path.join(self.directory, 'cache.sqlite3')
+        # два экземпляра с общим файлом - как два воркера
+        self.worker = TieredCache(location, {})
+        self.other_worker = TieredCache(location, {})
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_set_get_delete(self):
+        """Значения видны всем воркерам, удаление - тоже."""
+        self.worker.set('key', {'value': 1})
+        self.assertEqual(self.other_worker.get('key'), {'value': 1})
+        self.other_worker.delete('key')
+        self.assertIsNone(self.worker.get('key'))
+
+    def test_l1_dropped_when_shared_version_moves(self):
+        """Запись в одном воркере сбрасывает L1 другого."""
+        self.worker.set('key', 'old')
+        self.assertEqual(self.worker.get('key'), 'old')
+        self.other_worker.set('key', 'new')
+        self.assertEqual(self.worker.get('key'), 'new')
+
+    def test_add_incr_get_many(self):
+        """add не перезаписывает ключ, incr атомарен, get_many читает всё."""
+        self.assertTrue(self.worker.add('counter', 1))
+        self.assertFalse(self.other_worker.add('counter', 5))
+        self.assertEqual(self.other_worker.incr('counter'), 2)
+        self.assertEqual(self.worker.incr('counter', 3), 5)
+        with self.assertRaises(ValueError):
+            self.worker.incr('missing')
+        self.worker.set('other', 'value')
+        self.assertEqual(
+            self.other_worker.get_many(['counter', 'other', 'missing']),
+            {'counter': 5, 'other': 'value'}
+        )
+
+    def test_expiry_and_clear(self):
+        """Просроченные ключи не отдаются, clear очищает оба уровня."""
+        self.worker.set('expired', 'value', timeout=-1)
+        self.assertIsNone(self.worker.get('expired'))
+        self.worker.set('key', 'value')
+        self.worker.get('key')
+        self.other_worker.clear()
+        self.assertIsNone(self.worker.get('key'))
+
+    def test_culled_keys_leave_l1(self):
+        """Ключ, вытесненный из L2, пропадает и из L1 других воркеров."""
+        location = os.path.join(self.directory, 'small.sqlite3')
+        params = {'OPTIONS': {'MAX_ENTRIES': 2, 'CULL_FREQUENCY': 2}}
+        worker = TieredCache(location, params)
+        other_worker = TieredCache(location, params)
+        worker.set('oldest', 'value', timeout=100)
+        self.assertEqual(other_worker.get('oldest'), 'value')
+        with mock.patch.object(cache_backends, 'CULL_PROBABILITY', 1):
+            worker.set('newer', 'value', timeout=200)
+            worker.set('newest', 'value', timeout=300)
+        self.assertIsNone(other_worker.get('oldest'))
+
+    def test_invalidate_restores_missing_version(self):
+        """Пропавшая версия тега заводится заново при сбросе."""
+        versions = tag_versions(['tag'])
+        cache.delete('cache-tag:tag')
+        invalidate('tag')
+        self.assertIsNotNone(cache.get('cache-tag:tag'))
+        self.assertNotEqual(tag_versions(['tag']), versions)
+
+
+class IsolatedTestRunnerTest(TestCase):
+
+    def test_files_outside_dev_cache(self):
+        """Кэши и метрики тестов не лежат в файлах сервера разработки."""
+        for alias, params in settings.CACHES.items():
+            with self.subTest(alias=alias):
+                self.assertFalse(
+                    params['LOCATION'].startswith(settings.CACHE_DIR)
+                )
+        self.assertFalse(settings.METRICS_DB.startswith(settings.CACHE_DIR))
+
+
+class DatabaseBackendTest(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'db.sqlite3')
+        self.connections = ConnectionHandler({
+            'default': {'ENGINE': 'core.db_backend', 'NAME': self.path},
+            'replica': {
+                'ENGINE': 'core.db_backend',
+                'NAME': self.path,
+                'OPTIONS': {'read_only': True},
+            },
+        })
+        with self.connections['default'].cursor() as cursor:
+            cursor.execute('CREATE TABLE note (text TEXT)')
+
+    def tearDown(self):
+        self.connections.close_all()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def pragma(self, alias, name):
+        with self.connections[alias].cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas(self):
+        """Каждое соединение получает WAL, PRAGMA и busy timeout."""
+        for alias in ('default', 'replica'):
+            with self.subTest(alias=alias):
+                self.assertEqual(self.pragma(alias, 'journal_mode'), 'wal')
+                self.assertEqual(self.pragma(alias, 'synchronous'), 1)
+                self.assertEqual(self.pragma(alias, 'busy_timeout'), 20000)
+        self.assertEqual(self.pragma('default', 'query_only'), 0)
+        self.assertEqual(self.pragma('replica', 'query_only'), 1)
+
+    def test_replica_is_read_only(self):
+        """Соединение на чтение видит записи, но писать не может."""
+        with self.connections['default'].cursor() as cursor:
+            cursor.execute("INSERT INTO note VALUES ('запись')")
+        with self.connections['replica'].cursor() as cursor:
+            cursor.execute('SELECT text FROM note')
+            self.assertEqual(cursor.fetchall(), [('запись',)])
+            with self.assertRaises(OperationalError):
+                cursor.execute("INSERT INTO note VALUES ('чтение')")
+
+    def test_transaction_takes_write_lock_at_start(self):
+        """Транзакция пишущего соединения сразу держит блокировку записи."""
+        writer = self.connections['default']
+        writer.ensure_connection()
+        writer._start_transaction_under_autocommit()
+        other = sqlite3.connect(self.path, timeout=0)
+        try:
+            with self.assertRaisesMessage(sqlite3.OperationalError, 'locked'):
+                other.execute('BEGIN IMMEDIATE')
+        finally:
+            other.close()
+            writer.connection.rollback()
+
+    def test_router(self):
+        """Запись и миграции - в default; в тестах чтение тоже там."""
+        self.assertEqual(router.db_for_read(Post), 'default')
+        self.assertEqual(router.db_for_write(Post), 'default')
+        self.assertTrue(router.allow_migrate('default', 'posts'))
+        self.assertFalse(router.allow_migrate('replica', 'posts'))
+
+
+class MetricsTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+        cls.user = User.objects.create_user(username='user')
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.settings = override_settings(
+            METRICS_DB=os.path.join(self.directory, 'metrics.sqlite3')
+        )
+        self.settings.enable()
+        metrics.collector.pending.clear()
+        # страницы из кэша других тестов не дали бы ни SQL, ни промахов
+        cache.clear()
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def scrape(self):
+        self.client.force_login(self.staff)
+        response = self.client.get('/metrics/')
+        self.client.logout()
+        self.assertEqual(response['Content-Type'], metrics.CONTENT_TYPE)
+        return response.content.decode()
+
+    def test_metrics_by_view(self):
+        """Время, SQL, шаблоны и кэш считаются по имени вьюхи."""
+        self.client.get('/')
+        self.client.get('/')
+        self.client.get('/nonexist-page/')
+        text = self.scrape()
+        for line in (
+            'yatube_requests_total{view="posts:index",code="200"} 2',
+            'yatube_requests_total{view="unresolved",code="404"} 1',
+            'yatube_request_duration_seconds_bucket'
+            '{view="posts:index",le="+Inf"} 2',
+            'yatube_request_duration_seconds_count{view="posts:index"} 2',
+        ):
+            self.assertIn(line, text)
+        for name in (
+            'yatube_sql_queries_total',
+            'yatube_sql_seconds_total',
+            'yatube_template_render_seconds_total',
+            'yatube_cache_hits_total',
+            'yatube_cache_misses_total',
+        ):
+            self.assertIn(f'{name}{{view="posts:index"}} ', text)
+
+    def test_workers_are_summed(self):
+        """Два воркера пишут в один файл, значения складываются."""
+        workers = metrics.Collector(), metrics.Collector()
+        for worker in workers:
+            request = metrics.RequestMetrics()
+            request.sql_queries = 3
+            worker.add('posts:index', 200, 0.02, request)
+            worker.flush(force=True)
+        text = metrics.render(metrics.store().rows())
+        self.assertIn(
+            'yatube_request_duration_seconds_bucket'
+            '{view="posts:index",le="0.01"} 0', text
+        )
+        self.assertIn(
+            'yatube_request_duration_seconds_bucket'
+            '{view="posts:index",le="0.025"} 2', text
+        )
+        self.assertIn('yatube_sql_queries_total{view="posts:index"} 6', text)
+
+    def test_staff_only(self):
+        """Метрики видны только персоналу."""
+        response = self.client.get('/metrics/')
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+        self.client.force_login(self.user)
+        response = self.client.get('/metrics/')
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
@@ -1,6 +1,12 @@
 # core/views.py
+from django.contrib.admin.views.decorators import (  # type: ignore
+    staff_member_required
+)
+from django.http import HttpResponse  # type: ignore
 from django.shortcuts import render  # type: ignore
 
+from . import metrics as core_metrics
+
 
 def page_not_found(request, exception):
     return render(request, 'core/404.html', {'path': request.path}, status=404)
@@ -8,3 +14,14 @@ def page_not_found(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+@staff_member_required
+def metrics(request):
+    """Метрики всех воркеров в текстовом формате Prometheus."""
+    # свои накопленные данные процесс отдаёт сразу, не дожидаясь интервала
+    core_metrics.collector.flush(force=True)
+    return HttpResponse(
+        core_metrics.render(core_metrics.store().rows()),
+        content_type=core_metrics.CONTENT_TYPE
+    )
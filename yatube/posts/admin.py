@@ -1,9 +1,24 @@
 from django.contrib import admin  # type: ignore
 
+from .functions import EstimatedCountPaginator, SkipScanQuerySet
 from .models import Comment, Follow, Group, Post
+from .search import filter_posts
 
 
-class PostAdmin(admin.ModelAdmin):
+class LargeTableAdmin(admin.ModelAdmin):
+    """Список без COUNT(*) и DISTINCT по всей таблице."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        # навигация по датам ищет периоды поиском в индексе
+        queryset = super().get_queryset(request)
+        return SkipScanQuerySet(
+            queryset.model, queryset.query.chain(), queryset._db
+        )
+
+
+class PostAdmin(LargeTableAdmin):
     list_display = (
         'pk',
         'text',
@@ -12,33 +27,53 @@ class PostAdmin(admin.ModelAdmin):
         'group',
         'image',
     )
-    list_editable = ('group', 'image')
+    # <select> всех групп в каждой строке списка слишком дорог,
+    # группа меняется на странице записи через автодополнение
+    list_editable = ('image',)
+    list_select_related = ('author', 'group')
+    autocomplete_fields = ('author', 'group')
     search_fields = ('text',)
     list_filter = ('pub_date',)
+    date_hierarchy = 'pub_date'
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        # поиск по индексу FTS5 вместо LIKE '%...%' по всей таблице
+        if not search_term.strip():
+            return queryset, False
+        return filter_posts(queryset, search_term), False
+
 
 class GroupAdmin(admin.ModelAdmin):
     list_display = (
         'title',
         'slug',
-        'description'
+        'description',
+        'posts_count'
     )
+    search_fields = ('title', 'slug')
 
 
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(LargeTableAdmin):
     list_display = (
         'text',
         'post',
         'author'
     )
+    list_select_related = ('post', 'author')
+    autocomplete_fields = ('post', 'author')
+    date_hierarchy = 'created'
 
 
-class FollowAdmin(admin.ModelAdmin):
+class FollowAdmin(LargeTableAdmin):
     list_display = (
         'user',
         'author'
     )
+    list_select_related = ('user', 'author')
+    autocomplete_fields = ('user', 'author')
+    # порядок модели по user не покрыт индексом вместе с id
+    ordering = ('-pk',)
 
 
 admin.site.register(Post, PostAdmin)
@@ -0,0 +1,244 @@
+"""JSON API только для чтения: ленты, записи, комментарии, группы, профили.
+
+Списки читаются через values() - без сборки экземпляров моделей, и
+только те столбцы, что запрошены в ?fields=. Страницы листаются
+курсором (?cursor=) по ключу (дата, id), как ленты сайта. ETag и
+Last-Modified берутся из тех же тегов кэша, что и у HTML-страниц.
+"""
+from functools import wraps
+
+from django.conf import settings  # type: ignore
+from django.core.serializers.json import DjangoJSONEncoder  # type: ignore
+from django.db.models import Q  # type: ignore
+from django.http import Http404, JsonResponse  # type: ignore
+from django.shortcuts import get_object_or_404  # type: ignore
+
+from core.conditional import tagged_condition
+
+from .cache_keys import (
+    author_id,
+    group_tags,
+    index_tags,
+    post_author_id,
+    post_detail_tags,
+    profile_tags
+)
+from .counters import author_stats
+from .functions import CURSOR_NEXT, decode_cursor, encode_position
+from .models import Comment, Group, Post, User
+
+# имя поля в ответе: путь для values()
+POST_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+}
+# новый комментарий сдвигает тег записи, но не тег ленты,
+# поэтому число комментариев есть только у отдельной записи
+POST_DETAIL_FIELDS = {
+    **POST_FIELDS,
+    'comments_count': 'comments_count',
+}
+COMMENT_FIELDS = {
+    'id': 'id',
+    'post': 'post_id',
+    'author': 'author__username',
+    'text': 'text',
+    'created': 'created',
+}
+GROUP_FIELDS = {
+    'slug': 'slug',
+    'title': 'title',
+    'description': 'description',
+    'posts_count': 'posts_count',
+}
+JSON_PARAMS = {'ensure_ascii': False, 'separators': (',', ':')}
+
+
+class ApiError(Exception):
+    """Неверный запрос: отдаётся клиенту как 400 с текстом ошибки."""
+
+
+def api_response(data, status=200):
+    return JsonResponse(
+        data, status=status, encoder=DjangoJSONEncoder,
+        json_dumps_params=JSON_PARAMS
+    )
+
+
+def api_view(tags_func):
+    """Вьюха API с ETag по тегам и ошибками в JSON."""
+
+    def decorator(view):
+        @tagged_condition(tags_func)
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            try:
+                return api_response(view(request, *args, **kwargs))
+            except ApiError as error:
+                return api_response({'error': str(error)}, status=400)
+            except Http404:
+                return api_response({'error': 'Не найдено'}, status=404)
+
+        return wrapper
+
+    return decorator
+
+
+def selected_fields(request, available):
+    """Поля из ?fields=a,b или все поля."""
+    raw = request.GET.get('fields')
+    if not raw:
+        return list(available)
+    names = [name.strip() for name in raw.split(',') if name.strip()]
+    unknown = [name for name in names if name not in available]
+    if unknown or not names:
+        raise ApiError(f'Неизвестные поля: {", ".join(unknown)}')
+    return names
+
+
+def page_limit(request):
+    raw = request.GET.get('limit')
+    if raw is None:
+        return settings.API_PAGE_SIZE
+    try:
+        limit = int(raw)
+    except ValueError:
+        raise ApiError('limit должен быть числом')
+    return max(1, min(limit, settings.API_MAX_PAGE_SIZE))
+
+
+def image_url(name):
+    if not name:
+        return None
+    return Post._meta.get_field('image').storage.url(name)
+
+
+def render_row(row, fields, mapping):
+    data = {name: row[mapping[name]] for name in fields}
+    if 'image' in data:
+        data['image'] = image_url(data['image'])
+    return data
+
+
+def cursor_page(request, queryset, mapping, date_field):
+    """Страница строк после курсора и курсор следующей страницы."""
+    fields = selected_fields(request, mapping)
+    limit = page_limit(request)
+    cursor = request.GET.get('cursor')
+    if cursor:
+        position = decode_cursor(cursor)
+        if position is None or position[0] != CURSOR_NEXT:
+            raise ApiError('Неверный курсор')
+        _, date, pk = position
+        queryset = queryset.filter(
+            Q(**{f'{date_field}__lt': date})
+            | Q(**{date_field: date, 'pk__lt': pk})
+        )
+    # ключ курсора нужен всегда, даже если его поля не просили
+    columns = {mapping[name] for name in fields} | {date_field, 'id'}
+    rows = list(
+        queryset.order_by(f'-{date_field}', '-pk').values(
+            *columns
+        )[:limit + 1]
+    )
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_position(
+            CURSOR_NEXT, rows[-1][date_field], rows[-1]['id']
+        )
+    return {
+        'results': [render_row(row, fields, mapping) for row in rows],
+        'next': next_cursor,
+    }
+
+
+def comments_tags(request, post_id):
+    if post_author_id(post_id) is None:
+        return None
+    return [f'post:{post_id}']
+
+
+def groups_tags(request):
+    # 'groups' сдвигают правки групп, 'group-counts' - их счётчики
+    return ['groups', 'group-counts']
+
+
+@api_view(index_tags)
+def api_posts(request):
+    return cursor_page(request, Post.objects.all(), POST_FIELDS, 'pub_date')
+
+
+@api_view(post_detail_tags)
+def api_post(request, post_id):
+    fields = selected_fields(request, POST_DETAIL_FIELDS)
+    row = Post.objects.filter(pk=post_id).values(
+        *{POST_DETAIL_FIELDS[name] for name in fields}
+    ).first()
+    if row is None:
+        raise Http404
+    return render_row(row, fields, POST_DETAIL_FIELDS)
+
+
+@api_view(comments_tags)
+def api_comments(request, post_id):
+    if post_author_id(post_id) is None:
+        raise Http404
+    return cursor_page(
+        request,
+        Comment.objects.filter(post_id=post_id),
+        COMMENT_FIELDS,
+        'created'
+    )
+
+
+@api_view(groups_tags)
+def api_groups(request):
+    fields = selected_fields(request, GROUP_FIELDS)
+    rows = Group.objects.order_by('title').values(
+        *{GROUP_FIELDS[name] for name in fields}
+    )
+    return {
+        'results': [render_row(row, fields, GROUP_FIELDS) for row in rows]
+    }
+
+
+@api_view(group_tags)
+def api_group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    data = cursor_page(
+        request, Post.objects.filter(group=group), POST_FIELDS, 'pub_date'
+    )
+    data['group'] = {name: getattr(group, name) for name in GROUP_FIELDS}
+    return data
+
+
+@api_view(profile_tags)
+def api_profile(request, username):
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    stats = author_stats(author)
+    return {
+        'username': author.username,
+        'first_name': author.first_name,
+        'last_name': author.last_name,
+        'posts_count': stats.posts_count,
+        'followers_count': stats.followers_count,
+        'following_count': stats.following_count,
+    }
+
+
+@api_view(profile_tags)
+def api_profile_posts(request, username):
+    author_pk = author_id(username)
+    if author_pk is None:
+        raise Http404
+    return cursor_page(
+        request, Post.objects.filter(author_id=author_pk), POST_FIELDS,
+        'pub_date'
+    )
@@ -0,0 +1,28 @@
+from django.urls import path  # type: ignore
+
+from . import api
+
+
+app_name = 'api'
+
+urlpatterns = [
+    path('posts/', api.api_posts, name='posts'),
+    path('posts/<int:post_id>/', api.api_post, name='post'),
+    path(
+        'posts/<int:post_id>/comments/',
+        api.api_comments,
+        name='comments'
+    ),
+    path('groups/', api.api_groups, name='groups'),
+    path(
+        'groups/<slug:slug>/posts/',
+        api.api_group_posts,
+        name='group_posts'
+    ),
+    path('profiles/<str:username>/', api.api_profile, name='profile'),
+    path(
+        'profiles/<str:username>/posts/',
+        api.api_profile_posts,
+        name='profile_posts'
+    ),
+]
@@ -5,3 +5,6 @@ class PostsConfig(AppConfig):
     name = 'posts'
     verbose_name = 'сообщение'
     verbose_name_plural = 'сообщения'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,79 @@
+"""Ключи кэша для id из адресов и теги страниц записей.
+
+Общие для HTML-страниц, API и лент: по ним tagged_condition считает
+ETag, а сигналы сбрасывают id, когда slug, имя или запись меняются.
+"""
+import hashlib
+
+from django.core.cache import cache  # type: ignore
+
+from .models import Group, Post, User
+
+
+def id_key(kind, value):
+    """Ключ кэша для id по имени или slug из адреса.
+
+    Имя может быть любым юникодом, а ключ memcached - только ASCII
+    без пробелов, поэтому значение хэшируется.
+    """
+    return f'{kind}:{hashlib.md5(value.encode()).hexdigest()}'
+
+
+def post_author_key(post_id):
+    return f'post-author:{post_id}'
+
+
+def cached_id(key, queryset):
+    """id из кэша; при промахе - один запрос к базе, дальше без запросов."""
+    value = cache.get(key)
+    if value is None:
+        value = queryset.order_by().first()
+        if value is not None:
+            cache.set(key, value, None)
+    return value
+
+
+def group_id(slug):
+    return cached_id(
+        id_key('group-id', slug),
+        Group.objects.filter(slug=slug).values_list('pk', flat=True)
+    )
+
+
+def author_id(username):
+    return cached_id(
+        id_key('author-id', username),
+        User.objects.filter(username=username).values_list('pk', flat=True)
+    )
+
+
+def post_author_id(post_id):
+    # автор записи не меняется
+    return cached_id(
+        post_author_key(post_id),
+        Post.objects.filter(pk=post_id).values_list('author_id', flat=True)
+    )
+
+
+def index_tags(request):
+    return ['feed:index', 'groups']
+
+
+def group_tags(request, slug):
+    pk = group_id(slug)
+    return None if pk is None else [f'group:{pk}']
+
+
+def profile_tags(request, username):
+    pk = author_id(username)
+    if pk is None:
+        return None
+    # подписки меняют счётчики и кнопку подписки на странице
+    return [f'author:{pk}', f'follows:{pk}', 'groups']
+
+
+def post_detail_tags(request, post_id):
+    pk = post_author_id(post_id)
+    if pk is None:
+        return None
+    return [f'post:{post_id}', f'author:{pk}', 'groups']
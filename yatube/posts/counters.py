@@ -0,0 +1,147 @@
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model  # type: ignore
+from django.db import transaction  # type: ignore
+from django.db.models import Count, F  # type: ignore
+from django.db.models.functions import Greatest  # type: ignore
+
+from .models import AuthorStats, Comment, Follow, Group, Post
+
+
+User = get_user_model()
+
+
+def count_stats(user_id):
+    """Считает счётчики пользователя по таблицам с нуля."""
+    return {
+        'posts_count': Post.objects.filter(author_id=user_id).count(),
+        'followers_count': Follow.objects.filter(author_id=user_id).count(),
+        'following_count': Follow.objects.filter(user_id=user_id).count(),
+    }
+
+
+def author_stats(user):
+    """Счётчики пользователя; при первом обращении они пересчитываются."""
+    try:
+        return user.stats
+    except AuthorStats.DoesNotExist:
+        stats, _ = AuthorStats.objects.get_or_create(
+            user=user, defaults=count_stats(user.pk)
+        )
+        return stats
+
+
+def change(queryset, field, delta):
+    """Атомарно сдвигает счётчик, не опуская его ниже нуля."""
+    if delta > 0:
+        value = F(field) + delta
+    else:
+        value = Greatest(F(field) + delta, 0)
+    queryset.update(**{field: value})
+
+
+def change_many(model, field, deltas, key='pk'):
+    """Сдвигает счётчик у многих строк сразу.
+
+    deltas - словарь id -> сдвиг; строки с одинаковым сдвигом
+    обновляются одним UPDATE.
+    """
+    ids_by_delta = defaultdict(list)
+    for pk, delta in deltas.items():
+        ids_by_delta[delta].append(pk)
+    for delta, ids in ids_by_delta.items():
+        change(model.objects.filter(**{f'{key}__in': ids}), field, delta)
+
+
+def change_post(post_id, delta):
+    change(Post.objects.filter(pk=post_id), 'comments_count', delta)
+
+
+def change_group(group_id, delta):
+    if group_id is not None:
+        change(Group.objects.filter(pk=group_id), 'posts_count', delta)
+
+
+def change_stats(user_id, field, delta):
+    # если строки ещё нет, её создаст author_stats с точными значениями
+    change(AuthorStats.objects.filter(user_id=user_id), field, delta)
+
+
+def _repair(model, pk_range, field, counts):
+    fixed = 0
+    rows = model.objects.filter(pk__range=pk_range).values_list('pk', field)
+    for pk, value in rows:
+        actual = counts.get(pk, 0)
+        if value != actual:
+            model.objects.filter(pk=pk).update(**{field: actual})
+            fixed += 1
+    return fixed
+
+
+def _chunks(model, chunk_size):
+    last = model.objects.order_by('-pk').values_list('pk', flat=True).first()
+    start = 1
+    while last is not None and start <= last:
+        yield start, start + chunk_size - 1
+        start += chunk_size
+
+
+def _counts(queryset, field, first, last):
+    """Число строк на каждый id из диапазона [first, last]."""
+    return dict(
+        queryset.filter(**{
+            f'{field}__gte': first, f'{field}__lte': last
+        }).order_by().values_list(field).annotate(Count('pk'))
+    )
+
+
+def reconcile_posts(chunk_size):
+    fixed = 0
+    for first, last in _chunks(Post, chunk_size):
+        counts = _counts(Comment.objects, 'post', first, last)
+        with transaction.atomic():
+            fixed += _repair(Post, (first, last), 'comments_count', counts)
+    return fixed
+
+
+def reconcile_groups(chunk_size):
+    fixed = 0
+    for first, last in _chunks(Group, chunk_size):
+        counts = _counts(Post.objects, 'group', first, last)
+        with transaction.atomic():
+            fixed += _repair(Group, (first, last), 'posts_count', counts)
+    return fixed
+
+
+def reconcile_users(chunk_size):
+    fixed = 0
+    for first, last in _chunks(User, chunk_size):
+        posts = _counts(Post.objects, 'author', first, last)
+        followers = _counts(Follow.objects, 'author', first, last)
+        following = _counts(Follow.objects, 'user', first, last)
+        user_ids = list(
+            User.objects.filter(
+                pk__range=(first, last)
+            ).values_list('pk', flat=True)
+        )
+        stats = AuthorStats.objects.in_bulk(user_ids, field_name='user_id')
+        with transaction.atomic():
+            for user_id in user_ids:
+                actual = {
+                    'posts_count': posts.get(user_id, 0),
+                    'followers_count': followers.get(user_id, 0),
+                    'following_count': following.get(user_id, 0),
+                }
+                current = stats.get(user_id)
+                if current is None:
+                    AuthorStats.objects.create(user_id=user_id, **actual)
+                    fixed += 1
+                elif any(
+                    getattr(current, name) != value
+                    for name, value in actual.items()
+                ):
+                    AuthorStats.objects.filter(user_id=user_id).update(
+                        **actual
+                    )
+                    fixed += 1
+    return fixed
@@ -0,0 +1,173 @@
+"""Ленты RSS и Atom для главной, групп и авторов.
+
+Готовый документ ленты лежит в кэше под версиями тех же тегов, что и
+HTML-страницы, а tagged_condition отвечает 304 по ETag и
+Last-Modified. Опрос неизменившейся ленты не доходит до базы.
+"""
+from django.conf import settings  # type: ignore
+from django.contrib.syndication.views import Feed  # type: ignore
+from django.core.cache import cache  # type: ignore
+from django.http import Http404, HttpResponse  # type: ignore
+from django.shortcuts import get_object_or_404  # type: ignore
+from django.urls import reverse  # type: ignore
+from django.utils.feedgenerator import (  # type: ignore
+    Atom1Feed,
+    Rss201rev2Feed
+)
+
+from core.cache_tags import tag_versions
+from core.conditional import tagged_condition
+
+from .cache_keys import author_id, group_tags, index_tags
+from .models import Group, Post, User
+
+FEED_TYPES = {
+    'rss': Rss201rev2Feed,
+    'atom': Atom1Feed,
+}
+
+
+class PostsFeed(Feed):
+    """Общая часть лент: последние записи со ссылками на страницы."""
+
+    def get_object(self, request, feed_format, **kwargs):
+        # экземпляр ленты создаётся на каждый запрос
+        self.feed_type = FEED_TYPES[feed_format]
+        return None
+
+    def posts(self, obj):
+        return Post.objects.select_related('author', 'group')
+
+    def items(self, obj):
+        return self.posts(obj)[:settings.FEED_ITEMS]
+
+    def item_title(self, item):
+        return str(item)
+
+    def item_description(self, item):
+        return item.text
+
+    def item_link(self, item):
+        return reverse('posts:post_detail', args=[item.pk])
+
+    def item_pubdate(self, item):
+        return item.pub_date
+
+    def item_author_name(self, item):
+        return item.author.get_full_name() or item.author.username
+
+    def item_categories(self, item):
+        return [item.group.title] if item.group else []
+
+
+class IndexFeed(PostsFeed):
+    title = 'Yatube: последние записи'
+    description = 'Последние записи на сайте'
+
+    def link(self, obj):
+        return reverse('posts:index')
+
+
+class GroupFeed(PostsFeed):
+
+    def get_object(self, request, feed_format, slug):
+        super().get_object(request, feed_format)
+        return get_object_or_404(Group, slug=slug)
+
+    def title(self, obj):
+        return f'Yatube: записи сообщества «{obj.title}»'
+
+    def description(self, obj):
+        return obj.description
+
+    def link(self, obj):
+        return reverse('posts:group', args=[obj.slug])
+
+    def posts(self, obj):
+        return Post.objects.select_related('author', 'group').filter(
+            group=obj
+        )
+
+
+class AuthorFeed(PostsFeed):
+
+    def get_object(self, request, feed_format, username):
+        super().get_object(request, feed_format)
+        return get_object_or_404(User, username=username)
+
+    def title(self, obj):
+        return f'Yatube: записи {obj.get_full_name() or obj.username}'
+
+    def description(self, obj):
+        return f'Последние записи пользователя {obj.username}'
+
+    def link(self, obj):
+        return reverse('posts:profile', args=[obj.username])
+
+    def posts(self, obj):
+        return obj.posts.select_related('author', 'group')
+
+
+def index_feed_tags(request, feed_format):
+    if feed_format not in FEED_TYPES:
+        return None
+    return index_tags(request)
+
+
+def group_feed_tags(request, feed_format, slug):
+    if feed_format not in FEED_TYPES:
+        return None
+    return group_tags(request, slug)
+
+
+def author_feed_tags(request, feed_format, username):
+    if feed_format not in FEED_TYPES:
+        return None
+    # подписки на ленту автора не влияют
+    pk = author_id(username)
+    return None if pk is None else [f'author:{pk}', 'groups']
+
+
+def cached_feed(request, feed, tags_func, **kwargs):
+    """Документ ленты из кэша, пока не сдвинулись её теги."""
+    tags = tags_func(request, **kwargs)
+    if tags is None:
+        raise Http404
+    # в ленте абсолютные ссылки, поэтому домен входит в ключ
+    key = (
+        f'feed:{request.get_host()}{request.path}:{tag_versions(tags)}'
+    )
+    cached = cache.get(key)
+    if cached is not None:
+        content, content_type = cached
+        return HttpResponse(content, content_type=content_type)
+    response = feed(request, **kwargs)
+    cache.set(
+        key,
+        (response.content, response['Content-Type']),
+        settings.FRAGMENT_CACHE_TIMEOUT
+    )
+    return response
+
+
+@tagged_condition(index_feed_tags)
+def index_feed(request, feed_format):
+    return cached_feed(
+        request, IndexFeed(), index_feed_tags, feed_format=feed_format
+    )
+
+
+@tagged_condition(group_feed_tags)
+def group_feed(request, feed_format, slug):
+    return cached_feed(
+        request, GroupFeed(), group_feed_tags,
+        feed_format=feed_format, slug=slug
+    )
+
+
+@tagged_condition(author_feed_tags)
+def author_feed(request, feed_format, username):
+    return cached_feed(
+        request, AuthorFeed(), author_feed_tags,
+        feed_format=feed_format, username=username
+    )
@@ -1,5 +1,7 @@
 from django import forms  # type: ignore
+from django.core.files.uploadedfile import UploadedFile  # type: ignore
 
+from . import uploads
 from .models import Comment, Post  # type: ignore
 
 
@@ -8,6 +10,24 @@ class PostForm(forms.ModelForm):
         model = Post
         fields = ('text', 'group', 'image')
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # файл сверх предела не дочитан, и ImageField его не откроет
+        self.image_oversized = isinstance(
+            self.files.get('image'), uploads.OversizedUpload
+        )
+        if self.image_oversized:
+            self.files = self.files.copy()
+            del self.files['image']
+
+    def clean_image(self):
+        if self.image_oversized:
+            raise uploads.oversized_error()
+        image = self.cleaned_data.get('image')
+        if isinstance(image, UploadedFile):
+            return uploads.normalize(image)
+        return image
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -1,8 +1,335 @@
+import base64
+import binascii
+import datetime
+import hashlib
+
 from django.conf import settings  # type: ignore
-from django.core.paginator import Paginator  # type: ignore
+from django.core.cache import cache  # type: ignore
+from django.core.paginator import EmptyPage, Page, Paginator  # type: ignore
+from django.db import DatabaseError, connection  # type: ignore
+from django.db.models import DateTimeField, Q, QuerySet  # type: ignore
+from django.utils import timezone  # type: ignore
+from django.utils.dateparse import parse_datetime  # type: ignore
+from django.utils.functional import cached_property  # type: ignore
+
+from core.cache_tags import tag_versions
+
+
+CURSOR_NEXT = 'n'
+CURSOR_PREVIOUS = 'p'
+
+
+def encode_position(direction, date, pk):
+    """Упаковывает позицию (дата, id) в непрозрачный токен."""
+    raw = f'{direction}|{date.isoformat()}|{pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def encode_cursor(direction, post):
+    return encode_position(direction, post.pub_date, post.pk)
+
+
+def decode_cursor(token):
+    """Распаковывает токен; для битого токена возвращает None."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(
+            token + '=' * (-len(token) % 4)
+        ).decode()
+        direction, pub_date, pk = raw.split('|')
+        pub_date = parse_datetime(pub_date)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if direction not in (CURSOR_NEXT, CURSOR_PREVIOUS) or pub_date is None:
+        return None
+    return direction, pub_date, pk
+
+
+COUNT_VERSION_KEY = 'posts:count:version'
+
+
+def bump_count_version():
+    """Сбрасывает все закэшированные количества записей.
+
+    Нужен после массовой загрузки данных; обычные записи и подписки
+    его не вызывают, иначе каждая запись возвращала бы COUNT(*) во
+    все ленты сразу.
+    """
+    try:
+        cache.incr(COUNT_VERSION_KEY)
+    except ValueError:
+        cache.set(COUNT_VERSION_KEY, 1, None)
+
+
+class CachedCountPaginator(Paginator):
+    """Paginator без COUNT(*) на каждый запрос.
+
+    Количество берётся из переданного счётчика, а если его нет -
+    из кэша, который живёт POSTS_COUNT_CACHE_TIMEOUT секунд. Новые
+    записи попадают в число страниц, когда оно истечёт. Для страниц с
+    ETag по тегам (tags) количество лежит под версиями этих тегов и
+    меняется вместе с ETag, а не по истечении.
+    """
+
+    def __init__(self, object_list, per_page, count=None, tags=None,
+                 **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self._known_count = count
+        self._tags = tags
+
+    @cached_property
+    def count(self):
+        if self._known_count is not None:
+            return self._known_count
+        query = getattr(self.object_list, 'query', None)
+        if query is None:
+            return len(self.object_list)
+        digest = hashlib.md5(str(query).encode()).hexdigest()
+        if self._tags is not None:
+            # иначе ответ 304 оставлял бы ссылки на страницы по числу,
+            # которое уже пересчитано
+            key = f'posts:count:tags:{tag_versions(self._tags)}:{digest}'
+            timeout = settings.FRAGMENT_CACHE_TIMEOUT
+        else:
+            version = cache.get_or_set(COUNT_VERSION_KEY, 1, None)
+            key = f'posts:count:{version}:{digest}'
+            timeout = settings.POSTS_COUNT_CACHE_TIMEOUT
+        return cache.get_or_set(key, self.object_list.count, timeout)
+
+    def page(self, number):
+        # устаревшее количество не должно обрезать последнюю страницу:
+        # срез всегда на per_page записей, лишних база не вернёт
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        return self._get_page(
+            self.object_list[bottom:bottom + self.per_page], number, self
+        )
+
+
+def estimated_count(model):
+    """Число строк таблицы по статистике планировщика или None.
+
+    Для SQLite статистику собирает ANALYZE (sqlite_stat1), для
+    PostgreSQL - autovacuum (pg_class.reltuples).
+    """
+    table = model._meta.db_table
+    if connection.vendor == 'sqlite':
+        sql = 'SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1'
+    elif connection.vendor == 'postgresql':
+        sql = 'SELECT reltuples::bigint FROM pg_class WHERE relname = %s'
+    else:
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [table])
+            row = cursor.fetchone()
+    except DatabaseError:
+        # ANALYZE ещё ни разу не запускали
+        return None
+    if row is None:
+        return None
+    return int(str(row[0]).split()[0])
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator для больших таблиц в админке.
+
+    До ADMIN_COUNT_LIMIT строк считаются точно: COUNT по подзапросу с
+    LIMIT читает не больше этого числа ключей. Дальше для всей таблицы
+    берётся оценка планировщика (если ANALYZE уже собрал статистику),
+    а выборка с фильтрами и таблица без статистики считаются целиком,
+    чтобы до каждой строки можно было дойти по номерам страниц.
+    """
+
+    estimated = False
+
+    @cached_property
+    def count(self):
+        limit = settings.ADMIN_COUNT_LIMIT
+        counted = self.object_list.values('pk')[:limit + 1].count()
+        if counted <= limit:
+            return counted
+        if not self.object_list.query.where:
+            estimate = estimated_count(self.object_list.model)
+            if estimate is not None and estimate > limit:
+                self.estimated = True
+                return estimate
+        return self.object_list.count()
+
+    def _count_exactly(self):
+        self.estimated = False
+        self.__dict__['count'] = self.object_list.count()
+        self.__dict__.pop('num_pages', None)
+
+    def validate_number(self, number):
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            if not self.estimated:
+                raise
+        # оценка отстала от таблицы: страница за ней может существовать
+        self._count_exactly()
+        return super().validate_number(number)
+
+    def page(self, number):
+        number = self.validate_number(number)
+        if self.estimated and number == self.num_pages:
+            # строки после последней оценённой страницы - тоже признак
+            # устаревшей оценки, иначе ссылки на них не будет
+            top = number * self.per_page
+            if self.object_list.values('pk')[top:top + 1].exists():
+                self._count_exactly()
+        return super().page(number)
+
+
+def _period_start(value, kind):
+    if isinstance(value, datetime.datetime):
+        if timezone.is_aware(value):
+            value = timezone.localtime(value)
+        value = value.date()
+    if kind == 'year':
+        return value.replace(month=1, day=1)
+    if kind == 'month':
+        return value.replace(day=1)
+    return value
+
+
+def _next_period(start, kind):
+    if kind == 'year':
+        return start.replace(year=start.year + 1)
+    if kind == 'month':
+        if start.month == 12:
+            return start.replace(year=start.year + 1, month=1)
+        return start.replace(month=start.month + 1)
+    return start + datetime.timedelta(days=1)
+
+
+class SkipScanQuerySet(QuerySet):
+    """QuerySet, у которого dates() прыгает по индексу поля.
+
+    Обычный dates() делает DISTINCT по всем подходящим строкам. Здесь
+    каждый следующий год, месяц или день находится одним поиском в
+    индексе - первой строкой после начала периода, поэтому число
+    запросов равно числу периодов, а не строк.
+    """
+
+    def _first_from(self, field_name, bound):
+        rows = self.order_by(field_name)
+        if bound is not None:
+            rows = rows.filter(**{f'{field_name}__gte': bound})
+        return rows.values_list(field_name, flat=True).first()
+
+    def _bound(self, field_name, day):
+        field = self.model._meta.get_field(field_name)
+        if not isinstance(field, DateTimeField):
+            return day
+        bound = datetime.datetime.combine(day, datetime.time.min)
+        if settings.USE_TZ:
+            bound = timezone.make_aware(bound)
+        return bound
+
+    def dates(self, field_name, kind, order='ASC'):
+        if kind not in ('year', 'month', 'day'):
+            return super().dates(field_name, kind, order)
+        periods = []
+        value = self._first_from(field_name, None)
+        while value is not None:
+            start = _period_start(value, kind)
+            periods.append(start)
+            value = self._first_from(
+                field_name,
+                self._bound(field_name, _next_period(start, kind))
+            )
+        if order == 'DESC':
+            periods.reverse()
+        return periods
+
+
+class CursorPage(Page):
+    """Страница ленты, полученная по курсору, а не по номеру."""
+
+    def __init__(self, object_list, paginator, cursor,
+                 has_next, has_previous):
+        super().__init__(object_list, None, paginator)
+        self.cursor = cursor
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f'<CursorPage {self.cursor or "first"}>'
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if not self._has_next or not self.object_list:
+            return None
+        return encode_cursor(CURSOR_NEXT, self.object_list[-1])
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous or not self.object_list:
+            return None
+        return encode_cursor(CURSOR_PREVIOUS, self.object_list[0])
+
+
+class CursorPaginator:
+    """Постраничный вывод по ключу (pub_date, id) без OFFSET.
+
+    Каждая страница - это диапазонный просмотр составного индекса,
+    поэтому глубокие страницы стоят столько же, сколько первая.
+    """
+
+    is_cursor = True
+
+    def __init__(self, object_list, per_page):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+
+    def get_page(self, cursor=None):
+        position = decode_cursor(cursor)
+        if position is None:
+            return self._forward(self.object_list, None, False)
+        direction, pub_date, pk = position
+        if direction == CURSOR_NEXT:
+            posts = self.object_list.filter(
+                Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, pk__lt=pk)
+            )
+            return self._forward(posts, cursor, True)
+        posts = self.object_list.filter(
+            Q(pub_date__gt=pub_date) | Q(pub_date=pub_date, pk__gt=pk)
+        ).order_by('pub_date', 'pk')
+        rows = list(posts[:self.per_page + 1])
+        has_previous = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        rows.reverse()
+        return CursorPage(rows, self, cursor, True, has_previous)
+
+    def _forward(self, posts, cursor, has_previous):
+        rows = list(
+            posts.order_by('-pub_date', '-pk')[:self.per_page + 1]
+        )
+        has_next = len(rows) > self.per_page
+        return CursorPage(
+            rows[:self.per_page], self, cursor, has_next, has_previous
+        )
 
 
-def get_page(request, post_list):
-    paginator = Paginator(post_list, settings.POSTS_PER_PAGE)
+def get_page(request, post_list, count=None, tags=None):
+    if settings.POSTS_PAGINATION == 'cursor':
+        paginator = CursorPaginator(post_list, settings.POSTS_PER_PAGE)
+        return paginator.get_page(request.GET.get('cursor'))
+    paginator = CachedCountPaginator(
+        post_list, settings.POSTS_PER_PAGE, count=count, tags=tags
+    )
     page_number = request.GET.get('page')
     return paginator.get_page(page_number)
@@ -0,0 +1,340 @@
+"""Потоковый импорт записей, комментариев и подписок из JSONL и CSV.
+
+Файл читается построчно, строки собираются в порции, и каждая порция
+пишется одним bulk_create в своей транзакции вместе с позицией в файле
+(ImportCheckpoint). Память ограничена порцией и картами имя -> id.
+
+bulk_create не шлёт сигналов, поэтому счётчики и теги кэша порция
+сдвигает сама, а ленты подписок пересобираются в конце импорта.
+Полнотекстовый индекс держат триггеры базы.
+"""
+import csv
+import io
+import json
+import os
+from collections import Counter
+
+from django.conf import settings  # type: ignore
+from django.db import transaction  # type: ignore
+from django.db.models import Case, Value, When  # type: ignore
+from django.utils import timezone  # type: ignore
+from django.utils.dateparse import parse_datetime  # type: ignore
+
+from core.cache_tags import invalidate
+
+from . import counters, timelines
+from .functions import bump_count_version
+from .models import (
+    AuthorStats,
+    Comment,
+    Follow,
+    Group,
+    ImportCheckpoint,
+    Post,
+    User
+)
+
+# сколько ключей держит карта, прежде чем начать заново
+LOOKUP_LIMIT = 100_000
+# сколько строк в одном UPDATE с датами
+DATES_CHUNK = 500
+
+
+class LookupMap:
+    """Карта значение поля -> id, которая ходит в базу только за новыми."""
+
+    def __init__(self, model, field):
+        self.model = model
+        self.field = field
+        self.ids = {}
+
+    def resolve(self, keys):
+        keys = {key for key in keys if key}
+        if len(self.ids) + len(keys) > LOOKUP_LIMIT:
+            self.ids.clear()
+        missing = keys - self.ids.keys()
+        if not missing:
+            return
+        found = dict(
+            self.model.objects.filter(
+                **{f'{self.field}__in': missing}
+            ).values_list(self.field, 'pk')
+        )
+        for key in missing:
+            self.ids[key] = found.get(key)
+
+    def get(self, key):
+        return self.ids.get(key)
+
+
+class Source:
+    """Строки файла, которые помнят смещение сразу после себя."""
+
+    def __init__(self, handle):
+        self.handle = handle
+        self.offset = handle.tell()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        line = self.handle.readline()
+        if not line:
+            raise StopIteration
+        self.offset += len(line)
+        return line.decode('utf-8')
+
+
+def read_rows(handle, file_format, offset):
+    """Пары (строка-словарь, смещение после неё) начиная с offset."""
+    if file_format == 'csv':
+        header = handle.readline().decode('utf-8-sig')
+        fieldnames = next(csv.reader(io.StringIO(header)))
+        handle.seek(max(offset, handle.tell()))
+        source = Source(handle)
+        for row in csv.DictReader(source, fieldnames=fieldnames):
+            yield row, source.offset
+        return
+    handle.seek(offset)
+    source = Source(handle)
+    for line in source:
+        if line.strip():
+            yield json.loads(line), source.offset
+
+
+def parse_date(value):
+    """Дата из файла; пустая означает «сейчас»."""
+    if not value:
+        return timezone.now()
+    date = parse_datetime(value)
+    if date is None:
+        raise ValueError(f'Неверная дата: {value}')
+    if settings.USE_TZ and timezone.is_naive(date):
+        date = timezone.make_aware(date)
+    return date
+
+
+def restore_dates(model, field_name, objects, dates):
+    """Возвращает даты из файла, которые bulk_create заменил на «сейчас».
+
+    auto_now_add ставит время вставки, а выключать его нельзя: поле
+    общее для всего процесса, и с ним поменялись бы и другие запросы.
+    Поэтому даты пишутся отдельным UPDATE в транзакции порции.
+    """
+    missing = [obj for obj in objects if obj.pk is None]
+    if missing:
+        # SQLite не возвращает id из bulk_create; новые id больше всех
+        # прежних, а писать в таблицу до конца транзакции никто не может
+        explicit = [obj.pk for obj in objects if obj.pk is not None]
+        ids = model.objects.exclude(pk__in=explicit).order_by(
+            '-pk'
+        ).values_list('pk', flat=True)[:len(missing)]
+        for obj, pk in zip(missing, reversed(list(ids))):
+            obj.pk = pk
+    field = model._meta.get_field(field_name)
+    pairs = list(zip(objects, dates))
+    for start in range(0, len(pairs), DATES_CHUNK):
+        chunk = pairs[start:start + DATES_CHUNK]
+        model.objects.filter(pk__in=[obj.pk for obj, _ in chunk]).update(**{
+            field_name: Case(
+                *[When(pk=obj.pk, then=Value(date)) for obj, date in chunk],
+                output_field=field
+            )
+        })
+
+
+def insert(importer, objects):
+    """bulk_create порции с датами из файла."""
+    date_field = importer.date_field
+    if date_field is None:
+        importer.model.objects.bulk_create(objects)
+        return
+    # bulk_create заменит даты из файла временем вставки
+    dates = [getattr(obj, date_field) for obj in objects]
+    importer.model.objects.bulk_create(objects)
+    restore_dates(importer.model, date_field, objects, dates)
+
+
+class PostImporter:
+    """Поля: author (username), text, group (slug), pub_date, id."""
+
+    model = Post
+    date_field = 'pub_date'
+
+    def __init__(self):
+        self.users = LookupMap(User, 'username')
+        self.groups = LookupMap(Group, 'slug')
+
+    def build(self, rows):
+        self.users.resolve(row.get('author') for row in rows)
+        self.groups.resolve(row.get('group') for row in rows)
+        posts = []
+        for row in rows:
+            author_id = self.users.get(row.get('author'))
+            group_id = self.groups.get(row.get('group'))
+            if author_id is None or row.get('group') and group_id is None:
+                continue
+            posts.append(Post(
+                id=row.get('id') or None,
+                author_id=author_id,
+                group_id=group_id,
+                text=row.get('text') or '',
+                pub_date=parse_date(row.get('pub_date')),
+            ))
+        return posts
+
+    def apply(self, posts):
+        """Сдвигает счётчики в транзакции порции, возвращает теги кэша."""
+        authors = Counter(post.author_id for post in posts)
+        groups = Counter(post.group_id for post in posts if post.group_id)
+        # строки счётчиков, которых ещё нет, author_stats посчитает сам
+        counters.change_many(
+            AuthorStats, 'posts_count', authors, key='user_id'
+        )
+        counters.change_many(Group, 'posts_count', groups)
+        return (
+            ['feed:index']
+            + [f'author:{author_id}' for author_id in authors]
+            + [f'group:{group_id}' for group_id in groups]
+            + (['group-counts'] if groups else [])
+        )
+
+
+class CommentImporter:
+    """Поля: post (id записи), author (username), text, created."""
+
+    model = Comment
+    date_field = 'created'
+
+    def __init__(self):
+        self.users = LookupMap(User, 'username')
+
+    def build(self, rows):
+        self.users.resolve(row.get('author') for row in rows)
+        post_ids = set(Post.objects.filter(
+            pk__in={row.get('post') for row in rows if row.get('post')}
+        ).values_list('pk', flat=True))
+        comments = []
+        for row in rows:
+            author_id = self.users.get(row.get('author'))
+            post_id = row.get('post') and int(row['post'])
+            if author_id is None or post_id not in post_ids:
+                continue
+            comments.append(Comment(
+                post_id=post_id,
+                author_id=author_id,
+                text=row.get('text') or '',
+                created=parse_date(row.get('created')),
+            ))
+        return comments
+
+    def apply(self, comments):
+        posts = Counter(comment.post_id for comment in comments)
+        counters.change_many(Post, 'comments_count', posts)
+        return [f'post:{post_id}' for post_id in posts]
+
+
+class FollowImporter:
+    """Поля: user (username подписчика), author (username автора)."""
+
+    model = Follow
+    date_field = None
+
+    def __init__(self):
+        self.users = LookupMap(User, 'username')
+
+    def build(self, rows):
+        self.users.resolve(
+            row.get(field) for row in rows for field in ('user', 'author')
+        )
+        users = self.users
+        pairs = {
+            (users.get(row.get('user')), users.get(row.get('author')))
+            for row in rows
+        }
+        pairs = {
+            (user_id, author_id) for user_id, author_id in pairs
+            if user_id is not None and author_id is not None
+            and user_id != author_id
+        }
+        # уже существующие подписки не трогаем, чтобы счётчики сошлись
+        existing = set(Follow.objects.filter(
+            user_id__in={user_id for user_id, _ in pairs},
+            author_id__in={author_id for _, author_id in pairs}
+        ).values_list('user_id', 'author_id'))
+        return [
+            Follow(user_id=user_id, author_id=author_id)
+            for user_id, author_id in pairs - existing
+        ]
+
+    def apply(self, follows):
+        authors = Counter(follow.author_id for follow in follows)
+        users = Counter(follow.user_id for follow in follows)
+        counters.change_many(
+            AuthorStats, 'followers_count', authors, key='user_id'
+        )
+        counters.change_many(
+            AuthorStats, 'following_count', users, key='user_id'
+        )
+        return [f'follows:{user_id}' for user_id in authors.keys() | users]
+
+
+IMPORTERS = {
+    'posts': PostImporter,
+    'comments': CommentImporter,
+    'follows': FollowImporter,
+}
+
+
+def guess_format(path):
+    return 'csv' if path.lower().endswith('.csv') else 'jsonl'
+
+
+def run(path, kind, file_format=None, batch_size=5000, restart=False,
+        progress=None):
+    """Импортирует файл порциями; возвращает (прочитано, записано).
+
+    progress(rows, written) вызывается после каждой записанной порции.
+    """
+    importer = IMPORTERS[kind]()
+    file_format = file_format or guess_format(path)
+    source = f'{kind}:{os.path.abspath(path)}'[-255:]
+    checkpoint, _ = ImportCheckpoint.objects.get_or_create(source=source)
+    if restart:
+        checkpoint.offset = checkpoint.rows = 0
+    elif checkpoint.offset > os.path.getsize(path):
+        raise ValueError(
+            f'Файл {path} короче сохранённой позиции '
+            f'{checkpoint.offset}: это другой файл, нужен --restart'
+        )
+    read = written = 0
+
+    def flush(batch, offset):
+        nonlocal written
+        objects = importer.build(batch)
+        with transaction.atomic():
+            insert(importer, objects)
+            tags = importer.apply(objects)
+            checkpoint.offset = offset
+            checkpoint.rows += len(batch)
+            checkpoint.save()
+        invalidate(*tags)
+        written += len(objects)
+        if progress is not None:
+            progress(read, written)
+
+    with open(path, 'rb') as handle:
+        batch = []
+        for row, offset in read_rows(handle, file_format, checkpoint.offset):
+            batch.append(row)
+            read += 1
+            if len(batch) >= batch_size:
+                flush(batch, offset)
+                batch = []
+        if batch:
+            flush(batch, offset)
+    if written:
+        bump_count_version()
+        if kind != 'comments' and timelines.timelines_enabled():
+            timelines.rebuild()
+    return read, written
@@ -0,0 +1,356 @@
+"""Нагрузочный прогон сайта от имени многих вошедших пользователей.
+
+Каждый виртуальный пользователь - поток со своими cookie: он выбирает
+действие по весам из смеси, выполняет запрос и запоминает время
+ответа. Запросы идут либо прямо в yatube.wsgi.application в этом
+процессе, либо по HTTP на запущенный сервер. Вход делается созданием
+сессии в хранилище сессий, без проверки пароля: хэширование пароля
+мерило бы не сайт, а PBKDF2.
+
+Действия post_create и add_comment пишут в базу, поэтому прогон со
+смесью, где они есть, стоит запускать на копии.
+"""
+import http.client
+import io
+import random
+import re
+import sys
+import threading
+import time
+from http.cookies import SimpleCookie
+from importlib import import_module
+from urllib.parse import unquote_to_bytes, urlencode, urlsplit
+
+from django.conf import settings  # type: ignore
+from django.contrib.auth import (  # type: ignore
+    BACKEND_SESSION_KEY,
+    HASH_SESSION_KEY,
+    SESSION_KEY
+)
+from django.urls import reverse  # type: ignore
+
+from .models import Follow, Group, Post, User
+
+CSRF_INPUT = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+# сколько id и имён брать для случайного выбора страниц
+SAMPLE_SIZE = 1000
+DEFAULT_MIX = {
+    'index': 30,
+    'group_posts': 15,
+    'profile': 15,
+    'post_detail': 20,
+    'follow_index': 15,
+    'post_create': 2,
+    'add_comment': 3,
+}
+PERCENTILES = (50, 95, 99)
+
+
+class InProcessTransport:
+    """Запросы прямо в WSGI-приложение, без сети."""
+
+    host = 'localhost'
+
+    def __init__(self):
+        from yatube.wsgi import application
+
+        self.application = application
+
+    def request(self, method, path, headers, body=b''):
+        path, _, query = path.partition('?')
+        environ = {
+            'REQUEST_METHOD': method,
+            # PEP 3333: путь раскодирован и передан как latin-1
+            'PATH_INFO': unquote_to_bytes(path).decode('latin-1'),
+            'QUERY_STRING': query,
+            'SERVER_NAME': self.host,
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'REMOTE_ADDR': '127.0.0.1',
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': 'http',
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        for name, value in headers.items():
+            key = name.upper().replace('-', '_')
+            if key != 'CONTENT_TYPE':
+                key = f'HTTP_{key}'
+            environ[key] = value
+        environ.setdefault('HTTP_HOST', self.host)
+        response = {}
+
+        def start_response(status, response_headers, exc_info=None):
+            response['status'] = int(status.split()[0])
+            response['headers'] = response_headers
+
+        result = self.application(environ, start_response)
+        try:
+            content = b''.join(result)
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+        return response['status'], response['headers'], content
+
+
+class HttpTransport:
+    """Запросы по HTTP; соединение своё у каждого потока."""
+
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.local = threading.local()
+
+    def request(self, method, path, headers, body=b''):
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = http.client.HTTPConnection(
+                self.host, self.port, timeout=30
+            )
+            self.local.connection = connection
+        try:
+            connection.request(method, path, body=body, headers=headers)
+            response = connection.getresponse()
+            content = response.read()
+        except (http.client.HTTPException, OSError):
+            connection.close()
+            self.local.connection = None
+            raise
+        return response.status, response.getheaders(), content
+
+
+def login_cookie(user):
+    """Cookie сессии вошедшего пользователя, как у Client.force_login."""
+    engine = import_module(settings.SESSION_ENGINE)
+    session = engine.SessionStore()
+    session[SESSION_KEY] = user._meta.pk.value_to_string(user)
+    session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+    session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    session.save()
+    return session.session_key
+
+
+def prepare_users(count, prefix, authors):
+    """Пользователи прогона с сессиями и подписками на авторов."""
+    users = []
+    for number in range(count):
+        user, _ = User.objects.get_or_create(username=f'{prefix}{number}')
+        for author_name in authors[:10]:
+            author = User.objects.get(username=author_name)
+            if author != user:
+                Follow.objects.get_or_create(user=user, author=author)
+        users.append((user, login_cookie(user)))
+    return users
+
+
+def sample_targets():
+    """Случайные, но существующие группы, авторы и записи."""
+    return {
+        'slugs': list(
+            Group.objects.values_list('slug', flat=True)[:SAMPLE_SIZE]
+        ),
+        'usernames': list(
+            Post.objects.order_by().values_list(
+                'author__username', flat=True
+            ).distinct()[:SAMPLE_SIZE]
+        ),
+        'post_ids': list(
+            Post.objects.values_list('pk', flat=True)[:SAMPLE_SIZE]
+        ),
+    }
+
+
+# действие: (метод, нужные данные, построитель адреса)
+ROUTES = {
+    'index': ('GET', None, lambda rng, targets: reverse('posts:index')),
+    'group_posts': ('GET', 'slugs', lambda rng, targets: reverse(
+        'posts:group', args=[rng.choice(targets['slugs'])]
+    )),
+    'profile': ('GET', 'usernames', lambda rng, targets: reverse(
+        'posts:profile', args=[rng.choice(targets['usernames'])]
+    )),
+    'post_detail': ('GET', 'post_ids', lambda rng, targets: reverse(
+        'posts:post_detail', args=[rng.choice(targets['post_ids'])]
+    )),
+    'follow_index': (
+        'GET', None, lambda rng, targets: reverse('posts:follow_index')
+    ),
+    'post_create': (
+        'POST', None, lambda rng, targets: reverse('posts:post_create')
+    ),
+    'add_comment': ('POST', 'post_ids', lambda rng, targets: reverse(
+        'posts:add_comment', args=[rng.choice(targets['post_ids'])]
+    )),
+}
+
+
+def parse_mix(value):
+    """Смесь «index=30,profile=10» -> {действие: вес}."""
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in ROUTES:
+            raise ValueError(
+                f'Неизвестное действие {name}, есть: {", ".join(ROUTES)}'
+            )
+        try:
+            mix[name] = float(weight or 1)
+        except ValueError:
+            raise ValueError(f'Неверный вес {part}')
+    return mix
+
+
+class VirtualUser:
+    """Один пользователь: свои cookie, свой генератор случайных чисел."""
+
+    def __init__(self, transport, session_key, targets, mix, seed):
+        self.transport = transport
+        self.targets = targets
+        self.routes = list(mix)
+        self.weights = [mix[name] for name in self.routes]
+        self.random = random.Random(seed)
+        self.cookies = {settings.SESSION_COOKIE_NAME: session_key}
+        self.csrf_token = None
+        self.results = []
+
+    def send(self, method, path, fields=None):
+        headers = {
+            'Host': self.transport.host,
+            'Cookie': '; '.join(
+                f'{name}={value}' for name, value in self.cookies.items()
+            ),
+        }
+        body = b''
+        if fields is not None:
+            body = urlencode(fields).encode()
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        status, response_headers, content = self.transport.request(
+            method, path, headers, body
+        )
+        for name, value in response_headers:
+            if name.lower() == 'set-cookie':
+                for morsel in SimpleCookie(value).values():
+                    self.cookies[morsel.key] = morsel.value
+        return status, content
+
+    def ensure_csrf(self):
+        # токен из формы и cookie берутся один раз, как у браузера
+        if self.csrf_token is None:
+            _, content = self.send('GET', reverse('posts:post_create'))
+            self.csrf_token = CSRF_INPUT.search(content.decode()).group(1)
+        return self.csrf_token
+
+    def form(self, name):
+        number = self.random.randrange(10 ** 6)
+        return {
+            'csrfmiddlewaretoken': self.ensure_csrf(),
+            'text': f'Нагрузочный прогон: {name} {number}',
+        }
+
+    def step(self):
+        name = self.random.choices(self.routes, self.weights)[0]
+        method, _, build = ROUTES[name]
+        path = build(self.random, self.targets)
+        fields = self.form(name) if method == 'POST' else None
+        started = time.perf_counter()
+        try:
+            status, _ = self.send(method, path, fields)
+            ok = status < 400
+        except (http.client.HTTPException, OSError):
+            ok = False
+        self.results.append((name, time.perf_counter() - started, ok))
+
+    def run(self, deadline, requests):
+        while time.monotonic() < deadline and (
+            requests is None or len(self.results) < requests
+        ):
+            self.step()
+
+
+def available_mix(mix, targets):
+    """Смесь без действий, для которых в базе нет данных."""
+    return {
+        name: weight for name, weight in mix.items()
+        if weight > 0 and (
+            ROUTES[name][1] is None or targets[ROUTES[name][1]]
+        )
+    }
+
+
+def percentile(values, percent):
+    """Значение по рангу (nearest-rank) в отсортированном списке."""
+    if not values:
+        return None
+    rank = max(1, -(-len(values) * percent // 100))
+    return values[int(rank) - 1]
+
+
+def summarize(results, elapsed):
+    routes = {}
+    for name, latency, ok in results:
+        route = routes.setdefault(name, {'latencies': [], 'errors': 0})
+        route['latencies'].append(latency)
+        route['errors'] += not ok
+    report = {}
+    for name, route in sorted(routes.items()):
+        latencies = sorted(route['latencies'])
+        report[name] = {
+            'requests': len(latencies),
+            'errors': route['errors'],
+            'rps': round(len(latencies) / elapsed, 2),
+            **{
+                f'p{percent}_ms': round(
+                    percentile(latencies, percent) * 1000, 2
+                )
+                for percent in PERCENTILES
+            },
+            'max_ms': round(latencies[-1] * 1000, 2),
+        }
+    return {
+        'requests': len(results),
+        'errors': sum(not ok for _, _, ok in results),
+        'rps': round(len(results) / elapsed, 2),
+        'elapsed_s': round(elapsed, 3),
+        'routes': report,
+    }
+
+
+def run(transport, users, mix, seconds, requests=None, seed=0,
+        prefix='loadtest-'):
+    """Прогоняет смесь и возвращает сводку для JSON."""
+    targets = sample_targets()
+    mix = available_mix(mix, targets)
+    if not mix:
+        raise ValueError('В базе нет данных ни для одного действия смеси')
+    sessions = prepare_users(users, prefix, targets['usernames'])
+    workers = [
+        VirtualUser(transport, session_key, targets, mix, seed + number)
+        for number, (_, session_key) in enumerate(sessions)
+    ]
+    started = time.monotonic()
+    deadline = started + seconds
+    if len(workers) == 1:
+        # один пользователь - последовательный замер без потоков
+        workers[0].run(deadline, requests)
+    else:
+        threads = [
+            threading.Thread(target=worker.run, args=(deadline, requests))
+            for worker in workers
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    elapsed = time.monotonic() - started
+    results = [result for worker in workers for result in worker.results]
+    return {
+        'users': users,
+        'mix': mix,
+        **summarize(results, elapsed),
+    }
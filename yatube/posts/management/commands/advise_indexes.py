@@ -0,0 +1,211 @@
+from django.contrib.auth import get_user_model  # type: ignore
+from django.core.cache import caches  # type: ignore
+from django.core.management.base import (  # type: ignore
+    BaseCommand,
+    CommandError
+)
+from django.db import connection, transaction  # type: ignore
+from django.test import Client, override_settings  # type: ignore
+from django.test.utils import CaptureQueriesContext  # type: ignore
+from django.urls import reverse  # type: ignore
+
+from core.scratch_db import scratch_copy
+from posts import counters, query_plans, timelines
+from posts import urls as posts_urls
+from posts.functions import bump_count_version
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+# запрос для страниц, которым без него нечего искать
+QUERY_PARAMS = {
+    'search': {'q': 'запись'},
+}
+# кэш страниц спрятал бы запросы, поэтому на время замера он свой
+LOCAL_CACHES = {
+    alias: {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': f'advise-indexes-{alias}',
+    }
+    for alias in ('default', 'thumbnails')
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Открывает каждую страницу posts.urls на временных данных, '
+        'проверяет планы её SQL-запросов (EXPLAIN QUERY PLAN) и '
+        'предлагает индексы для Meta.indexes. Завершается с ошибкой, '
+        'если запрос читает большую таблицу целиком. Данные и ANALYZE '
+        'пишутся во временный файл SQLite со схемой рабочей базы, '
+        'рабочая база не блокируется и не меняется.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--authors',
+            type=int,
+            default=20,
+            help='Сколько авторов создать.'
+        )
+        parser.add_argument(
+            '--posts',
+            type=int,
+            default=100,
+            help='Сколько записей у каждого автора.'
+        )
+        parser.add_argument(
+            '--comments',
+            type=int,
+            default=5,
+            help='Сколько комментариев у каждой записи.'
+        )
+        parser.add_argument(
+            '--min-rows',
+            type=int,
+            default=1000,
+            help='С какого числа строк таблица считается большой.'
+        )
+
+    def seed(self, options):
+        with transaction.atomic():
+            return self.create_rows(options)
+
+    def create_rows(self, options):
+        reader = User.objects.create_user(username='advisor-reader')
+        group = Group.objects.create(
+            title='Группа для планов', slug='advisor-group'
+        )
+        User.objects.bulk_create(
+            User(username=f'advisor-author-{number}')
+            for number in range(options['authors'])
+        )
+        authors = list(
+            User.objects.filter(username__startswith='advisor-author-')
+        )
+        Follow.objects.bulk_create(
+            Follow(user=reader, author=author) for author in authors
+        )
+        Post.objects.bulk_create(
+            (
+                Post(
+                    author=author,
+                    text=f'Запись {number}',
+                    group=group if number % 2 else None
+                )
+                for author in authors
+                for number in range(options['posts'])
+            ),
+            batch_size=500
+        )
+        post = Post.objects.filter(author=authors[0]).first()
+        Comment.objects.bulk_create(
+            (
+                Comment(post_id=post_id, author=reader, text='Комментарий')
+                for post_id in Post.objects.values_list('pk', flat=True)
+                for _ in range(options['comments'])
+            ),
+            batch_size=500
+        )
+        counters.reconcile_posts(chunk_size=10000)
+        counters.reconcile_groups(chunk_size=10000)
+        counters.reconcile_users(chunk_size=10000)
+        if timelines.timelines_enabled():
+            timelines.rebuild()
+        bump_count_version()
+        return reader, {
+            'slug': group.slug,
+            'username': authors[0].username,
+            'post_id': post.pk,
+            'feed_format': 'rss',
+        }
+
+    def big_tables(self, min_rows):
+        tables = set()
+        with connection.cursor() as cursor:
+            for model in (User, Group, Post, Comment, Follow):
+                table = model._meta.db_table
+                cursor.execute(f'SELECT COUNT(*) FROM "{table}"')
+                if cursor.fetchone()[0] >= min_rows:
+                    tables.add(table)
+        return tables
+
+    def render(self, client, pattern, values):
+        """SELECT-запросы одной страницы без повторов."""
+        kwargs = {name: values[name] for name in pattern.pattern.converters}
+        url = reverse(f'{posts_urls.app_name}:{pattern.name}', kwargs=kwargs)
+        with CaptureQueriesContext(connection) as context:
+            client.get(url, QUERY_PARAMS.get(pattern.name, {}))
+        queries = []
+        for query in context.captured_queries:
+            sql = query['sql']
+            if sql.startswith('SELECT') and sql not in queries:
+                queries.append(sql)
+        return queries
+
+    def report(self, name, problems):
+        for problem in problems:
+            self.stdout.write(
+                f'{name}: {problem.label} {problem.table}\n'
+                f'  {problem.sql[:300]}'
+            )
+            for detail in problem.plan:
+                self.stdout.write(f'    {detail}')
+
+    def analyze(self, options):
+        for alias in LOCAL_CACHES:
+            caches[alias].clear()
+        reader, values = self.seed(options)
+        # планировщик выбирает индексы по статистике таблиц
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        big_tables = self.big_tables(options['min_rows'])
+        client = Client()
+        client.force_login(reader)
+        found = []
+        for pattern in posts_urls.urlpatterns:
+            name = f'{posts_urls.app_name}:{pattern.name}'
+            problems = []
+            for sql in self.render(client, pattern, values):
+                plan = query_plans.explain(sql)
+                problems += query_plans.find_problems(sql, plan, big_tables)
+            self.report(name, problems)
+            found += problems
+        return found
+
+    def propose(self, problems):
+        proposals = {}
+        for problem in problems:
+            if problem.model is None or not problem.fields:
+                continue
+            existing = query_plans.existing_index(
+                problem.model, problem.fields
+            )
+            if existing:
+                # индекс описан в модели, но его нет в базе или
+                # планировщик предпочёл другой путь
+                line = f'# {existing} уже в Meta.indexes, но не используется'
+            else:
+                line = query_plans.render_index(problem.model, problem.fields)
+            proposals.setdefault(problem.model._meta.label, set()).add(line)
+        for label, lines in sorted(proposals.items()):
+            self.stdout.write(f'{label}.Meta.indexes:')
+            for line in sorted(lines):
+                self.stdout.write(f'    {line}')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Планы запросов разбираются только для SQLite')
+        with scratch_copy(connection), override_settings(
+            CACHES=LOCAL_CACHES, DEBUG=False
+        ):
+            problems = self.analyze(options)
+        self.propose(problems)
+        scans = [problem for problem in problems if problem.kind == 'scan']
+        if scans:
+            raise CommandError(
+                f'Полный просмотр большой таблицы в запросах: {len(scans)}'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Полных просмотров нет, сортировок без индекса: {len(problems)}'
+        ))
@@ -0,0 +1,128 @@
+import time
+
+from django.conf import settings  # type: ignore
+from django.contrib.auth import get_user_model  # type: ignore
+from django.core.cache import caches  # type: ignore
+from django.core.management.base import (  # type: ignore
+    BaseCommand,
+    CommandError
+)
+from django.db import connection, transaction  # type: ignore
+from django.test import override_settings  # type: ignore
+
+from core.scratch_db import scratch_copy
+from posts.functions import get_page
+from posts.models import Follow, Post
+from posts.timelines import MergedFollowPaginator
+
+
+User = get_user_model()
+
+# свой кэш на время замера: общий не трогается, а количество записей
+# в ленте не переходит от одного размера к другому
+LOCAL_CACHES = {
+    alias: {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': f'benchmark-follow-feed-{alias}',
+    }
+    for alias in ('default', 'thumbnails')
+}
+
+
+class FakeRequest:
+    GET = {}
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает ленту подписок через JOIN и слиянием лент авторов '
+        'на временных данных. Данные пишутся во временный файл SQLite '
+        'со схемой рабочей базы, рабочая база не блокируется и не меняется.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--authors',
+            type=int,
+            nargs='+',
+            default=[10, 100, 1000],
+            help='Сколько авторов у читателя в подписках.'
+        )
+        parser.add_argument(
+            '--posts',
+            type=int,
+            default=20,
+            help='Сколько записей у каждого автора.'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Сколько раз строить первую страницу.'
+        )
+
+    def measure(self, build, repeat):
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            list(build())
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best * 1000
+
+    def seed(self, authors, posts_per_author):
+        prefix = f'benchmark-{authors}-'
+        reader = User.objects.create_user(username=f'{prefix}reader')
+        User.objects.bulk_create(
+            User(username=f'{prefix}author-{number}')
+            for number in range(authors)
+        )
+        users = User.objects.filter(username__startswith=f'{prefix}author-')
+        Follow.objects.bulk_create(
+            Follow(user=reader, author=author) for author in users
+        )
+        Post.objects.bulk_create(
+            (
+                Post(author=author, text=f'Запись {number}')
+                for author in users
+                for number in range(posts_per_author)
+            ),
+            batch_size=500
+        )
+        return reader
+
+    def compare(self, authors, options):
+        for alias in LOCAL_CACHES:
+            caches[alias].clear()
+        # каждый размер - на пустых таблицах, данные откатываются
+        with transaction.atomic():
+            reader = self.seed(authors, options['posts'])
+
+            def join():
+                post_list = Post.objects.select_related(
+                    'author'
+                ).filter(author__following__user=reader)
+                return get_page(FakeRequest(), post_list)
+
+            def merge():
+                return MergedFollowPaginator(
+                    reader, settings.POSTS_PER_PAGE
+                ).get_page()
+
+            join_ms = self.measure(join, options['repeat'])
+            merge_ms = self.measure(merge, options['repeat'])
+            transaction.set_rollback(True)
+        return join_ms, merge_ms
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Замер идёт во временной базе SQLite')
+        self.stdout.write('authors\tjoin, ms\tmerge, ms')
+        with scratch_copy(connection), override_settings(
+            CACHES=LOCAL_CACHES
+        ):
+            for authors in options['authors']:
+                join_ms, merge_ms = self.compare(authors, options)
+                self.stdout.write(
+                    f'{authors}\t{join_ms:.1f}\t{merge_ms:.1f}'
+                )
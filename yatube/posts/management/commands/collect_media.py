@@ -0,0 +1,97 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand  # type: ignore
+from django.db.models import Count  # type: ignore
+from django.utils import timezone  # type: ignore
+from sorl.thumbnail import delete as delete_thumbnails  # type: ignore
+
+from posts.models import MediaBlob, Post
+
+
+class Command(BaseCommand):
+    help = 'Удаляет файлы картинок, на которые не ссылается ни одна запись.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace',
+            type=float,
+            default=24,
+            help=(
+                'Сколько часов файл без ссылок не трогается: загрузка '
+                'сохраняет файл раньше, чем запись.'
+            )
+        )
+        parser.add_argument(
+            '--recount',
+            action='store_true',
+            help='Сначала пересчитать ссылки по таблице записей.'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Сколько файлов пересчитывать за раз.'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать, что было бы удалено.'
+        )
+
+    def recount(self, chunk_size):
+        fixed = 0
+        last_pk = 0
+        while True:
+            blobs = list(
+                MediaBlob.objects.filter(pk__gt=last_pk).order_by(
+                    'pk'
+                ).values_list('pk', 'name', 'refcount')[:chunk_size]
+            )
+            if not blobs:
+                return fixed
+            last_pk = blobs[-1][0]
+            counts = dict(
+                Post.objects.filter(
+                    image__in=[name for _, name, _ in blobs]
+                ).order_by().values('image').annotate(
+                    count=Count('pk')
+                ).values_list('image', 'count')
+            )
+            for pk, name, refcount in blobs:
+                if counts.get(name, 0) != refcount:
+                    MediaBlob.objects.filter(pk=pk).update(
+                        refcount=counts.get(name, 0)
+                    )
+                    fixed += 1
+
+    def handle(self, *args, **options):
+        if options['recount']:
+            fixed = self.recount(options['chunk_size'])
+            self.stdout.write(f'Исправлено счётчиков ссылок: {fixed}')
+
+        cutoff = timezone.now() - timedelta(hours=options['grace'])
+        unused = MediaBlob.objects.filter(refcount=0, updated__lt=cutoff)
+        storage = Post._meta.get_field('image').storage
+        removed = freed = 0
+        for blob in unused.iterator():
+            # ссылка могла появиться после пересчёта
+            if Post.objects.filter(image=blob.name).exists():
+                continue
+            if options['dry_run']:
+                self.stdout.write(blob.name)
+                continue
+            # повторная загрузка того же файла обновляет updated, и
+            # тогда строка не удалится, а файл останется
+            claimed, _ = MediaBlob.objects.filter(
+                pk=blob.pk, refcount=0, updated__lt=cutoff
+            ).delete()
+            if not claimed:
+                continue
+            if storage.exists(blob.name):
+                freed += storage.size(blob.name)
+                delete_thumbnails(blob.name, delete_file=False)
+                storage.delete(blob.name)
+            removed += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Удалено файлов: {removed}, освобождено байт: {freed}'
+        ))
@@ -0,0 +1,70 @@
+from django.conf import settings  # type: ignore
+from django.core.management.base import BaseCommand  # type: ignore
+
+from posts import thumbnails
+from posts.models import Post
+from posts.presets import WEBP, formats, get_preset
+
+
+class Command(BaseCommand):
+    help = (
+        'Считает байты картинок первой страницы ленты, которые скачает '
+        'браузер с заданной шириной экрана.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--viewports',
+            type=int,
+            nargs='+',
+            default=[360, 768, 1280],
+            help='Ширины экранов в CSS-пикселях.'
+        )
+        parser.add_argument(
+            '--density',
+            type=int,
+            default=2,
+            help='Плотность пикселей экрана.'
+        )
+        parser.add_argument(
+            '--preset',
+            default='card',
+            help='Пресет картинок ленты.'
+        )
+
+    def handle(self, *args, **options):
+        preset = get_preset(options['preset'])
+        names = Post.objects.exclude(image='').values_list(
+            'image', flat=True
+        )[:settings.POSTS_PER_PAGE]
+        pictures = thumbnails.pictures(names, preset).values()
+        if not pictures:
+            self.stdout.write('В ленте нет картинок')
+            return
+
+        def page_bytes(width, fmt):
+            return sum(
+                picture.files[width, fmt].storage.size(
+                    picture.files[width, fmt].name
+                )
+                for picture in pictures
+            )
+
+        main = formats()[0]
+        # до пресетов каждый экран получал самый широкий вариант
+        baseline = page_bytes(preset.widths[-1], main)
+        self.stdout.write(
+            f'{len(pictures)} картинок, {preset.widths[-1]}w {main}: '
+            f'{baseline} байт'
+        )
+        for viewport in options['viewports']:
+            width = preset.choose(viewport, options['density'])
+            for fmt in formats():
+                size = page_bytes(width, fmt)
+                saved = 100 - round(size * 100 / baseline) if baseline else 0
+                self.stdout.write(
+                    f'{viewport}px x{options["density"]}: {width}w {fmt} '
+                    f'{size} байт (-{saved}%)'
+                )
+        if WEBP not in formats():
+            self.stdout.write('Pillow собран без WebP, вариантов WebP нет')
@@ -0,0 +1,48 @@
+from django.conf import settings  # type: ignore
+from django.core.management.base import BaseCommand  # type: ignore
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Заранее готовит миниатюры для всех картинок записей.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=settings.THUMBNAIL_WORKERS,
+            help='Сколько картинок обрабатывать параллельно.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Сколько имён картинок читать из базы за один запрос.'
+        )
+        parser.add_argument(
+            '--progress-every',
+            type=int,
+            default=100,
+            help='Как часто сообщать о ходе работы, в картинках.'
+        )
+
+    def handle(self, *args, **options):
+        names = Post.objects.exclude(image='').order_by().values_list(
+            'image', flat=True
+        ).distinct()
+        total = names.count()
+        done = failed = 0
+        for ok in thumbnails.generate_many(
+            thumbnails.image_names(options['batch_size']), options['workers']
+        ):
+            done += 1
+            failed += not ok
+            if done % options['progress_every'] == 0:
+                self.stdout.write(f'{done}/{total}')
+        self.stdout.write(f'{done}/{total}, ошибок: {failed}')
+        if failed:
+            self.stdout.write(self.style.ERROR('Часть миниатюр не готова'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Миниатюры готовы'))
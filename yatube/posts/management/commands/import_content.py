@@ -0,0 +1,72 @@
+import time
+
+from django.core.management.base import (  # type: ignore
+    BaseCommand,
+    CommandError
+)
+
+from posts import importer
+
+
+class Command(BaseCommand):
+    help = (
+        'Импортирует записи, комментарии или подписки из JSONL или CSV '
+        'порциями и продолжает с места остановки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(importer.IMPORTERS))
+        parser.add_argument('path', help='Файл .jsonl или .csv.')
+        parser.add_argument(
+            '--format',
+            choices=('jsonl', 'csv'),
+            help='Формат файла, если его не видно по расширению.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Сколько строк записывать за одну транзакцию.'
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Начать файл сначала, забыв сохранённую позицию.'
+        )
+        parser.add_argument(
+            '--progress-every',
+            type=int,
+            default=100_000,
+            help='Как часто, в строках, печатать скорость.'
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        reported = 0
+
+        def progress(read, written):
+            nonlocal reported
+            if read - reported >= options['progress_every']:
+                reported = read
+                self.stdout.write(
+                    f'{read} строк, записано {written}, '
+                    f'{read / (time.monotonic() - started):.0f} строк/с'
+                )
+
+        try:
+            read, written = importer.run(
+                options['path'],
+                options['kind'],
+                file_format=options['format'],
+                batch_size=options['batch_size'],
+                restart=options['restart'],
+                progress=progress,
+            )
+        except (OSError, ValueError) as error:
+            raise CommandError(error)
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Прочитано строк: {read}, записано: {written}, '
+            f'пропущено: {read - written}, '
+            f'{read / elapsed if elapsed else 0:.0f} строк/с'
+        ))
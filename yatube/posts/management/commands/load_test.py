@@ -0,0 +1,96 @@
+import json
+
+from django.conf import settings  # type: ignore
+from django.core.management.base import (  # type: ignore
+    BaseCommand,
+    CommandError
+)
+
+from posts import loadtest
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный прогон: много вошедших пользователей параллельно '
+        'открывают ленты и записи и пишут по смеси действий, в конце - '
+        'JSON с RPS и p50/p95/p99 по каждому действию. Действия '
+        'post_create и add_comment пишут в базу.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url',
+            help=(
+                'Адрес запущенного сервера, например http://127.0.0.1:8000; '
+                'без него запросы идут в yatube.wsgi.application в этом '
+                'процессе.'
+            )
+        )
+        parser.add_argument(
+            '--users',
+            type=int,
+            default=20,
+            help='Сколько пользователей работают одновременно.'
+        )
+        parser.add_argument(
+            '--seconds',
+            type=float,
+            default=10,
+            help='Сколько длится прогон.'
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            help='Сколько запросов делает каждый пользователь (предел).'
+        )
+        parser.add_argument(
+            '--mix',
+            default=','.join(
+                f'{name}={weight}'
+                for name, weight in loadtest.DEFAULT_MIX.items()
+            ),
+            help='Веса действий: index=30,profile=15,add_comment=3.'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Начальное значение генератора случайных чисел.'
+        )
+        parser.add_argument(
+            '--output',
+            help='Файл для JSON; по умолчанию - стандартный вывод.'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            mix = loadtest.parse_mix(options['mix'])
+        except ValueError as error:
+            raise CommandError(error)
+        if options['url']:
+            transport = loadtest.HttpTransport(options['url'])
+        else:
+            if settings.DEBUG:
+                self.stderr.write(
+                    'DEBUG включён: debug_toolbar и журнал SQL исказят '
+                    'замеры'
+                )
+            transport = loadtest.InProcessTransport()
+        try:
+            report = loadtest.run(
+                transport, options['users'], mix, options['seconds'],
+                requests=options['requests'], seed=options['seed']
+            )
+        except ValueError as error:
+            raise CommandError(error)
+        report['target'] = options['url'] or 'yatube.wsgi.application'
+        text = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                output.write(text + '\n')
+            self.stdout.write(self.style.SUCCESS(
+                f'{report["requests"]} запросов, {report["rps"]} RPS: '
+                f'{options["output"]}'
+            ))
+        else:
+            self.stdout.write(text)
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand  # type: ignore
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает полнотекстовый индекс записей.'
+
+    def handle(self, *args, **options):
+        if not search.search_enabled():
+            self.stdout.write('Индекс FTS5 есть только у SQLite')
+            return
+        indexed = search.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(f'Проиндексировано записей: {indexed}')
+        )
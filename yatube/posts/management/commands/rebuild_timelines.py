@@ -0,0 +1,31 @@
+from django.contrib.auth import get_user_model  # type: ignore
+from django.core.management.base import BaseCommand  # type: ignore
+
+from posts import timelines
+
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает материализованные ленты подписок.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'usernames',
+            nargs='*',
+            help='Пересобрать ленты только этих пользователей.'
+        )
+
+    def handle(self, *args, **options):
+        user_ids = None
+        if options['usernames']:
+            user_ids = list(
+                User.objects.filter(
+                    username__in=options['usernames']
+                ).values_list('pk', flat=True)
+            )
+        rebuilt = timelines.rebuild(user_ids)
+        self.stdout.write(
+            self.style.SUCCESS(f'Пересобрано лент: {rebuilt}')
+        )
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand  # type: ignore
+
+from posts import counters
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает денормализованные счётчики порциями.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Сколько строк проверять за одну транзакцию.'
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        for name, reconcile in (
+            ('сообщения', counters.reconcile_posts),
+            ('группы', counters.reconcile_groups),
+            ('пользователи', counters.reconcile_users),
+        ):
+            fixed = reconcile(chunk_size)
+            self.stdout.write(f'{name}: исправлено {fixed}')
+        self.stdout.write(self.style.SUCCESS('Счётчики сверены'))
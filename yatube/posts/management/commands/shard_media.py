@@ -0,0 +1,79 @@
+from django.core.management.base import BaseCommand  # type: ignore
+from django.db import transaction  # type: ignore
+from django.db.models import Count, F  # type: ignore
+
+from posts import thumbnails
+from posts.models import MediaBlob, Post
+from posts.storage import SHARDED_NAME
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит картинки записей в каталоги по хешу содержимого. '
+        'Прерванный перенос продолжается повторным запуском.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Сколько файлов переносить за одну транзакцию.'
+        )
+
+    def legacy_names(self, batch_size):
+        """Старые имена порциями; перенесённые имена сюда не попадают."""
+        last = ''
+        while True:
+            names = list(
+                Post.objects.exclude(image='').exclude(
+                    image__regex=SHARDED_NAME.pattern
+                ).filter(image__gt=last).order_by('image').values_list(
+                    'image', flat=True
+                ).distinct()[:batch_size]
+            )
+            if not names:
+                return
+            last = names[-1]
+            yield names
+
+    def move(self, storage, old):
+        """Копирует файл под новое имя и переводит на него записи.
+
+        Старый файл не удаляется сразу: он получает строку MediaBlob
+        без ссылок и уходит с ближайшим collect_media вместе со своими
+        миниатюрами. Так сбой в любой момент оставляет базу целой.
+        """
+        with storage.open(old) as content:
+            # сохранение по хешу: копия уже есть - файл не пишется
+            new = storage.save(old, content)
+        with transaction.atomic():
+            moved = Post.objects.filter(image=old).update(image=new)
+            MediaBlob.objects.filter(name=new).update(
+                refcount=F('refcount') + moved
+            )
+            MediaBlob.objects.update_or_create(
+                name=old, defaults={'refcount': 0}
+            )
+            thumbnails.schedule(new)
+        return moved
+
+    def handle(self, *args, **options):
+        storage = Post._meta.get_field('image').storage
+        files = posts = missing = 0
+        for names in self.legacy_names(options['batch_size']):
+            for old in names:
+                if not storage.exists(old):
+                    missing += 1
+                    self.stderr.write(f'Нет файла: {old}')
+                    continue
+                posts += self.move(storage, old)
+                files += 1
+            self.stdout.write(f'Перенесено файлов: {files}, записей: {posts}')
+        remaining = Post.objects.exclude(image='').exclude(
+            image__regex=SHARDED_NAME.pattern
+        ).aggregate(count=Count('image', distinct=True))['count']
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово: файлов {files}, записей {posts}, '
+            f'без файла {missing}, осталось старых имён {remaining}'
+        ))
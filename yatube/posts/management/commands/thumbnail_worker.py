@@ -0,0 +1,46 @@
+import time
+
+from django.conf import settings  # type: ignore
+from django.core.management.base import BaseCommand  # type: ignore
+
+from posts import thumbnails
+
+
+class Command(BaseCommand):
+    help = 'Готовит миниатюры для картинок из очереди.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=settings.THUMBNAIL_WORKERS,
+            help='Сколько картинок обрабатывать параллельно.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Сколько задач забирать из очереди за раз.'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=1.0,
+            help='Пауза между проверками пустой очереди, в секундах.'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Разобрать очередь и выйти.'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            done, failed = thumbnails.process_queue(
+                options['workers'], options['batch_size']
+            )
+            if done or failed:
+                self.stdout.write(f'готово: {done}, ошибок: {failed}')
+            if options['once']:
+                return
+            time.sleep(options['interval'])
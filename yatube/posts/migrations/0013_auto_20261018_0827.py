@@ -0,0 +1,79 @@
+# Generated by Django 2.2.16 on 2026-10-18 08:27
+
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+CHUNK_SIZE = 1000
+
+
+def backfill(model, field, related, key, alias):
+    """Пересчитывает счётчик по диапазонам id, порция за порцией."""
+    last = (
+        model.objects.using(alias).order_by('-pk')
+        .values_list('pk', flat=True).first()
+    )
+    start = 1
+    while last is not None and start <= last:
+        end = start + CHUNK_SIZE - 1
+        counts = (
+            related.objects.using(alias)
+            .filter(**{f'{key}__gte': start, f'{key}__lte': end})
+            .order_by().values_list(key).annotate(models.Count('pk'))
+        )
+        ids_by_count = defaultdict(list)
+        for pk, count in counts:
+            ids_by_count[count].append(pk)
+        for count, ids in ids_by_count.items():
+            model.objects.using(alias).filter(pk__in=ids).update(
+                **{field: count}
+            )
+        start = end + 1
+
+
+def backfill_counters(apps, schema_editor):
+    alias = schema_editor.connection.alias
+    Comment = apps.get_model('posts', 'Comment')
+    Group = apps.get_model('posts', 'Group')
+    Post = apps.get_model('posts', 'Post')
+    backfill(Post, 'comments_count', Comment, 'post', alias)
+    backfill(Group, 'posts_count', Post, 'group', alias)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0012_auto_20261018_0825'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='group',
+            name='posts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='число сообщений'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='число комментариев'),
+        ),
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='число сообщений')),
+                ('followers_count', models.PositiveIntegerField(default=0, verbose_name='число подписчиков')),
+                ('following_count', models.PositiveIntegerField(default=0, verbose_name='число подписок')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to=settings.AUTH_USER_MODEL, verbose_name='пользователь')),
+            ],
+            options={
+                'verbose_name': 'счётчики пользователя',
+                'verbose_name_plural': 'счётчики пользователей',
+            },
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
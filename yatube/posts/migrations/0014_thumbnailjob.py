@@ -0,0 +1,25 @@
+# Generated by Django 2.2.16 on 2026-10-18 08:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_auto_20261018_0827'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ThumbnailJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('image', models.CharField(max_length=100, unique=True, verbose_name='картинка')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='поставлена в очередь')),
+            ],
+            options={
+                'verbose_name': 'задача на миниатюры',
+                'verbose_name_plural': 'задачи на миниатюры',
+            },
+        ),
+    ]
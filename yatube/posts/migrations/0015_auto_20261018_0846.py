@@ -0,0 +1,36 @@
+# Generated by Django 2.2.16 on 2026-10-18 08:46
+
+from django.db import migrations, models
+import posts.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_thumbnailjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True, verbose_name='файл')),
+                ('refcount', models.PositiveIntegerField(default=0, verbose_name='число ссылок')),
+                ('updated', models.DateTimeField(auto_now=True, verbose_name='изменён')),
+            ],
+            options={
+                'verbose_name': 'файл картинки',
+                'verbose_name_plural': 'файлы картинок',
+            },
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(blank=True, help_text='Изображение', storage=posts.storage.ContentAddressedStorage(), upload_to='posts/', verbose_name='картинка'),
+        ),
+        migrations.AddIndex(
+            model_name='mediablob',
+            index=models.Index(fields=['refcount', 'updated'], name='media_blob_unused_idx'),
+        ),
+    ]
@@ -0,0 +1,58 @@
+from django.db import migrations
+
+
+class SQLiteRunSQL(migrations.RunSQL):
+    """RunSQL только для SQLite: на других СУБД поиск без FTS5."""
+
+    def database_forwards(self, app_label, schema_editor, from_state,
+                          to_state):
+        if schema_editor.connection.vendor == 'sqlite':
+            super().database_forwards(
+                app_label, schema_editor, from_state, to_state
+            )
+
+    def database_backwards(self, app_label, schema_editor, from_state,
+                           to_state):
+        if schema_editor.connection.vendor == 'sqlite':
+            super().database_backwards(
+                app_label, schema_editor, from_state, to_state
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_auto_20261018_0846'),
+    ]
+
+    operations = [
+        SQLiteRunSQL(
+            sql=[
+                "CREATE VIRTUAL TABLE IF NOT EXISTS posts_post_fts USING "
+                "fts5(text, content='posts_post', content_rowid='id', "
+                "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+                "CREATE TRIGGER IF NOT EXISTS posts_post_fts_insert "
+                "AFTER INSERT ON posts_post BEGIN "
+                "INSERT INTO posts_post_fts(rowid, text) "
+                "VALUES (new.id, new.text); END",
+                "CREATE TRIGGER IF NOT EXISTS posts_post_fts_delete "
+                "AFTER DELETE ON posts_post BEGIN "
+                "INSERT INTO posts_post_fts(posts_post_fts, rowid, text) "
+                "VALUES ('delete', old.id, old.text); END",
+                "CREATE TRIGGER IF NOT EXISTS posts_post_fts_update "
+                "AFTER UPDATE OF text ON posts_post BEGIN "
+                "INSERT INTO posts_post_fts(posts_post_fts, rowid, text) "
+                "VALUES ('delete', old.id, old.text); "
+                "INSERT INTO posts_post_fts(rowid, text) "
+                "VALUES (new.id, new.text); END",
+                "INSERT INTO posts_post_fts(posts_post_fts) "
+                "VALUES ('rebuild')",
+            ],
+            reverse_sql=[
+                'DROP TRIGGER IF EXISTS posts_post_fts_insert',
+                'DROP TRIGGER IF EXISTS posts_post_fts_delete',
+                'DROP TRIGGER IF EXISTS posts_post_fts_update',
+                'DROP TABLE IF EXISTS posts_post_fts',
+            ],
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 2.2.16 on 2026-10-18 08:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_auto_20261018_0852'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportCheckpoint',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=255, unique=True, verbose_name='источник')),
+                ('offset', models.BigIntegerField(default=0, verbose_name='смещение в байтах')),
+                ('rows', models.BigIntegerField(default=0, verbose_name='прочитано строк')),
+                ('updated', models.DateTimeField(auto_now=True, verbose_name='изменён')),
+            ],
+            options={
+                'verbose_name': 'позиция импорта',
+                'verbose_name_plural': 'позиции импорта',
+            },
+        ),
+    ]
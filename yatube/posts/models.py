@@ -2,6 +2,8 @@ from django.conf import settings  # type: ignore
 from django.db import models  # type: ignore
 from django.contrib.auth import get_user_model  # type: ignore
 
+from .storage import ContentAddressedStorage
+
 
 User = get_user_model()
 
@@ -14,6 +16,11 @@ class Group(models.Model):
         verbose_name='идентификатор'
     )
     description = models.TextField(verbose_name='Описание группы')
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='число сообщений'
+    )
 
     def __str__(self) -> str:
         return self.title
@@ -50,15 +57,35 @@ class Post(models.Model):
 
     image = models.ImageField(
         upload_to='posts/',
+        storage=ContentAddressedStorage(),
         blank=True,
         verbose_name='картинка',
         help_text='Изображение'
     )
+    comments_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='число комментариев'
+    )
 
     class Meta:
-        ordering = ('-pub_date',)
+        ordering = ('-pub_date', '-id')
         verbose_name = 'сообщение'
         verbose_name_plural = 'сообщения'
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='post_feed_idx'
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_feed_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_feed_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text[:settings.POSTS_TEXT_LEN]
@@ -92,6 +119,18 @@ class Comment(models.Model):
         ordering = ('-created',)
         verbose_name = 'комментарий'
         verbose_name_plural = 'комментарии'
+        indexes = [
+            # порядок списка в админке и переходы по датам
+            models.Index(
+                fields=['-created', '-id'],
+                name='comment_created_idx'
+            ),
+            # комментарии записи по дате без сортировки в памяти
+            models.Index(
+                fields=['post', '-created', '-id'],
+                name='comment_post_feed_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text
@@ -125,3 +164,125 @@ class Follow(models.Model):
                 name='author not own follower'
             ),
         ]
+
+
+class AuthorStats(models.Model):
+    """Счётчики пользователя, которые поддерживаются при записи."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='stats',
+        verbose_name='пользователь'
+    )
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='число сообщений'
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='число подписчиков'
+    )
+    following_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='число подписок'
+    )
+
+    class Meta:
+        verbose_name = 'счётчики пользователя'
+        verbose_name_plural = 'счётчики пользователей'
+
+
+class TimelineEntry(models.Model):
+    """Запись в материализованной ленте подписок пользователя."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='читатель'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='сообщение'
+    )
+    pub_date = models.DateTimeField(verbose_name='дата публикации')
+
+    class Meta:
+        verbose_name = 'запись ленты'
+        verbose_name_plural = 'записи ленты'
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_feed_idx'
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique timeline entry'
+            ),
+        ]
+
+
+class PullAuthor(models.Model):
+    """Автор с большим числом подписчиков.
+
+    Его записи не рассылаются по лентам, а подмешиваются при чтении.
+    """
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='pull_author',
+        verbose_name='автор'
+    )
+
+    class Meta:
+        verbose_name = 'автор без рассылки'
+        verbose_name_plural = 'авторы без рассылки'
+
+
+class ThumbnailJob(models.Model):
+    """Картинка, для которой ещё не приготовлены миниатюры.
+
+    Очередь разбирает команда thumbnail_worker.
+    """
+    image = models.CharField('картинка', max_length=100, unique=True)
+    created = models.DateTimeField('поставлена в очередь', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'задача на миниатюры'
+        verbose_name_plural = 'задачи на миниатюры'
+
+
+class MediaBlob(models.Model):
+    """Файл хранилища по хешу и число записей, которые на него ссылаются."""
+    name = models.CharField('файл', max_length=255, unique=True)
+    refcount = models.PositiveIntegerField('число ссылок', default=0)
+    updated = models.DateTimeField('изменён', auto_now=True)
+
+    class Meta:
+        verbose_name = 'файл картинки'
+        verbose_name_plural = 'файлы картинок'
+        indexes = [
+            models.Index(
+                fields=['refcount', 'updated'],
+                name='media_blob_unused_idx'
+            ),
+        ]
+
+
+class ImportCheckpoint(models.Model):
+    """Позиция в файле, до которой импорт уже записан в базу.
+
+    Сохраняется в одной транзакции с порцией строк, поэтому прерванный
+    импорт продолжается ровно с первой незаписанной строки.
+    """
+    source = models.CharField('источник', max_length=255, unique=True)
+    offset = models.BigIntegerField('смещение в байтах', default=0)
+    rows = models.BigIntegerField('прочитано строк', default=0)
+    updated = models.DateTimeField('изменён', auto_now=True)
+
+    class Meta:
+        verbose_name = 'позиция импорта'
+        verbose_name_plural = 'позиции импорта'
@@ -0,0 +1,100 @@
+"""Пресеты картинок записей.
+
+Пресет задаёт пропорции кадра, ширины для srcset и параметры
+sorl-thumbnail. Каждая ширина режется в основном формате миниатюр и,
+если Pillow собран с его поддержкой, ещё и в WebP.
+"""
+from django.conf import settings  # type: ignore
+from PIL import features  # type: ignore
+from sorl.thumbnail.conf import settings as sorl_settings  # type: ignore
+
+WEBP = 'WEBP'
+
+
+def formats():
+    """Форматы вариантов: основной и WebP, если он доступен."""
+    main = sorl_settings.THUMBNAIL_FORMAT
+    if main != WEBP and features.check('webp'):
+        return (main, WEBP)
+    return (main,)
+
+
+class Preset:
+    """Набор вариантов одной картинки для srcset."""
+
+    def __init__(self, name, size, widths, sizes, options=None):
+        self.name = name
+        self.width, self.height = size
+        self.widths = tuple(sorted(widths))
+        self.sizes = sizes
+        self.options = options or {}
+
+    def __repr__(self):
+        return f'<Preset {self.name}>'
+
+    def geometry(self, width):
+        return f'{width}x{round(width * self.height / self.width)}'
+
+    def variants(self):
+        """Пары (ширина, формат) для всех вариантов пресета."""
+        return [(width, fmt) for fmt in formats() for width in self.widths]
+
+    def thumbnail_args(self):
+        """Аргументы get_thumbnail для всех вариантов, по порядку variants."""
+        return [
+            (self.geometry(width), {**self.options, 'format': fmt})
+            for width, fmt in self.variants()
+        ]
+
+    def choose(self, viewport, density=1):
+        """Ширина, которую выберет браузер с таким экраном.
+
+        Слот картинки занимает всю ширину экрана, но не шире кадра
+        пресета (так описан sizes); берётся первая ширина не меньше
+        слота в физических пикселях.
+        """
+        slot = min(viewport, self.width) * density
+        for width in self.widths:
+            if width >= slot:
+                return width
+        return self.widths[-1]
+
+
+def get_preset(name):
+    return Preset(name, **settings.POST_IMAGE_PRESETS[name])
+
+
+def all_presets():
+    return [get_preset(name) for name in settings.POST_IMAGE_PRESETS]
+
+
+class Picture:
+    """Все варианты одной картинки в одном пресете."""
+
+    def __init__(self, preset, files):
+        self.preset = preset
+        self.files = dict(zip(preset.variants(), files))
+
+    def _srcset(self, fmt):
+        return ', '.join(
+            f'{self.files[width, fmt].url} {width}w'
+            for width in self.preset.widths
+            if (width, fmt) in self.files
+        )
+
+    @property
+    def src(self):
+        main = formats()[0]
+        return self.files[self.preset.widths[-1], main].url
+
+    @property
+    def srcset(self):
+        return self._srcset(formats()[0])
+
+    @property
+    def webp_srcset(self):
+        return self._srcset(WEBP)
+
+    @property
+    def sizes(self):
+        return self.preset.sizes
@@ -0,0 +1,145 @@
+"""Разбор EXPLAIN QUERY PLAN: полные просмотры, сортировки и индексы.
+
+План SQLite - строки вида «SEARCH posts_post USING INDEX ... (author_id=?)»,
+«SCAN posts_comment» или «USE TEMP B-TREE FOR ORDER BY». Полный просмотр
+без индекса и сортировка во временном B-дереве на большой таблице -
+кандидаты на индекс. Предложение собирается из самого SQL: сначала
+столбцы из условий равенства, затем столбцы ORDER BY с их порядком,
+как у индексов в Meta.indexes моделей.
+"""
+import re
+
+from django.apps import apps  # type: ignore
+from django.db import connection  # type: ignore
+
+# «SCAN posts_post» читает таблицу целиком; «SCAN ... USING INDEX» -
+# тоже, если нет LIMIT: индекс тогда даёт только порядок строк
+FULL_SCAN = re.compile(r'^SCAN (\w+)(?P<ordered> USING INDEX \w+)?$')
+TABLE_IN_PLAN = re.compile(r'^(?:SCAN|SEARCH) (\w+)')
+TEMP_SORT = 'USE TEMP B-TREE'
+TABLE_ALIAS = re.compile(r'(?:FROM|JOIN) "(\w+)"(?: (?:AS )?"?(\w+)"?)?')
+ORDER_BY = re.compile(r'ORDER BY (.+?)(?: LIMIT .*)?$', re.S)
+ORDER_ITEM = re.compile(r'"(\w+)"\."(\w+)" (ASC|DESC)')
+# имя индекса в Django - не длиннее 30 символов
+INDEX_NAME_LENGTH = 30
+
+
+class Problem:
+    """Полный просмотр (scan) или сортировка (sort) большой таблицы."""
+
+    def __init__(self, kind, table, alias, sql, plan):
+        self.kind = kind
+        self.table = table
+        self.sql = sql
+        self.plan = plan
+        self.model = model_for_table(table)
+        self.fields = (
+            index_fields(sql, alias, self.model)
+            if self.model is not None else []
+        )
+
+    @property
+    def label(self):
+        return 'полный просмотр' if self.kind == 'scan' else 'сортировка'
+
+
+def explain(sql):
+    """Строки плана запроса (detail из EXPLAIN QUERY PLAN)."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def table_aliases(sql):
+    """Псевдоним или имя таблицы в плане -> имя таблицы."""
+    aliases = {}
+    for table, alias in TABLE_ALIAS.findall(sql):
+        aliases[table] = table
+        if alias and alias.upper() not in ('ON', 'WHERE', 'INNER', 'LEFT'):
+            aliases[alias] = table
+    return aliases
+
+
+def model_for_table(table):
+    for model in apps.get_models():
+        if model._meta.db_table == table:
+            return model
+    return None
+
+
+def field_name(model, column):
+    for model_field in model._meta.concrete_fields:
+        if model_field.column == column:
+            return model_field.name
+    return None
+
+
+def index_fields(sql, alias, model):
+    """Поля индекса: равенства из WHERE, затем ORDER BY со знаками."""
+    fields = []
+    # сравнение со значением, а не со столбцом другой таблицы
+    equality = re.compile(rf'"{alias}"\."(\w+)" (?:= (?!")|IN \()')
+    for column in equality.findall(sql.split(' ORDER BY ')[0]):
+        name = field_name(model, column)
+        if name and name not in fields:
+            fields.append(name)
+    order = ORDER_BY.search(sql)
+    for item_alias, column, direction in ORDER_ITEM.findall(
+        order.group(1) if order else ''
+    ):
+        name = field_name(model, column)
+        if item_alias != alias or not name or name in fields:
+            continue
+        fields.append(f'-{name}' if direction == 'DESC' else name)
+    return fields
+
+
+def find_problems(sql, plan, big_tables):
+    """Полные просмотры и сортировки на таблицах из big_tables."""
+    aliases = table_aliases(sql)
+    limited = ' LIMIT ' in sql
+    problems = []
+    touched = []
+    for detail in plan:
+        table_match = TABLE_IN_PLAN.match(detail)
+        if table_match:
+            touched.append(table_match.group(1))
+        scan = FULL_SCAN.match(detail)
+        if scan and aliases.get(scan.group(1)) in big_tables and not (
+            scan.group('ordered') and limited
+        ):
+            problems.append(('scan', scan.group(1)))
+        if detail.startswith(TEMP_SORT) and touched:
+            # сортируется результат первой таблицы в плане
+            alias = touched[0]
+            if aliases.get(alias) in big_tables:
+                problems.append(('sort', alias))
+    return [
+        Problem(kind, aliases[alias], alias, sql, plan)
+        for kind, alias in problems
+    ]
+
+
+def existing_index(model, fields):
+    """Имя индекса модели, который начинается с этих полей, или None."""
+    for index in model._meta.indexes:
+        if list(index.fields[:len(fields)]) == fields:
+            return index.name
+    return None
+
+
+def index_name(model, fields):
+    name = '_'.join(
+        [model._meta.model_name] + [name.lstrip('-') for name in fields]
+    )
+    if len(name) > INDEX_NAME_LENGTH - len('_idx'):
+        name = name[:INDEX_NAME_LENGTH - len('_idx')].rstrip('_')
+    return f'{name}_idx'
+
+
+def render_index(model, fields):
+    """Строка для Meta.indexes."""
+    return (
+        f'models.Index(fields={fields!r}, '
+        f'name={index_name(model, fields)!r})'
+    )
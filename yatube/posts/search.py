@@ -0,0 +1,111 @@
+"""Полнотекстовый поиск по записям на SQLite FTS5.
+
+Индекс posts_post_fts хранит только токены текста и ссылается на
+posts_post по rowid (external content). Синхронизацию держат триггеры
+базы, поэтому индекс не расходится с таблицей и при queryset.update(),
+bulk_create() и правках мимо ORM. Миграции, которые пересоздают
+posts_post, удаляют и триггеры: после них нужна команда
+rebuild_search_index. На других СУБД поиск сводится к icontains.
+"""
+import re
+
+from django.db import connection  # type: ignore
+
+from .models import Post
+
+
+FTS_TABLE = 'posts_post_fts'
+# больше слов в запросе не нужно, а длинные запросы дороги
+MAX_TERMS = 8
+WORD = re.compile(r'\w+')
+
+SCHEMA = (
+    # префиксные индексы ускоряют поиск по коротким началам слов
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    f"text, content='posts_post', content_rowid='id', "
+    f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert "
+    f"AFTER INSERT ON posts_post BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete "
+    f"AFTER DELETE ON posts_post BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) "
+    f"VALUES ('delete', old.id, old.text); END",
+    # счётчики комментариев меняют строку, но не текст
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update "
+    f"AFTER UPDATE OF text ON posts_post BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) "
+    f"VALUES ('delete', old.id, old.text); "
+    f"INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text); END",
+)
+
+
+def search_enabled():
+    return connection.vendor == 'sqlite'
+
+
+def match_expression(query):
+    """Запрос пользователя в синтаксисе FTS5 или None, если слов нет.
+
+    Каждое слово берётся в кавычки, чтобы операторы FTS5 в тексте
+    не ломали запрос, и ищется по префиксу: «кот» найдёт и «котов»,
+    и «котовасия», а «котов» короче себя слова не найдёт.
+    """
+    words = WORD.findall(query.lower())[:MAX_TERMS]
+    if not words:
+        return None
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def filter_posts(queryset, query):
+    """Записи, подходящие под запрос, без упорядочивания по релевантности."""
+    if not search_enabled():
+        return queryset.filter(text__icontains=query)
+    match = match_expression(query)
+    if match is None:
+        return queryset.none()
+    # RawSQL в pk__in даёт IN ((SELECT ...)), а SQLite читает такие
+    # скобки как скалярный подзапрос и берёт из него одну строку
+    return queryset.extra(
+        where=[
+            f'{Post._meta.db_table}.id IN (SELECT rowid FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s)'
+        ],
+        params=[match],
+    )
+
+
+def search_posts(queryset, query):
+    """Записи, подходящие под запрос, от самых релевантных (BM25)."""
+    if not search_enabled():
+        return queryset.filter(text__icontains=query)
+    match = match_expression(query)
+    if match is None:
+        return queryset.none()
+    return queryset.extra(
+        tables=[FTS_TABLE],
+        where=[
+            f'{FTS_TABLE}.rowid = {Post._meta.db_table}.id',
+            f'{FTS_TABLE} MATCH %s',
+        ],
+        params=[match],
+        select={'rank': f'{FTS_TABLE}.rank'},
+        order_by=['rank', '-pk'],
+    )
+
+
+def rebuild():
+    """Пересобирает индекс из таблицы записей; возвращает их число.
+
+    Заодно возвращает на место триггеры, если их снесла миграция.
+    """
+    with connection.cursor() as cursor:
+        for statement in SCHEMA:
+            cursor.execute(statement)
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+        )
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')"
+        )
+    return Post.objects.count()
@@ -0,0 +1,191 @@
+from django.db.models.signals import (  # type: ignore
+    post_delete,
+    post_save,
+    pre_save
+)
+from django.core.cache import cache  # type: ignore
+from django.dispatch import receiver  # type: ignore
+
+from core.cache_tags import invalidate
+
+from . import counters, storage, thumbnails, timelines
+from .cache_keys import id_key, post_author_key
+from .models import Comment, Follow, Group, Post, User
+
+
+@receiver(post_save, sender=Post)
+def post_created(sender, instance, created, **kwargs):
+    if created and timelines.timelines_enabled():
+        timelines.fan_out(instance)
+
+
+@receiver(post_save, sender=Post)
+def post_image_saved(sender, instance, **kwargs):
+    image = instance.image.name or ''
+    if image == instance._saved_image:
+        return
+    storage.release(instance._saved_image)
+    storage.acquire(image)
+    # уже готовые размеры sorl находит в хранилище и не режет заново
+    if image:
+        thumbnails.schedule(image)
+
+
+@receiver(post_delete, sender=Post)
+def post_image_deleted(sender, instance, **kwargs):
+    storage.release(instance.image.name)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created and timelines.timelines_enabled():
+        timelines.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    if timelines.timelines_enabled():
+        timelines.trim(instance.user_id, instance.author_id)
+
+
+@receiver(pre_save, sender=Post)
+def remember_saved(sender, instance, **kwargs):
+    instance._saved_group_id, instance._saved_image = None, ''
+    if instance.pk is not None:
+        instance._saved_group_id, instance._saved_image = (
+            Post.objects.filter(pk=instance.pk).values_list(
+                'group_id', 'image'
+            ).first() or (None, '')
+        )
+
+
+def group_counts_changed(*group_ids):
+    # posts_count всех групп отдаёт список групп в API
+    if any(group_id is not None for group_id in group_ids):
+        invalidate('group-counts')
+
+
+@receiver(post_save, sender=Post)
+def count_post_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.change_stats(instance.author_id, 'posts_count', 1)
+        counters.change_group(instance.group_id, 1)
+        group_counts_changed(instance.group_id)
+    elif instance._saved_group_id != instance.group_id:
+        counters.change_group(instance._saved_group_id, -1)
+        counters.change_group(instance.group_id, 1)
+        group_counts_changed(instance._saved_group_id, instance.group_id)
+
+
+@receiver(post_delete, sender=Post)
+def count_post_deleted(sender, instance, **kwargs):
+    counters.change_stats(instance.author_id, 'posts_count', -1)
+    counters.change_group(instance.group_id, -1)
+    group_counts_changed(instance.group_id)
+
+
+@receiver(post_save, sender=Comment)
+def count_comment_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.change_post(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_comment_deleted(sender, instance, **kwargs):
+    counters.change_post(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def count_follow_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.change_stats(instance.author_id, 'followers_count', 1)
+        counters.change_stats(instance.user_id, 'following_count', 1)
+
+
+@receiver(post_delete, sender=Follow)
+def count_follow_deleted(sender, instance, **kwargs):
+    counters.change_stats(instance.author_id, 'followers_count', -1)
+    counters.change_stats(instance.user_id, 'following_count', -1)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_fragments(sender, instance, **kwargs):
+    tags = [
+        'feed:index',
+        f'author:{instance.author_id}',
+        f'post:{instance.pk}',
+    ]
+    for group_id in {
+        instance.group_id, getattr(instance, '_saved_group_id', None)
+    }:
+        if group_id is not None:
+            tags.append(f'group:{group_id}')
+    invalidate(*tags)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_fragments(sender, instance, **kwargs):
+    invalidate(f'post:{instance.post_id}')
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow_markers(sender, instance, **kwargs):
+    invalidate(f'follows:{instance.author_id}', f'follows:{instance.user_id}')
+
+
+def saved_value(sender, instance, field, update_fields):
+    """Значение поля в базе до сохранения или None для новой строки."""
+    if instance.pk is None or (
+        update_fields is not None and field not in update_fields
+    ):
+        return None
+    return sender.objects.filter(pk=instance.pk).values_list(
+        field, flat=True
+    ).first()
+
+
+@receiver(pre_save, sender=Group)
+def remember_saved_slug(sender, instance, update_fields=None, **kwargs):
+    instance._saved_slug = saved_value(sender, instance, 'slug', update_fields)
+
+
+@receiver(pre_save, sender=User)
+def remember_saved_username(sender, instance, update_fields=None, **kwargs):
+    # вход в систему сохраняет только last_login и лишнего запроса не делает
+    instance._saved_username = saved_value(
+        sender, instance, 'username', update_fields
+    )
+
+
+def forget_ids(kind, *values):
+    cache.delete_many([id_key(kind, value) for value in set(values) if value])
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group_fragments(sender, instance, **kwargs):
+    invalidate(f'group:{instance.pk}', 'groups')
+    # старый slug больше не ведёт к группе, новый мог принадлежать другой
+    forget_ids(
+        'group-id', instance.slug, getattr(instance, '_saved_slug', None)
+    )
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_author_id(sender, instance, **kwargs):
+    # старое имя больше не ведёт к автору, новое мог занимать другой
+    forget_ids(
+        'author-id',
+        instance.username,
+        getattr(instance, '_saved_username', None)
+    )
+
+
+@receiver(post_delete, sender=Post)
+def forget_post_author(sender, instance, **kwargs):
+    # id удалённой записи не должен находить её автора
+    cache.delete(post_author_key(instance.pk))
@@ -0,0 +1,85 @@
+"""Хранилище картинок записей по хешу содержимого.
+
+Файл получает имя по SHA-256 своего содержимого и лежит в каталогах по
+первым знакам хеша (posts/ab/cd/abcd….jpg), чтобы ни в одном каталоге
+не скапливались сотни тысяч файлов. Одинаковые
+загрузки ложатся в один файл, а sorl-thumbnail, который ищет миниатюры
+по имени исходника, режет их один раз. Число записей, ссылающихся на
+файл, хранит MediaBlob; файлы без ссылок удаляет команда collect_media.
+"""
+import hashlib
+import posixpath
+import re
+
+from django.apps import apps  # type: ignore
+from django.core.files.storage import FileSystemStorage  # type: ignore
+from django.db.models import F  # type: ignore
+from django.utils import timezone  # type: ignore
+from django.utils.deconstruct import deconstructible  # type: ignore
+
+
+# уровни каталогов и число знаков хеша на уровень
+SHARD_LEVELS = 2
+SHARD_WIDTH = 2
+SHARDED_NAME = re.compile(
+    r'^(?:.*/)?'
+    + r'[0-9a-f]{%d}/' % SHARD_WIDTH * SHARD_LEVELS
+    + r'[0-9a-f]{64}(?:\.\w+)?$'
+)
+
+
+def _blobs():
+    # модели импортируют хранилище, поэтому модель берётся лениво
+    return apps.get_model('posts', 'MediaBlob').objects
+
+
+def is_sharded(name):
+    return bool(SHARDED_NAME.match(name))
+
+
+def content_name(name, content):
+    """Имя файла по хешу содержимого: тот же корень и тот же тип."""
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    digest = digest.hexdigest()
+    directory, basename = posixpath.split(name)
+    extension = posixpath.splitext(basename)[1].lower()
+    shards = [
+        digest[level * SHARD_WIDTH:(level + 1) * SHARD_WIDTH]
+        for level in range(SHARD_LEVELS)
+    ]
+    return posixpath.join(directory, *shards, f'{digest}{extension}')
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage, который не хранит один и тот же файл дважды."""
+
+    def _save(self, name, content):
+        name = content_name(name, content)
+        if not self.exists(name):
+            # при одновременной загрузке родитель выберет свободное имя
+            name = super()._save(name, content)
+        blob, created = _blobs().get_or_create(name=name)
+        if not created:
+            # свежая загрузка: collect_media не должен удалить файл
+            _blobs().filter(pk=blob.pk).update(updated=timezone.now())
+        return name
+
+
+def acquire(name):
+    """Ещё одна запись ссылается на файл."""
+    if name:
+        _blobs().filter(name=name).update(
+            refcount=F('refcount') + 1, updated=timezone.now()
+        )
+
+
+def release(name):
+    """Запись больше не ссылается на файл."""
+    if name:
+        _blobs().filter(name=name, refcount__gt=0).update(
+            refcount=F('refcount') - 1, updated=timezone.now()
+        )
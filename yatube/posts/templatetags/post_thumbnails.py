@@ -0,0 +1,29 @@
+from django import template  # type: ignore
+
+from posts import thumbnails
+from posts.presets import get_preset
+
+
+register = template.Library()
+
+
+@register.simple_tag
+def page_thumbnails(posts, preset):
+    """Варианты картинок всех записей страницы за один проход."""
+    return thumbnails.pictures(
+        (post.image.name for post in posts), get_preset(preset)
+    )
+
+
+@register.simple_tag
+def post_picture(image, preset):
+    if not image:
+        return None
+    return thumbnails.pictures([image.name], get_preset(preset))[image.name]
+
+
+@register.filter
+def thumbnail_of(resolved, image):
+    if not image:
+        return None
+    return resolved.get(image.name)
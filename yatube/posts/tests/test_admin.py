@@ -0,0 +1,131 @@
+# posts/tests/test_admin.py
+import datetime
+from unittest import mock
+
+from django.contrib import admin  # type: ignore
+from django.contrib.auth import get_user_model  # type: ignore
+from django.db import connection  # type: ignore
+from django.test import Client, TestCase, override_settings  # type: ignore
+from django.test.utils import CaptureQueriesContext  # type: ignore
+from django.urls import reverse  # type: ignore
+
+from posts.functions import EstimatedCountPaginator, SkipScanQuerySet
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+CHANGELISTS = (
+    'admin:posts_post_changelist',
+    'admin:posts_comment_changelist',
+    'admin:posts_follow_changelist',
+)
+
+
+class AdminChangelistTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='password'
+        )
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание'
+        )
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.admin)
+
+    def add_rows(self, count):
+        start = User.objects.count()
+        for number in range(start, start + count):
+            author = User.objects.create_user(username=f'author-{number}')
+            Follow.objects.create(user=self.admin, author=author)
+            post = Post.objects.create(
+                author=author, text=f'Запись {number}', group=self.group
+            )
+            Comment.objects.create(post=post, author=author, text='Ответ')
+
+    def queries(self, name):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse(name))
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def test_queries_do_not_grow_with_rows(self):
+        """Число запросов списка не зависит от числа строк."""
+        self.add_rows(2)
+        small = {name: self.queries(name) for name in CHANGELISTS}
+        self.add_rows(10)
+        for name in CHANGELISTS:
+            with self.subTest(name=name):
+                self.assertEqual(self.queries(name), small[name])
+
+    @override_settings(ADMIN_COUNT_LIMIT=5)
+    def test_count_beyond_limit(self):
+        """За ADMIN_COUNT_LIMIT - оценка или точный COUNT, но не предел."""
+        self.add_rows(8)
+        paginator = EstimatedCountPaginator(Post.objects.all(), 3)
+        self.assertEqual(paginator.count, 8)
+        self.assertFalse(paginator.estimated)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        paginator = EstimatedCountPaginator(Post.objects.all(), 3)
+        self.assertEqual(paginator.count, 8)
+        self.assertTrue(paginator.estimated)
+        paginator = EstimatedCountPaginator(
+            Post.objects.filter(text__startswith='Запись'), 3
+        )
+        self.assertEqual(paginator.count, 8)
+        paginator = EstimatedCountPaginator(
+            Post.objects.filter(text='Запись 2'), 3
+        )
+        self.assertEqual(paginator.count, 1)
+
+    @override_settings(ADMIN_COUNT_LIMIT=5)
+    def test_rows_past_stale_estimate_reachable(self):
+        """Строки, добавленные после ANALYZE, доступны по страницам."""
+        self.add_rows(6)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        self.add_rows(4)
+        paginator = EstimatedCountPaginator(Post.objects.all(), 3)
+        self.assertEqual(paginator.num_pages, 2)
+        self.assertEqual(len(paginator.page(2)), 3)
+        self.assertEqual(paginator.num_pages, 4)
+        paginator = EstimatedCountPaginator(Post.objects.all(), 3)
+        self.assertEqual(len(paginator.page(4)), 1)
+
+        model_admin = admin.site._registry[Post]
+        with mock.patch.object(model_admin, 'list_per_page', 3):
+            response = self.client.get(
+                reverse('admin:posts_post_changelist'), {'p': 3}
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['cl'].result_list), 1)
+
+    def test_dates_skip_scan(self):
+        """dates() находит те же периоды, что и DISTINCT по строкам."""
+        self.add_rows(4)
+        for number, post in enumerate(Post.objects.all()):
+            Post.objects.filter(pk=post.pk).update(
+                pub_date=datetime.datetime(
+                    2020 + number % 2, number + 1, 28, 23, 30,
+                    tzinfo=datetime.timezone.utc
+                )
+            )
+        posts = SkipScanQuerySet(Post)
+        for kind in ('year', 'month', 'day'):
+            with self.subTest(kind=kind):
+                self.assertEqual(
+                    posts.dates('pub_date', kind),
+                    list(Post.objects.dates('pub_date', kind))
+                )
+        self.assertEqual(
+            posts.filter(pub_date__year=2021).dates('pub_date', 'month'),
+            [datetime.date(2021, 2, 1), datetime.date(2021, 4, 1)]
+        )
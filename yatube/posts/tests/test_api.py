@@ -0,0 +1,194 @@
+# posts/tests/test_api.py
+from django.contrib.auth import get_user_model  # type: ignore
+from django.core.cache import cache  # type: ignore
+from django.test import Client, TestCase  # type: ignore
+from django.urls import reverse  # type: ignore
+
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+POSTS = 60
+
+
+class ApiTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create_user(
+            username='api-author', first_name='Лев', last_name='Толстой'
+        )
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание'
+        )
+        for number in range(POSTS):
+            Post.objects.create(
+                author=cls.user,
+                text=f'Запись {number}',
+                group=cls.group if number % 2 else None
+            )
+        cls.post = Post.objects.first()
+        for number in range(3):
+            Comment.objects.create(
+                post=cls.post, author=cls.user, text=f'Комментарий {number}'
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def get(self, name, kwargs=None, **params):
+        response = self.client.get(reverse(name, kwargs=kwargs), params)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        return response
+
+    def test_cursor_walk(self):
+        """Курсор проходит ленту целиком без повторов."""
+        ids = []
+        cursor = None
+        while True:
+            params = {'limit': 25, 'fields': 'id'}
+            if cursor:
+                params['cursor'] = cursor
+            data = self.get('api:posts', **params).json()
+            ids += [row['id'] for row in data['results']]
+            cursor = data['next']
+            if cursor is None:
+                break
+        self.assertEqual(
+            ids, list(Post.objects.values_list('pk', flat=True))
+        )
+
+    def test_page_of_fifty_in_one_query(self):
+        """Страница из 50 записей - один запрос после прогрева id."""
+        self.get('api:profile_posts', {'username': 'api-author'})
+        with self.assertNumQueries(1):
+            data = self.get(
+                'api:profile_posts', {'username': 'api-author'}
+            ).json()
+        self.assertEqual(len(data['results']), 50)
+        self.assertEqual(data['results'][0], {
+            'id': self.post.pk,
+            'text': self.post.text,
+            'pub_date': data['results'][0]['pub_date'],
+            'author': 'api-author',
+            'group': 'test-slug',
+            'image': None,
+        })
+
+    def test_sparse_fields(self):
+        """Поля выбираются через ?fields=, неизвестные дают 400."""
+        data = self.get('api:posts', fields='id,author').json()
+        self.assertEqual(set(data['results'][0]), {'id', 'author'})
+        response = self.get('api:posts', fields='id,password')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', response.json()['error'])
+        response = self.get('api:posts', cursor='garbage')
+        self.assertEqual(response.status_code, 400)
+
+    def test_detail_and_comments(self):
+        """Запись и её комментарии; несуществующая запись - 404."""
+        post_id = {'post_id': self.post.pk}
+        data = self.get('api:post', post_id).json()
+        self.assertEqual(data['comments_count'], 3)
+        data = self.get('api:comments', post_id, fields='text').json()
+        self.assertEqual(
+            data['results'],
+            [{'text': f'Комментарий {number}'} for number in (2, 1, 0)]
+        )
+        response = self.get('api:post', {'post_id': 0})
+        self.assertEqual(response.status_code, 404)
+        response = self.get('api:comments', {'post_id': 0})
+        self.assertEqual(response.status_code, 404)
+
+    def test_deleted_post_comments(self):
+        """Комментарии удалённой записи - 404, хотя её автор был в кэше."""
+        post = Post.objects.create(author=self.user, text='Удаляемая')
+        post_id = {'post_id': post.pk}
+        self.assertEqual(self.get('api:comments', post_id).status_code, 200)
+        post.delete()
+        self.assertEqual(self.get('api:comments', post_id).status_code, 404)
+
+    def test_renamed_slug_and_username(self):
+        """Старые slug и имя после переименования больше не находятся."""
+        user = User.objects.create_user(username='old-name')
+        Post.objects.create(author=user, text='Запись переименованного')
+        group = Group.objects.create(title='Группа', slug='old-slug')
+        for name, kwargs in (
+            ('api:profile_posts', {'username': 'old-name'}),
+            ('api:group_posts', {'slug': 'old-slug'}),
+        ):
+            self.assertEqual(self.get(name, kwargs).status_code, 200)
+        user.username = 'new-name'
+        user.save()
+        group.slug = 'new-slug'
+        group.save()
+        for name, kwargs in (
+            ('api:profile_posts', {'username': 'old-name'}),
+            ('api:group_posts', {'slug': 'old-slug'}),
+        ):
+            with self.subTest(name=name):
+                self.assertEqual(self.get(name, kwargs).status_code, 404)
+        data = self.get('api:profile_posts', {'username': 'new-name'}).json()
+        self.assertEqual(
+            [row['text'] for row in data['results']],
+            ['Запись переименованного']
+        )
+
+    def test_groups_and_profiles(self):
+        """Группы и профили отдаются со счётчиками."""
+        data = self.get('api:groups').json()
+        self.assertEqual(data['results'], [{
+            'slug': 'test-slug',
+            'title': 'Тестовая группа',
+            'description': 'Тестовое описание',
+            'posts_count': POSTS // 2,
+        }])
+        data = self.get('api:group_posts', {'slug': 'test-slug'}).json()
+        self.assertEqual(data['group']['slug'], 'test-slug')
+        self.assertEqual(
+            {row['group'] for row in data['results']}, {'test-slug'}
+        )
+        data = self.get('api:profile', {'username': 'api-author'}).json()
+        self.assertEqual(data['posts_count'], POSTS)
+        response = self.get('api:profile', {'username': 'nobody'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_etag(self):
+        """Неизменившаяся страница отвечает 304, новая запись - 200."""
+        response = self.get('api:posts')
+        self.assertEqual(
+            self.client.get(
+                reverse('api:posts'), HTTP_IF_NONE_MATCH=response['ETag']
+            ).status_code,
+            304
+        )
+        Post.objects.create(author=self.user, text='Новая')
+        response = self.client.get(
+            reverse('api:posts'), HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['text'], 'Новая')
+
+    def test_groups_etag_follows_posts_count(self):
+        """Новая запись в группе меняет ETag списка групп."""
+        etag = self.get('api:groups')['ETag']
+        Post.objects.create(author=self.user, text='Без группы')
+        self.assertEqual(
+            self.client.get(
+                reverse('api:groups'), HTTP_IF_NONE_MATCH=etag
+            ).status_code,
+            304
+        )
+        Post.objects.create(author=self.user, text='Новая', group=self.group)
+        response = self.client.get(
+            reverse('api:groups'), HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json()['results'][0]['posts_count'], POSTS // 2 + 1
+        )
@@ -1,13 +1,21 @@
 # posts/tests/tests_forms.py
 import shutil
 import tempfile
-
-from django.core.files.uploadedfile import SimpleUploadedFile  # type: ignore
+from io import BytesIO
+from unittest import mock
+
+from django.core.exceptions import ValidationError  # type: ignore
+from django.core.files.uploadedfile import (  # type: ignore
+    SimpleUploadedFile,
+    TemporaryUploadedFile
+)
 from django.conf import settings  # type: ignore
 from django.contrib.auth import get_user_model  # type: ignore
 from django.test import Client, TestCase, override_settings  # type: ignore
 from django.urls import reverse  # type: ignore
+from PIL import Image  # type: ignore
 
+from posts import uploads
 from posts.models import Comment, Post, Group
 
 
@@ -95,7 +103,7 @@ class PostCreateFormTests(TestCase):
                 text=form_data['text'],
                 group=form_data['group'],
                 author=PostCreateFormTests.user,
-                image='posts/small.gif'
+                image__regex=r'^posts/(\w\w/){2}[0-9a-f]{64}\.gif$'
             ).exists()
         )
 
@@ -148,3 +156,85 @@ class PostCreateFormTests(TestCase):
 
         self.assertRedirects(response, self.post_detail_url)
         self.assertEqual(Post.objects.count(), comments_count + 1)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class PostImageUploadTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create_user(username='test-author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.author_client = Client()
+        self.author_client.force_login(PostImageUploadTests.user)
+
+    def upload(self, name, size, fmt, **options):
+        buffer = BytesIO()
+        Image.new('RGB', size, (200, 30, 30)).save(buffer, fmt, **options)
+        return SimpleUploadedFile(name, buffer.getvalue())
+
+    def create_post(self, image):
+        return self.author_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Запись с картинкой', 'image': image}
+        )
+
+    @override_settings(POST_IMAGE_MAX_BYTES=1024)
+    def test_oversized_file_rejected(self):
+        """Файл сверх предела отбрасывается с понятной ошибкой."""
+        response = self.create_post(
+            self.upload('big.bmp', (100, 100), 'BMP')
+        )
+        self.assertFormError(
+            response, 'form', 'image', 'Файл больше 1,0\xa0КБ.'
+        )
+        self.assertFalse(Post.objects.exists())
+
+    @override_settings(POST_IMAGE_MAX_PIXELS=100)
+    def test_too_many_pixels_rejected(self):
+        """Картинка сверх предела пикселей отклоняется до распаковки."""
+        response = self.create_post(self.upload('wide.png', (20, 20), 'PNG'))
+        self.assertFormError(
+            response, 'form', 'image', 'Картинка больше 100 пикселей.'
+        )
+        self.assertFalse(Post.objects.exists())
+
+    @override_settings(POST_IMAGE_MAX_PIXELS=100)
+    def test_source_image_closed(self):
+        """Исходная картинка закрывается и при отказе в загрузке."""
+        opened = []
+        open_image = Image.open
+
+        def spy(*args, **kwargs):
+            opened.append(open_image(*args, **kwargs))
+            return opened[-1]
+
+        upload = TemporaryUploadedFile('wide.png', 'image/png', 0, None)
+        Image.new('RGB', (20, 20)).save(upload, 'PNG')
+        with mock.patch.object(Image, 'open', spy):
+            with self.assertRaises(ValidationError):
+                uploads.normalize(upload)
+        upload.close()
+        self.assertIsNone(opened[0].fp)
+
+    @override_settings(POST_IMAGE_MAX_SIDE=16)
+    def test_image_normalized(self):
+        """Картинка поворачивается по EXIF, уменьшается и теряет EXIF."""
+        exif = Image.Exif()
+        # 6 - повернуть на 90 градусов по часовой стрелке
+        exif[0x0112] = 6
+        self.create_post(
+            self.upload('photo.jpg', (40, 20), 'JPEG', exif=exif.tobytes())
+        )
+        post = Post.objects.get()
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.size, (8, 16))
+            self.assertFalse(image.getexif())
+        self.assertTrue(post.image.name.endswith('.jpg'))
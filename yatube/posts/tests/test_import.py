@@ -0,0 +1,151 @@
+# posts/tests/test_import.py
+import datetime
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings  # type: ignore
+from django.contrib.auth import get_user_model  # type: ignore
+from django.core.management import call_command  # type: ignore
+from django.test import TestCase  # type: ignore
+
+from posts.counters import author_stats
+from posts.models import Comment, Follow, Group, Post
+from posts.search import search_posts
+
+User = get_user_model()
+
+TEMP_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+class ImportContentTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание'
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_DIR, ignore_errors=True)
+
+    def write(self, name, lines):
+        path = os.path.join(TEMP_DIR, name)
+        with open(path, 'a', encoding='utf-8') as file:
+            file.writelines(f'{line}\n' for line in lines)
+        return path
+
+    def stats(self, user):
+        # объект класса хранит счётчики, закэшированные другим тестом
+        return author_stats(User.objects.get(pk=user.pk))
+
+    def run_import(self, kind, path, **options):
+        out = StringIO()
+        call_command(
+            'import_content', kind, path, batch_size=2, stdout=out,
+            **options
+        )
+        return out.getvalue()
+
+    def test_posts_jsonl(self):
+        """Записи импортируются с датами, группами и счётчиками."""
+        path = self.write('posts.jsonl', [
+            json.dumps({
+                'author': 'author', 'text': 'Первая импортная',
+                'group': 'test-slug', 'pub_date': '2020-01-02T03:04:05'
+            }),
+            json.dumps({'author': 'author', 'text': 'Вторая импортная'}),
+            json.dumps({'author': 'nobody', 'text': 'Без автора'}),
+        ])
+        out = self.run_import('posts', path)
+        self.assertIn('Прочитано строк: 3, записано: 2, пропущено: 1', out)
+        post = Post.objects.get(text='Первая импортная')
+        self.assertEqual(post.group, self.group)
+        self.assertEqual(
+            post.pub_date,
+            datetime.datetime(
+                2020, 1, 2, 3, 4, 5, tzinfo=datetime.timezone.utc
+            )
+        )
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 1)
+        self.assertEqual(self.stats(self.author).posts_count, 2)
+        self.assertEqual(
+            list(search_posts(Post.objects.all(), 'импортная')).count(post), 1
+        )
+
+    def test_dates_with_and_without_ids(self):
+        """Даты из файла сохраняются и у записей с id, и без него."""
+        dates = {
+            'С id': '2019-05-06T07:08:09',
+            'Без id': '2018-01-01T00:00:00',
+            'Ещё без id': '2017-03-04T05:06:07',
+        }
+        path = self.write('dated.jsonl', [
+            json.dumps({'author': 'author', 'text': 'С id', 'id': 500,
+                        'pub_date': dates['С id']}),
+            json.dumps({'author': 'author', 'text': 'Без id',
+                        'pub_date': dates['Без id']}),
+            json.dumps({'author': 'author', 'text': 'Ещё без id',
+                        'pub_date': dates['Ещё без id']}),
+        ])
+        self.run_import('posts', path)
+        for text, date in dates.items():
+            with self.subTest(text=text):
+                self.assertEqual(
+                    Post.objects.get(text=text).pub_date.isoformat(),
+                    f'{date}+00:00'
+                )
+        # поле модели не меняется ни во время импорта, ни после
+        self.assertTrue(Post._meta.get_field('pub_date').auto_now_add)
+
+    def test_resume_from_checkpoint(self):
+        """Повторный запуск продолжает файл с места остановки."""
+        path = self.write('resume.csv', [
+            'author,text', 'author,Раз', 'author,"Два,', 'строки"',
+        ])
+        self.run_import('posts', path)
+        self.write('resume.csv', ['author,Три'])
+        out = self.run_import('posts', path)
+        self.assertIn('Прочитано строк: 1, записано: 1', out)
+        self.assertEqual(
+            sorted(Post.objects.values_list('text', flat=True)),
+            ['Два,\nстроки', 'Раз', 'Три']
+        )
+        self.run_import('posts', path, restart=True)
+        self.assertEqual(Post.objects.count(), 6)
+
+    def test_comments_and_follows(self):
+        """Комментарии и подписки сдвигают счётчики, дубли пропускаются."""
+        post = Post.objects.create(author=self.author, text='Запись')
+        comments = self.write('comments.jsonl', [
+            json.dumps({'post': post.pk, 'author': 'reader', 'text': 'Ок'}),
+            json.dumps({'post': 0, 'author': 'reader', 'text': 'Мимо'}),
+        ])
+        self.run_import('comments', comments)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(Comment.objects.get().text, 'Ок')
+
+        follows = self.write('follows.csv', [
+            'user,author', 'reader,author', 'reader,author', 'author,author',
+        ])
+        out = self.run_import('follows', follows)
+        self.assertIn('записано: 1', out)
+        self.assertTrue(
+            Follow.objects.filter(
+                user=self.reader, author=self.author
+            ).exists()
+        )
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
@@ -0,0 +1,71 @@
+# posts/tests/test_load_test.py
+import json
+from io import StringIO
+
+from django.contrib.auth import get_user_model  # type: ignore
+from django.core.management import call_command  # type: ignore
+from django.core.management.base import CommandError  # type: ignore
+from django.test import TestCase  # type: ignore
+
+from posts import loadtest
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class LoadTestCommandTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание'
+        )
+        for number in range(5):
+            Post.objects.create(
+                author=cls.author, text=f'Запись {number}', group=cls.group
+            )
+
+    def test_every_route(self):
+        """Все действия смеси проходят без ошибок и попадают в отчёт."""
+        out = StringIO()
+        mix = ','.join(f'{name}=1' for name in loadtest.ROUTES)
+        call_command(
+            'load_test', users=1, requests=60, mix=mix, seed=1,
+            stdout=out, stderr=StringIO()
+        )
+        report = json.loads(out.getvalue())
+        self.assertEqual(report['requests'], 60)
+        self.assertEqual(report['errors'], 0)
+        self.assertEqual(set(report['routes']), set(loadtest.ROUTES))
+        for route in report['routes'].values():
+            self.assertLessEqual(route['p50_ms'], route['p95_ms'])
+            self.assertLessEqual(route['p95_ms'], route['p99_ms'])
+        user = User.objects.get(username='loadtest-0')
+        self.assertTrue(
+            Follow.objects.filter(user=user, author=self.author).exists()
+        )
+        self.assertEqual(
+            Post.objects.filter(author=user).count(),
+            report['routes']['post_create']['requests']
+        )
+        self.assertEqual(
+            Comment.objects.filter(author=user).count(),
+            report['routes']['add_comment']['requests']
+        )
+
+    def test_bad_mix(self):
+        """Неизвестное действие в смеси - ошибка команды."""
+        with self.assertRaises(CommandError):
+            call_command('load_test', mix='index=1,unknown=2')
+
+    def test_percentile(self):
+        """Перцентиль по рангу."""
+        values = list(range(1, 101))
+        self.assertEqual(loadtest.percentile(values, 50), 50)
+        self.assertEqual(loadtest.percentile(values, 99), 99)
+        self.assertEqual(loadtest.percentile([7], 95), 7)
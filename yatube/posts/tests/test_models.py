@@ -1,9 +1,17 @@
 # posts/tests/test_models.py
+from importlib import import_module
+from io import StringIO
+from unittest import mock
+
+from django.apps import apps  # type: ignore
 from django.conf import settings  # type: ignore
 from django.contrib.auth import get_user_model  # type: ignore
+from django.core.management import call_command  # type: ignore
+from django.db import connection  # type: ignore
 from django.test import TestCase  # type: ignore
 
-from ..models import Group, Post
+from ..counters import author_stats
+from ..models import AuthorStats, Comment, Follow, Group, Post
 
 User = get_user_model()
 
@@ -83,3 +91,99 @@ class PostModelTest(TestCase):
                     f'help_text в поле "{field}" '
                     'модели "Post" не совпадает с ожидаемым'
                 )
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='other-slug',
+            description='Тестовое описание',
+        )
+
+    def refresh(self):
+        for obj in (self.group, self.other_group):
+            obj.refresh_from_db()
+        return AuthorStats.objects.get(user=self.author)
+
+    def test_counters_follow_writes(self):
+        """Счётчики меняются вместе с записями, комментариями и подписками."""
+        author_stats(self.author)
+        author_stats(self.reader)
+        post = Post.objects.create(
+            author=self.author, text='Текст', group=self.group
+        )
+        Comment.objects.create(post=post, author=self.reader, text='Ок')
+        Follow.objects.create(user=self.reader, author=self.author)
+
+        stats = self.refresh()
+        post.refresh_from_db()
+        self.assertEqual(stats.posts_count, 1)
+        self.assertEqual(stats.followers_count, 1)
+        self.assertEqual(self.reader.stats.following_count, 0)
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.reader).following_count, 1
+        )
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(self.group.posts_count, 1)
+
+        post.group = self.other_group
+        post.save()
+        self.refresh()
+        self.assertEqual(self.group.posts_count, 0)
+        self.assertEqual(self.other_group.posts_count, 1)
+
+        post.delete()
+        stats = self.refresh()
+        self.assertEqual(stats.posts_count, 0)
+        self.assertEqual(self.other_group.posts_count, 0)
+
+    def test_reconcile_counters_command(self):
+        """Команда reconcile_counters исправляет расхождения."""
+        post = Post.objects.create(
+            author=self.author, text='Текст', group=self.group
+        )
+        Comment.objects.create(post=post, author=self.reader, text='Ок')
+        Post.objects.update(comments_count=10)
+        Group.objects.update(posts_count=10)
+        AuthorStats.objects.update(posts_count=10)
+
+        call_command('reconcile_counters', stdout=StringIO())
+        stats = self.refresh()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(self.group.posts_count, 1)
+        self.assertEqual(stats.posts_count, 1)
+
+    def test_migration_backfills_counters(self):
+        """Миграция счётчиков заполняет их по уже существующим строкам."""
+        migration = import_module('posts.migrations.0013_auto_20261018_0827')
+        posts = [
+            Post.objects.create(author=self.author, text='Текст', group=group)
+            for group in (self.group, self.group, self.other_group)
+        ]
+        Comment.objects.create(post=posts[0], author=self.reader, text='Ок')
+        Post.objects.update(comments_count=0)
+        Group.objects.update(posts_count=0)
+
+        with mock.patch.object(migration, 'CHUNK_SIZE', 1):
+            migration.backfill_counters(apps, connection.schema_editor())
+        for group in (self.group, self.other_group):
+            group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 2)
+        self.assertEqual(self.other_group.posts_count, 1)
+        self.assertEqual(
+            list(Post.objects.order_by('pk').values_list(
+                'comments_count', flat=True
+            )),
+            [1, 0, 0]
+        )
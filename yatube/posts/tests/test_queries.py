@@ -0,0 +1,209 @@
+# posts/tests/test_queries.py
+from django.contrib.auth import get_user_model  # type: ignore
+from django.core.cache import cache  # type: ignore
+from django.db import connection, transaction  # type: ignore
+from django.test import Client, TestCase, override_settings  # type: ignore
+from django.test.utils import CaptureQueriesContext  # type: ignore
+from django.urls import reverse  # type: ignore
+
+from about import urls as about_urls
+from posts import api_urls
+from posts import urls as posts_urls
+from posts.counters import reconcile_users
+from posts.models import Comment, Follow, Group, Post
+from users import urls as users_urls
+
+User = get_user_model()
+
+AUTHORS = 5
+POSTS_PER_AUTHOR = 30
+COMMENTS_PER_POST = 15
+
+# суммарное время SQL на один запрос страницы, в секундах
+MAX_SQL_TIME = 0.5
+
+PAGE_SIZES = (5, 20)
+
+# параметры GET для страниц, которым без них нечего показывать
+QUERY_PARAMS = {
+    'posts:search': {'q': 'запись'},
+}
+
+
+class QueryBudgetTests(TestCase):
+    """Число SQL-запросов каждой страницы не зависит от объёма данных."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.authors = [
+            User.objects.create_user(
+                username=f'author-{number}',
+                first_name='Имя',
+                last_name=f'Фамилия {number}'
+            )
+            for number in range(AUTHORS)
+        ]
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание'
+        )
+        for author in cls.authors:
+            Follow.objects.create(user=cls.reader, author=author)
+            for number in range(POSTS_PER_AUTHOR):
+                Post.objects.create(
+                    author=author,
+                    text=f'Запись {number}',
+                    group=cls.group if number % 2 else None
+                )
+        cls.post = Post.objects.filter(author=cls.authors[0]).first()
+        for number in range(COMMENTS_PER_POST):
+            Comment.objects.create(
+                post=cls.post,
+                author=cls.authors[number % AUTHORS],
+                text=f'Комментарий {number}'
+            )
+        # на живой базе счётчики уже посчитаны reconcile_counters
+        reconcile_users(chunk_size=100)
+
+    def setUp(self):
+        author = self.authors[0].username
+        post_id = {'post_id': self.post.pk}
+        # имя URL: (аргументы, клиент, метод, предел запросов);
+        # кэш пуст, поэтому страницы с ETag тратят запрос на поиск id
+        self.budgets = {
+            'posts:index': ({}, 'guest', 'get', 2),
+            'posts:group': (
+                {'slug': self.group.slug}, 'guest', 'get', 3
+            ),
+            'posts:profile': (
+                {'username': author}, 'reader', 'get', 6
+            ),
+            'posts:post_detail': (post_id, 'reader', 'get', 5),
+            # MATCH по индексу FTS5: COUNT и выборка страницы
+            'posts:search': ({}, 'guest', 'get', 2),
+            # лента с холодным кэшем: поиск id и сама выборка
+            'posts:feed': ({'feed_format': 'rss'}, 'guest', 'get', 1),
+            'posts:group_feed': (
+                {'feed_format': 'atom', 'slug': self.group.slug},
+                'guest', 'get', 3
+            ),
+            'posts:profile_feed': (
+                {'feed_format': 'rss', 'username': author}, 'guest', 'get', 3
+            ),
+            'posts:post_create': ({}, 'reader', 'get', 3),
+            'posts:post_edit': (post_id, 'author', 'get', 4),
+            'posts:add_comment': (post_id, 'reader', 'post', 5),
+            'posts:follow_index': ({}, 'reader', 'get', 4),
+            'posts:profile_follow': (
+                {'username': author}, 'reader', 'get', 4
+            ),
+            'posts:profile_unfollow': (
+                {'username': author}, 'reader', 'get', 7
+            ),
+            'users:logout': ({}, 'reader', 'get', 4),
+            'users:signup': ({}, 'guest', 'get', 0),
+            'users:login': ({}, 'guest', 'get', 0),
+            'users:password_change': ({}, 'reader', 'get', 2),
+            'users:password_change_done': ({}, 'reader', 'get', 2),
+            'users:password_reset_form': ({}, 'guest', 'get', 0),
+            'users:password_reset_done': ({}, 'guest', 'get', 0),
+            'users:password_reset_confirm': (
+                {'uidb64': 'uid', 'token': 'token'}, 'guest', 'get', 0
+            ),
+            'users:password_reset_complete': ({}, 'guest', 'get', 0),
+            # архив читается из базы уже при отдаче ответа
+            'users:export': (
+                {'username': 'reader'}, 'reader', 'get', 3
+            ),
+            'api:posts': ({}, 'guest', 'get', 1),
+            'api:post': (post_id, 'guest', 'get', 2),
+            'api:comments': (post_id, 'guest', 'get', 2),
+            'api:groups': ({}, 'guest', 'get', 1),
+            'api:group_posts': (
+                {'slug': self.group.slug}, 'guest', 'get', 3
+            ),
+            'api:profile': ({'username': author}, 'guest', 'get', 2),
+            'api:profile_posts': (
+                {'username': author}, 'guest', 'get', 2
+            ),
+            'about:author': ({}, 'guest', 'get', 0),
+            'about:tech': ({}, 'guest', 'get', 0),
+        }
+
+    def get_client(self, role):
+        client = Client()
+        if role == 'reader':
+            client.force_login(self.reader)
+        elif role == 'author':
+            client.force_login(self.authors[0])
+        return client
+
+    def measure(self, name, page_size):
+        kwargs, role, method, _ = self.budgets[name]
+        client = self.get_client(role)
+        if method == 'post':
+            data = {'text': 'Комментарий'}
+        else:
+            data = QUERY_PARAMS.get(name, {})
+        cache.clear()
+        # каждый замер начинается с одного и того же состояния базы
+        with transaction.atomic(), override_settings(
+            POSTS_PER_PAGE=page_size
+        ):
+            with CaptureQueriesContext(connection) as context:
+                response = getattr(client, method)(
+                    reverse(name, kwargs=kwargs), data
+                )
+            transaction.set_rollback(True)
+        self.assertLess(
+            response.status_code, 400, f'{name} вернул {response.status_code}'
+        )
+        return context.captured_queries
+
+    def report(self, queries):
+        return '\n'.join(
+            f'{number}. ({query["time"]}s) {query["sql"]}'
+            for number, query in enumerate(queries, start=1)
+        )
+
+    def test_query_budgets(self):
+        """Страницы укладываются в бюджет запросов и времени SQL."""
+        for name, (_, _, _, budget) in self.budgets.items():
+            for page_size in PAGE_SIZES:
+                with self.subTest(name=name, page_size=page_size):
+                    queries = self.measure(name, page_size)
+                    self.assertLessEqual(
+                        len(queries), budget,
+                        f'{name}: {len(queries)} запросов при бюджете '
+                        f'{budget}:\n{self.report(queries)}'
+                    )
+                    sql_time = sum(float(query['time']) for query in queries)
+                    self.assertLessEqual(
+                        sql_time, MAX_SQL_TIME,
+                        f'{name}: SQL занял {sql_time:.3f}s:\n'
+                        f'{self.report(queries)}'
+                    )
+
+    def test_every_url_has_budget(self):
+        """У каждого именованного URL есть бюджет запросов."""
+        for urls in (about_urls, api_urls, posts_urls, users_urls):
+            for pattern in urls.urlpatterns:
+                name = f'{urls.app_name}:{pattern.name}'
+                with self.subTest(name=name):
+                    self.assertIn(name, self.budgets)
+
+    def test_queries_do_not_grow_with_page_size(self):
+        """Число запросов не зависит от размера страницы."""
+        for name in self.budgets:
+            with self.subTest(name=name):
+                small, large = (
+                    self.measure(name, page_size) for page_size in PAGE_SIZES
+                )
+                self.assertEqual(
+                    len(small), len(large),
+                    f'{name}: N+1 при росте страницы:\n{self.report(large)}'
+                )
@@ -0,0 +1,84 @@
+# posts/tests/test_query_plans.py
+from io import StringIO
+
+from django.core.management import call_command  # type: ignore
+from django.core.management.base import CommandError  # type: ignore
+from django.db import connection  # type: ignore
+from django.test import TestCase  # type: ignore
+
+from posts import query_plans
+from posts.models import Comment, Post
+
+
+class QueryPlansTest(TestCase):
+
+    def problems(self, queryset, big_tables):
+        # в str(query) значения без кавычек, а здесь - как в логе запросов
+        with connection.cursor() as cursor:
+            sql = cursor.db.ops.last_executed_query(
+                cursor, *queryset.query.sql_with_params()
+            )
+        return query_plans.find_problems(
+            sql, query_plans.explain(sql), big_tables
+        )
+
+    def test_full_scan(self):
+        """Фильтр по столбцу без индекса - полный просмотр таблицы."""
+        problems = self.problems(
+            Post.objects.filter(text='Запись').order_by('-pub_date'),
+            {'posts_post'}
+        )
+        self.assertEqual(
+            [(problem.kind, problem.table) for problem in problems],
+            [('scan', 'posts_post')]
+        )
+        self.assertEqual(problems[0].fields, ['text', '-pub_date'])
+        self.assertEqual(
+            query_plans.render_index(Post, problems[0].fields),
+            "models.Index(fields=['text', '-pub_date'], "
+            "name='post_text_pub_date_idx')"
+        )
+
+    def test_indexed_feeds(self):
+        """Ленты и комментарии записи идут по индексам."""
+        for queryset in (
+            Post.objects.all()[:10],
+            Post.objects.filter(author_id=1)[:10],
+            Post.objects.filter(group_id=1)[:10],
+            Comment.objects.filter(post_id=1).order_by('-created', '-id'),
+        ):
+            with self.subTest(sql=str(queryset.query)):
+                self.assertEqual(
+                    self.problems(queryset, {'posts_post', 'posts_comment'}),
+                    []
+                )
+        self.assertEqual(
+            query_plans.existing_index(Comment, ['post', '-created']),
+            'comment_post_feed_idx'
+        )
+
+    def test_command(self):
+        """Команда проходит на текущих индексах и падает без них."""
+        options = {'authors': 3, 'posts': 10, 'comments': 2, 'min_rows': 20}
+        out = StringIO()
+        call_command('advise_indexes', stdout=out, **options)
+        self.assertIn('Полных просмотров нет', out.getvalue())
+        # данные и статистика остались во временной базе
+        self.assertFalse(Post.objects.exists())
+        self.assertNotIn(
+            'sqlite_stat1', connection.introspection.table_names()
+        )
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(
+                cursor, Comment._meta.db_table
+            )
+            for name, constraint in constraints.items():
+                if constraint['index'] and not constraint['unique']:
+                    cursor.execute(f'DROP INDEX "{name}"')
+        out = StringIO()
+        with self.assertRaises(CommandError):
+            call_command('advise_indexes', stdout=out, **options)
+        self.assertIn('posts:post_detail: полный просмотр', out.getvalue())
+        self.assertIn(
+            'comment_post_feed_idx уже в Meta.indexes', out.getvalue()
+        )
@@ -0,0 +1,104 @@
+# posts/tests/test_search.py
+from io import StringIO
+
+from django.contrib.auth import get_user_model  # type: ignore
+from django.core.cache import cache  # type: ignore
+from django.core.management import call_command  # type: ignore
+from django.db import connection  # type: ignore
+from django.test import Client, TestCase, override_settings  # type: ignore
+from django.urls import reverse  # type: ignore
+
+from posts.models import Post
+from posts.search import FTS_TABLE, filter_posts, search_posts
+
+User = get_user_model()
+
+
+class PostSearchTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create_superuser(
+            username='test-author', email='author@example.com',
+            password='password'
+        )
+        cls.cats = Post.objects.create(
+            author=cls.user, text='Коты, коты и ещё раз коты'
+        )
+        cls.mixed = Post.objects.create(
+            author=cls.user, text='Про котов и собак'
+        )
+        cls.dogs = Post.objects.create(
+            author=cls.user, text='Только собаки'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def found(self, query):
+        return list(search_posts(Post.objects.all(), query))
+
+    def test_ranked_by_relevance(self):
+        """Выдача упорядочена по BM25, слова ищутся по префиксу."""
+        self.assertEqual(self.found('кот'), [self.cats, self.mixed])
+        self.assertEqual(self.found('КОТ собак'), [self.mixed])
+        # префикс не короче слова: «котов» не находит «коты»
+        self.assertEqual(self.found('котов'), [self.mixed])
+
+    def test_index_follows_edits(self):
+        """Индекс следует за созданием, правкой и удалением записей."""
+        post = Post.objects.create(author=self.user, text='Хомяк')
+        self.assertEqual(self.found('хомяк'), [post])
+        Post.objects.filter(pk=post.pk).update(text='Морская свинка')
+        self.assertEqual(self.found('хомяк'), [])
+        self.assertEqual(self.found('свинка'), [post])
+        post.delete()
+        self.assertEqual(self.found('свинка'), [])
+
+    def test_query_syntax_is_escaped(self):
+        """Операторы FTS5 в запросе не ломают поиск."""
+        self.assertEqual(self.found('"коты" OR (NEAR'), [])
+        self.assertEqual(self.found('*?!'), [])
+
+    def test_search_page(self):
+        """Страница поиска показывает найденное и хранит запрос в ссылках."""
+        with override_settings(POSTS_PER_PAGE=1):
+            response = self.guest_client.get(
+                reverse('posts:search'), {'q': 'кот'}
+            )
+        self.assertEqual(list(response.context['page_obj']), [self.cats])
+        self.assertEqual(response.context['page_obj'].paginator.count, 2)
+        self.assertContains(response, '?q=%D0%BA%D0%BE%D1%82&amp;page=2')
+        response = self.guest_client.get(reverse('posts:search'))
+        self.assertIsNone(response.context['page_obj'])
+
+    def test_admin_search(self):
+        """Поиск в админке идёт по полнотекстовому индексу."""
+        self.assertEqual(
+            set(filter_posts(Post.objects.all(), 'собак')),
+            {self.mixed, self.dogs}
+        )
+        client = Client()
+        client.force_login(self.user)
+        response = client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'собак'}
+        )
+        self.assertEqual(
+            set(response.context['cl'].result_list), {self.mixed, self.dogs}
+        )
+
+    def test_rebuild_command(self):
+        """Команда пересобирает индекс после правок мимо триггеров."""
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TRIGGER {FTS_TABLE}_update')
+        Post.objects.filter(pk=self.dogs.pk).update(text='Только кошки')
+        self.assertEqual(self.found('кошки'), [])
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('Проиндексировано записей: 3', out.getvalue())
+        self.assertEqual(self.found('кошки'), [self.dogs])
+        Post.objects.filter(pk=self.dogs.pk).update(text='Снова собаки')
+        self.assertEqual(self.found('кошки'), [])
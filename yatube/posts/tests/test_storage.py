@@ -0,0 +1,117 @@
+# posts/tests/test_storage.py
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings  # type: ignore
+from django.contrib.auth import get_user_model  # type: ignore
+from django.core.files.base import ContentFile  # type: ignore
+from django.core.files.storage import FileSystemStorage  # type: ignore
+from django.core.files.uploadedfile import SimpleUploadedFile  # type: ignore
+from django.core.management import call_command  # type: ignore
+from django.test import TestCase, override_settings  # type: ignore
+
+from posts.models import MediaBlob, Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ContentAddressedStorageTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create_user(username='test-author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def create_post(self, name):
+        return Post.objects.create(
+            author=self.user,
+            text='Мем',
+            image=SimpleUploadedFile(name, SMALL_GIF, 'image/gif')
+        )
+
+    def collect(self, *args):
+        out = StringIO()
+        call_command('collect_media', *args, grace=0, stdout=out)
+        return out.getvalue()
+
+    def test_same_content_shares_file(self):
+        """Одинаковые загрузки ложатся в один файл."""
+        first = self.create_post('meme.gif')
+        second = self.create_post('repost.gif')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertRegex(
+            first.image.name, r'^posts/(\w\w/){2}[0-9a-f]{64}\.gif$'
+        )
+        self.assertEqual(MediaBlob.objects.get().refcount, 2)
+
+    def test_unreferenced_file_collected(self):
+        """Файл без ссылок удаляется, пока на него ссылаются - нет."""
+        first = self.create_post('meme.gif')
+        second = self.create_post('repost.gif')
+        storage = first.image.storage
+        name = first.image.name
+
+        first.delete()
+        self.assertIn('Удалено файлов: 0', self.collect())
+        self.assertTrue(storage.exists(name))
+
+        second.image = ''
+        second.save()
+        self.assertEqual(MediaBlob.objects.get().refcount, 0)
+        self.assertIn('Удалено файлов: 1', self.collect())
+        self.assertFalse(storage.exists(name))
+        self.assertFalse(MediaBlob.objects.exists())
+
+    def test_recount_repairs_refcount(self):
+        """--recount восстанавливает число ссылок по записям."""
+        self.create_post('meme.gif')
+        MediaBlob.objects.update(refcount=0)
+        self.assertIn(
+            'Исправлено счётчиков ссылок: 1', self.collect('--recount')
+        )
+        self.assertEqual(MediaBlob.objects.get().refcount, 1)
+
+    def test_shard_media_moves_legacy_files(self):
+        """Старые файлы переносятся в каталоги по хешу."""
+        legacy = FileSystemStorage().save(
+            'posts/legacy.gif', ContentFile(SMALL_GIF)
+        )
+        post = self.create_post('meme.gif')
+        Post.objects.filter(pk=post.pk).update(image=legacy)
+        MediaBlob.objects.update(refcount=0)
+
+        out = StringIO()
+        call_command('shard_media', stdout=out)
+        self.assertIn('осталось старых имён 0', out.getvalue())
+        post.refresh_from_db()
+        self.assertEqual(post.image.name, MediaBlob.objects.get(
+            refcount=1
+        ).name)
+        self.assertTrue(post.image.storage.exists(post.image.name))
+
+        self.assertIn('Удалено файлов: 1', self.collect())
+        self.assertFalse(post.image.storage.exists(legacy))
+        self.assertTrue(post.image.storage.exists(post.image.name))
+
+        out = StringIO()
+        call_command('shard_media', stdout=out)
+        self.assertIn('Готово: файлов 0', out.getvalue())
@@ -0,0 +1,190 @@
+# posts/tests/test_thumbnails.py
+import shutil
+import tempfile
+from concurrent.futures import Future
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.conf import settings  # type: ignore
+from django.contrib.auth import get_user_model  # type: ignore
+from django.core.cache import caches  # type: ignore
+from django.core.files.uploadedfile import SimpleUploadedFile  # type: ignore
+from django.core.management import call_command  # type: ignore
+from django.test import TestCase, override_settings  # type: ignore
+from PIL import Image  # type: ignore
+from sorl.thumbnail import get_thumbnail  # type: ignore
+
+from posts import thumbnails
+from posts.models import Post, ThumbnailJob
+from posts.presets import all_presets, formats, get_preset
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def image_file(name, color):
+    buffer = BytesIO()
+    Image.new('RGB', (2, 1), color).save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+class InlineExecutor:
+    """Пул без процессов: задача выполняется сразу при submit."""
+
+    def __init__(self, max_workers, initializer):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def submit(self, function, *args):
+        future = Future()
+        future.set_result(function(*args))
+        return future
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailsTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        author = User.objects.create_user(username='test-author')
+        cls.posts = [
+            Post.objects.create(
+                author=author,
+                text=f'Запись с картинкой {number}',
+                # разные картинки: одинаковые легли бы в один файл
+                image=image_file(f'small-{number}.png', (number, 0, 0))
+            )
+            for number in range(3)
+        ]
+        cls.post = cls.posts[0]
+        cls.names = [post.image.name for post in cls.posts]
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        # в хранилище sorl могли остаться миниатюры из других тестов
+        caches[settings.THUMBNAIL_CACHE].clear()
+
+    def test_generate_prepares_every_size(self):
+        """Для картинки готовятся все варианты всех пресетов."""
+        ready = thumbnails.generate(self.post.image.name)
+        self.assertEqual(
+            len(ready),
+            sum(len(preset.variants()) for preset in all_presets())
+        )
+        for thumbnail in ready:
+            with self.subTest(thumbnail=thumbnail.name):
+                self.assertTrue(thumbnail.exists())
+
+    def test_broken_image_is_reported(self):
+        """Ошибка в фоновом потоке не выходит за пределы задачи."""
+        with self.assertLogs('posts.thumbnails', 'ERROR'):
+            self.assertFalse(thumbnails.generate_safely('posts/missing.gif'))
+
+    def test_saved_image_is_queued(self):
+        """Картинка новой записи попадает в очередь на миниатюры."""
+        self.assertEqual(
+            set(ThumbnailJob.objects.values_list('image', flat=True)),
+            set(self.names)
+        )
+
+    def test_thumbnail_worker_drains_queue(self):
+        """Воркер готовит миниатюры из очереди и снимает задачи."""
+        out = StringIO()
+        call_command('thumbnail_worker', once=True, workers=1, stdout=out)
+        self.assertIn('готово: 3, ошибок: 0', out.getvalue())
+        self.assertFalse(ThumbnailJob.objects.exists())
+
+    def test_generate_thumbnails_command(self):
+        """Команда готовит миниатюры для всех записей."""
+        out = StringIO()
+        call_command('generate_thumbnails', workers=1, stdout=out)
+        self.assertIn('3/3, ошибок: 0', out.getvalue())
+
+    def test_image_names_in_batches(self):
+        """Имена картинок читаются порциями, без повторов."""
+        Post.objects.create(
+            author=self.post.author, text='Та же картинка', image=self.names[0]
+        )
+        with self.assertNumQueries(3):
+            self.assertEqual(
+                list(thumbnails.image_names(2)), sorted(self.names)
+            )
+
+    def test_generate_many_submits_in_bounded_chunks(self):
+        """Пулу отдаётся не больше нескольких картинок на процесс."""
+        pulled = []
+
+        def names():
+            for number in range(20):
+                pulled.append(number)
+                yield f'posts/{number}.png'
+
+        with mock.patch.object(
+            thumbnails, 'ProcessPoolExecutor', InlineExecutor
+        ), mock.patch.object(thumbnails, 'generate_in_worker', bool):
+            results = thumbnails.generate_many(names(), 2)
+            next(results)
+            self.assertEqual(
+                len(pulled), 2 * thumbnails.IN_FLIGHT_PER_WORKER + 1
+            )
+            self.assertEqual(len(list(results)), 19)
+
+    def test_resolve_matches_get_thumbnail(self):
+        """Пакетный поиск находит те же миниатюры, что и sorl."""
+        args = get_preset('card').thumbnail_args()
+        resolved = thumbnails.resolve(self.names, args)
+        for name in self.names:
+            for file, (geometry, options) in zip(resolved[name], args):
+                with self.subTest(name=name, geometry=geometry):
+                    self.assertEqual(
+                        file.name,
+                        get_thumbnail(name, geometry, **options).name
+                    )
+
+    def test_resolve_reads_store_once(self):
+        """Готовые миниатюры страницы читаются одним обращением."""
+        args = get_preset('card').thumbnail_args()
+        thumbnails.resolve(self.names, args)
+        with self.assertNumQueries(0):
+            thumbnails.resolve(self.names, args)
+        caches[settings.THUMBNAIL_CACHE].clear()
+        with self.assertNumQueries(1):
+            thumbnails.resolve(self.names, args)
+
+    def test_picture_srcset(self):
+        """Картинка отдаётся всеми ширинами пресета через srcset."""
+        preset = get_preset('card')
+        picture = thumbnails.pictures([self.post.image.name], preset)[
+            self.post.image.name
+        ]
+        for width in preset.widths:
+            with self.subTest(width=width):
+                self.assertIn(f' {width}w', picture.srcset)
+        self.assertEqual(
+            picture.src, picture.files[preset.widths[-1], formats()[0]].url
+        )
+
+    def test_narrow_screens_get_fewer_bytes(self):
+        """Узкому экрану достаётся вариант меньше самого широкого."""
+        preset = get_preset('card')
+        self.assertEqual(preset.choose(360), 480)
+        self.assertEqual(preset.choose(360, density=2), 720)
+        self.assertEqual(preset.choose(1280), 960)
+        out = StringIO()
+        call_command(
+            'feed_image_bytes', viewports=[320], density=1, stdout=out
+        )
+        self.assertIn('320px x1: 320w', out.getvalue())
+        self.assertNotIn('(-0%)', out.getvalue())
@@ -1,15 +1,22 @@
 # posts/tests/test_views.py
 import shutil
 import tempfile
+import warnings
+from io import StringIO
 
 from django.core.files.uploadedfile import SimpleUploadedFile  # type: ignore
 from django import forms  # type: ignore
 from django.conf import settings  # type: ignore
 from django.contrib.auth import get_user_model  # type: ignore
+from django.core.cache import cache  # type: ignore
+from django.core.cache.backends.base import CacheKeyWarning  # type: ignore
+from django.core.management import call_command  # type: ignore
 from django.test import Client, TestCase, override_settings  # type: ignore
 from django.urls import reverse  # type: ignore
 
-from posts.models import Follow, Group, Post
+from core.conditional import conditional_stats
+from posts.functions import CachedCountPaginator, bump_count_version
+from posts.models import Follow, Group, Post, PullAuthor, TimelineEntry
 
 User = get_user_model()
 
@@ -250,11 +257,49 @@ class PostPagesTests(TestCase):
         """Проверка кэша для index."""
         index_url = reverse('posts:index')
         response = self.author_client.get(index_url)
-        Post.objects.all().delete()
+        # обновление в обход сигналов не сбрасывает фрагмент
+        Post.objects.update(text='Изменённый текст')
         self.assertEqual(
             response.content,
             self.author_client.get(index_url).content
         )
+        Post.objects.all().delete()
+        self.assertNotEqual(
+            response.content,
+            self.author_client.get(index_url).content
+        )
+
+    def test_cache_invalidated_by_tags(self):
+        """Новые записи и комментарии сразу видны на кэшированных страницах."""
+        pages = (
+            reverse('posts:index'),
+            reverse('posts:group', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.post.author}),
+        )
+        for url in pages:
+            self.guest_client.get(url)
+        Post.objects.create(
+            author=PostPagesTests.user,
+            text='Свежая запись',
+            group=self.group
+        )
+        for url in pages:
+            with self.subTest(url=url):
+                self.assertContains(
+                    self.guest_client.get(url), 'Свежая запись'
+                )
+
+        detail_url = reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.pk}
+        )
+        self.guest_client.get(detail_url)
+        self.authorized_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.pk}),
+            {'text': 'Свежий комментарий'}
+        )
+        self.assertContains(
+            self.guest_client.get(detail_url), 'Свежий комментарий'
+        )
 
     def test_follow_and_unfollow(self):
         """Авторизованный пользователь может подписываться
@@ -304,9 +349,12 @@ class PaginatorViewsTest(TestCase):
                 + PaginatorViewsTest.POST_ON_SECOND_PAGE
             )
         )
+        # bulk_create не сдвигает счётчики групп
+        call_command('reconcile_counters', stdout=StringIO())
 
     def setUp(self):
         self.client = Client()
+        cache.clear()
 
         self.test_pages = (
             reverse('posts:index'),
@@ -331,3 +379,480 @@ class PaginatorViewsTest(TestCase):
                 len(response.context['page_obj']),
                 PaginatorViewsTest.POST_ON_SECOND_PAGE
             )
+
+
+class CachedCountPaginatorTest(TestCase):
+
+    PAGES = 20
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create_user(username='test-author')
+        Post.objects.bulk_create(
+            Post(author=cls.user, text='Тестовый текст')
+            for _ in range(settings.POSTS_PER_PAGE * cls.PAGES)
+        )
+
+    def setUp(self):
+        self.client = Client()
+        cache.clear()
+
+    def test_page_links_are_windowed(self):
+        """Паджинатор выводит только окно номеров вокруг текущей."""
+        response = self.client.get(reverse('posts:index'), {'page': 10})
+        window = settings.POSTS_PAGE_WINDOW
+        for number in range(10 - window, 10):
+            self.assertContains(response, f'?page={number}"')
+        for number in range(11, 10 + window + 1):
+            self.assertContains(response, f'?page={number}"')
+        self.assertNotContains(response, f'?page={10 - window - 1}"')
+        self.assertNotContains(response, f'?page={10 + window + 1}"')
+
+    def test_count_is_cached(self):
+        """COUNT(*) не повторяется и после новой записи, до истечения."""
+        post_list = Post.objects.all()
+        self.assertEqual(
+            CachedCountPaginator(post_list, 10).count,
+            settings.POSTS_PER_PAGE * self.PAGES
+        )
+        Post.objects.create(author=self.user, text='Новая запись')
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                CachedCountPaginator(post_list, 10).count,
+                settings.POSTS_PER_PAGE * self.PAGES
+            )
+        bump_count_version()
+        self.assertEqual(
+            CachedCountPaginator(post_list, 10).count,
+            settings.POSTS_PER_PAGE * self.PAGES + 1
+        )
+
+    @override_settings(POSTS_COUNT_CACHE_TIMEOUT=0)
+    def test_tagged_count_follows_etag(self):
+        """Число страниц главной меняется вместе с её ETag."""
+        url = reverse('posts:index')
+
+        def get():
+            response = self.client.get(url)
+            return (
+                response['ETag'],
+                response.context['page_obj'].paginator.num_pages
+            )
+
+        etag, num_pages = get()
+        # запись мимо сигналов не сдвигает теги; истечение кэша
+        # количеств не должно менять страницу под тем же ETag
+        Post.objects.bulk_create(
+            Post(author=self.user, text='Мимо сигналов')
+            for _ in range(settings.POSTS_PER_PAGE)
+        )
+        self.assertEqual(get(), (etag, num_pages))
+        Post.objects.create(author=self.user, text='Новая запись')
+        new_etag, new_num_pages = get()
+        self.assertNotEqual(new_etag, etag)
+        self.assertEqual(new_num_pages, num_pages + 2)
+
+    def test_stale_count_keeps_last_page(self):
+        """Устаревшее количество не обрезает последнюю страницу."""
+        post_list = Post.objects.all()
+        total = CachedCountPaginator(post_list, 10).count
+        Post.objects.create(author=self.user, text='Новая запись')
+        page = CachedCountPaginator(post_list, total + 10).page(1)
+        self.assertEqual(len(page), total + 1)
+
+
+@override_settings(POSTS_PAGINATION='cursor')
+class CursorPaginatorViewsTest(TestCase):
+
+    POST_ON_SECOND_PAGE = 1
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create_user(username='test-author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание'
+        )
+
+        Post.objects.bulk_create(
+            Post(
+                author=cls.user, text='Тестовый текст', group=cls.group
+            ) for _ in range(
+                settings.POSTS_PER_PAGE
+                + CursorPaginatorViewsTest.POST_ON_SECOND_PAGE
+            )
+        )
+
+    def setUp(self):
+        self.client = Client()
+
+        self.test_pages = (
+            reverse('posts:index'),
+            reverse('posts:group', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user}),
+        )
+
+    def test_cursor_pages_contain_right_records(self):
+        """Курсор ведёт на следующую страницу без повторов и пропусков."""
+        for adress in self.test_pages:
+            with self.subTest(adress=adress):
+                first_page = self.client.get(adress).context['page_obj']
+                self.assertEqual(len(first_page), settings.POSTS_PER_PAGE)
+                self.assertFalse(first_page.has_previous())
+
+                second_page = self.client.get(
+                    adress, {'cursor': first_page.next_cursor}
+                ).context['page_obj']
+                self.assertEqual(
+                    len(second_page),
+                    CursorPaginatorViewsTest.POST_ON_SECOND_PAGE
+                )
+                self.assertFalse(second_page.has_next())
+                self.assertEqual(
+                    Post.objects.count(),
+                    len({post.pk for post in first_page}
+                        | {post.pk for post in second_page})
+                )
+
+    def test_cursor_previous_page(self):
+        """Курсор назад возвращает предыдущую страницу."""
+        adress = reverse('posts:index')
+        first_page = self.client.get(adress).context['page_obj']
+        second_page = self.client.get(
+            adress, {'cursor': first_page.next_cursor}
+        ).context['page_obj']
+        previous_page = self.client.get(
+            adress, {'cursor': second_page.previous_cursor}
+        ).context['page_obj']
+        self.assertEqual(
+            [post.pk for post in previous_page],
+            [post.pk for post in first_page]
+        )
+        self.assertFalse(previous_page.has_previous())
+
+    def test_broken_cursor_returns_first_page(self):
+        """Битый курсор отдаёт первую страницу."""
+        response = self.client.get(
+            reverse('posts:index'), {'cursor': 'broken'}
+        )
+        self.assertEqual(
+            len(response.context['page_obj']),
+            settings.POSTS_PER_PAGE
+        )
+
+
+@override_settings(FOLLOW_FEED='timeline', TIMELINE_FANOUT_LIMIT=1)
+class TimelineFollowViewsTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username='test-author')
+        cls.star = User.objects.create_user(username='test-star')
+        cls.reader = User.objects.create_user(username='test-reader')
+        cls.other = User.objects.create_user(username='test-other')
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.follow_index_url = reverse('posts:follow_index')
+
+    def get_feed(self):
+        response = self.reader_client.get(self.follow_index_url)
+        return [post.text for post in response.context['page_obj']]
+
+    def test_follow_feed_from_timeline(self):
+        """Подписка, новая запись и отписка меняют материализованную ленту."""
+        old_post = Post.objects.create(author=self.author, text='Старая')
+        self.reader_client.get(
+            reverse('posts:profile_follow', args=(self.author,))
+        )
+        self.assertTrue(
+            TimelineEntry.objects.filter(
+                user=self.reader, post=old_post
+            ).exists()
+        )
+        Post.objects.create(author=self.author, text='Новая')
+        self.assertEqual(self.get_feed(), ['Новая', 'Старая'])
+
+        self.reader_client.get(
+            reverse('posts:profile_unfollow', args=(self.author,))
+        )
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.reader).exists()
+        )
+        self.assertEqual(self.get_feed(), [])
+
+    def test_pull_author_merged_on_read(self):
+        """Записи популярного автора подмешиваются при чтении."""
+        Follow.objects.create(user=self.other, author=self.star)
+        Follow.objects.create(user=self.reader, author=self.star)
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertTrue(PullAuthor.objects.filter(author=self.star).exists())
+
+        Post.objects.create(author=self.author, text='Обычная')
+        Post.objects.create(author=self.star, text='Популярная')
+        self.assertFalse(
+            TimelineEntry.objects.filter(post__author=self.star).exists()
+        )
+        self.assertEqual(self.get_feed(), ['Популярная', 'Обычная'])
+
+    def test_rebuild_timelines_command(self):
+        """Команда rebuild_timelines восстанавливает ленты."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        Post.objects.create(author=self.author, text='Запись')
+        TimelineEntry.objects.all().delete()
+
+        call_command('rebuild_timelines', stdout=StringIO())
+        self.assertEqual(self.get_feed(), ['Запись'])
+
+
+@override_settings(FOLLOW_FEED='merge')
+class MergedFollowViewsTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.reader = User.objects.create_user(username='test-reader')
+        authors = [
+            User.objects.create_user(username=f'test-author-{number}')
+            for number in range(3)
+        ]
+        for author in authors:
+            Follow.objects.create(user=cls.reader, author=author)
+        cls.posts = [
+            Post.objects.create(author=authors[number % 3], text=str(number))
+            for number in range(settings.POSTS_PER_PAGE + 2)
+        ]
+        Post.objects.create(
+            author=User.objects.create_user(username='test-stranger'),
+            text='Чужая запись'
+        )
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.follow_index_url = reverse('posts:follow_index')
+
+    def test_merged_feed_pages(self):
+        """Слияние лент авторов отдаёт ленту подписок по курсору."""
+        expected = Post.objects.filter(
+            author__following__user=self.reader
+        ).values_list('pk', flat=True)
+
+        first_page = self.reader_client.get(
+            self.follow_index_url
+        ).context['page_obj']
+        second_page = self.reader_client.get(
+            self.follow_index_url, {'cursor': first_page.next_cursor}
+        ).context['page_obj']
+        previous_page = self.reader_client.get(
+            self.follow_index_url, {'cursor': second_page.previous_cursor}
+        ).context['page_obj']
+
+        self.assertEqual(
+            [post.pk for post in first_page]
+            + [post.pk for post in second_page],
+            list(expected)
+        )
+        self.assertFalse(second_page.has_next())
+        self.assertEqual(
+            [post.pk for post in previous_page],
+            [post.pk for post in first_page]
+        )
+
+    def test_benchmark_uses_scratch_database(self):
+        """Замер не пишет в рабочую базу и повторяется без ошибок."""
+        posts = Post.objects.count()
+        for _ in range(2):
+            out = StringIO()
+            call_command(
+                'benchmark_follow_feed',
+                authors=[2, 3], posts=2, repeat=1, stdout=out
+            )
+            self.assertIn('\n3\t', out.getvalue())
+        self.assertFalse(
+            User.objects.filter(username__startswith='benchmark-').exists()
+        )
+        self.assertEqual(Post.objects.count(), posts)
+
+
+class ConditionalGetViewsTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create_user(username='test-author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание'
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, text='Тестовая запись', group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.urls = (
+            reverse('posts:index'),
+            reverse('posts:group', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        )
+
+    def test_etag_answers_not_modified(self):
+        """Неизменившаяся страница отвечает 304 по ETag."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                etag = self.guest_client.get(url)['ETag']
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, 304)
+
+    def test_new_post_changes_etag(self):
+        """После новой записи страницы строятся заново."""
+        etags = {url: self.guest_client.get(url)['ETag'] for url in self.urls}
+        Post.objects.create(
+            author=self.user, text='Свежая запись', group=self.group
+        )
+        for url in self.urls[:3]:
+            with self.subTest(url=url):
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=etags[url]
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertContains(response, 'Свежая запись')
+
+    def test_last_modified_for_guests(self):
+        """Гостю страница отвечает 304 по If-Modified-Since."""
+        url = self.urls[0]
+        last_modified = self.guest_client.get(url)['Last-Modified']
+        response = self.guest_client.get(
+            url, HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+        self.assertEqual(response.status_code, 304)
+
+        authorized_client = Client()
+        authorized_client.force_login(self.user)
+        self.assertFalse(authorized_client.get(url).has_header(
+            'Last-Modified'
+        ))
+
+    def test_unicode_names_in_cache_keys(self):
+        """Юникодные имена в адресе дают допустимые ключи кэша."""
+        User.objects.create_user(username='лев')
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', CacheKeyWarning)
+            response = self.guest_client.get(
+                reverse('posts:profile', kwargs={'username': 'лев'})
+            )
+        self.assertEqual(response.status_code, 200)
+
+    def test_unknown_profile_not_found(self):
+        """Профиль несуществующего пользователя - 404, а не ошибка."""
+        response = self.guest_client.get(
+            reverse('posts:profile', kwargs={'username': 'nobody'})
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_not_modified_counted(self):
+        """Ответы 304 учитываются по страницам."""
+        url = self.urls[0]
+        requests, not_modified = conditional_stats(['index'])['index']
+        etag = self.guest_client.get(url)['ETag']
+        self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(
+            conditional_stats(['index'])['index'],
+            (requests + 2, not_modified + 1)
+        )
+
+
+class FeedsTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create_user(
+            username='feed-author', first_name='Лев', last_name='Толстой'
+        )
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание'
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, text='Запись для ленты', group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_feeds(self):
+        """Ленты RSS и Atom отдают записи главной, группы и автора."""
+        for url, content_type in (
+            (reverse('posts:feed', args=['rss']), 'application/rss+xml'),
+            (
+                reverse('posts:group_feed', args=['test-slug', 'atom']),
+                'application/atom+xml'
+            ),
+            (
+                reverse('posts:profile_feed', args=['feed-author', 'rss']),
+                'application/rss+xml'
+            ),
+        ):
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertTrue(response['Content-Type'].startswith(
+                    content_type
+                ))
+                self.assertContains(response, 'Запись для ленты')
+                self.assertContains(
+                    response,
+                    reverse('posts:post_detail', args=[self.post.pk])
+                )
+
+    def test_unknown_feeds(self):
+        """Неизвестный формат, группа или автор дают 404."""
+        for url in (
+            reverse('posts:feed', args=['json']),
+            reverse('posts:group_feed', args=['no-such-group', 'rss']),
+            reverse('posts:profile_feed', args=['nobody', 'atom']),
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(self.guest_client.get(url).status_code, 404)
+
+    def test_feed_cache_and_conditional_get(self):
+        """Лента берётся из кэша и отвечает 304, пока нет новых записей."""
+        url = reverse('posts:feed', args=['atom'])
+        response = self.guest_client.get(url)
+        with self.assertNumQueries(0):
+            cached = self.guest_client.get(url)
+        self.assertEqual(cached.content, response.content)
+        with self.assertNumQueries(0):
+            not_modified = self.guest_client.get(
+                url,
+                HTTP_IF_NONE_MATCH=response['ETag'],
+                HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+            )
+        self.assertEqual(not_modified.status_code, 304)
+
+        Post.objects.create(author=self.user, text='Свежая запись')
+        response = self.guest_client.get(
+            url, HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Свежая запись')
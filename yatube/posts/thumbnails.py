@@ -0,0 +1,231 @@
+"""Миниатюры картинок записей, приготовленные заранее.
+
+Без этого sorl-thumbnail режет картинку при первом показе, и первый
+посетитель после загрузки ждёт Pillow внутри запроса. Сохранение записи
+ставит картинку в очередь (ThumbnailJob) в той же транзакции, а все
+варианты из пресетов (posts.presets) готовит пул процессов команды
+thumbnail_worker.
+"""
+import logging
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import django  # type: ignore
+from django.db import connections  # type: ignore
+from sorl.thumbnail import default, get_thumbnail  # type: ignore
+from sorl.thumbnail.conf import defaults as sorl_defaults  # type: ignore
+from sorl.thumbnail.conf import settings as sorl_settings  # type: ignore
+from sorl.thumbnail.images import (  # type: ignore
+    ImageFile,
+    deserialize_image_file
+)
+from sorl.thumbnail.kvstores.base import add_prefix  # type: ignore
+from sorl.thumbnail.models import KVStore  # type: ignore
+
+from .models import Post, ThumbnailJob
+from .presets import Picture, all_presets
+
+logger = logging.getLogger(__name__)
+
+# сколько картинок на процесс пула отдано вперёд
+IN_FLIGHT_PER_WORKER = 2
+
+
+def generate(name):
+    """Готовит все варианты всех пресетов для файла из хранилища.
+
+    Возвращает готовые миниатюры. sorl-thumbnail не бросает исключений
+    на битых файлах, поэтому отсутствие результата проверяется здесь.
+    """
+    ready = []
+    for preset in all_presets():
+        for geometry, options in preset.thumbnail_args():
+            thumbnail = get_thumbnail(name, geometry, **options)
+            if not thumbnail.exists():
+                raise FileNotFoundError(f'Миниатюра {geometry} для {name}')
+            ready.append(thumbnail)
+    return ready
+
+
+def generate_safely(name):
+    """generate без исключений: ошибки пишутся в лог."""
+    try:
+        generate(name)
+        return True
+    except Exception:
+        logger.exception('Не удалось приготовить миниатюры %s', name)
+        return False
+
+
+def generate_in_worker(name):
+    """generate_safely для процесса пула."""
+    try:
+        return generate_safely(name)
+    finally:
+        connections.close_all()
+
+
+def _init_worker():
+    # при запуске через spawn процесс начинает с пустого Django
+    django.setup()
+
+
+def thumbnail_file(name, geometry, options):
+    """Файл миниатюры, который вернул бы get_thumbnail.
+
+    Повторяет расчёт имени из ThumbnailBackend.get_thumbnail, но не
+    обращается ни к хранилищу sorl, ни к файлам.
+    """
+    backend = default.backend
+    source = ImageFile(name)
+    options = dict(options)
+    if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(sorl_defaults, attr):
+            options.setdefault(key, value)
+    return ImageFile(
+        backend._get_thumbnail_filename(source, geometry, options),
+        default.storage
+    )
+
+
+def _read_kvstore(keys):
+    """Сырые значения хранилища sorl: get_many кэша и запрос для промахов."""
+    kvstore = default.kvstore
+    found = {
+        key: value for key, value in kvstore.cache.get_many(keys).items()
+        # sorl кэширует отсутствие значения особым маркером
+        if isinstance(value, str)
+    }
+    missing = [key for key in keys if key not in found]
+    if missing:
+        stored = dict(
+            KVStore.objects.filter(key__in=missing).values_list(
+                'key', 'value'
+            )
+        )
+        if stored:
+            kvstore.cache.set_many(
+                stored, sorl_settings.THUMBNAIL_CACHE_TIMEOUT
+            )
+        found.update(stored)
+    return found
+
+
+def resolve(names, args):
+    """Миниатюры многих картинок во многих вариантах сразу.
+
+    args - пары (geometry, options) для get_thumbnail. Готовые миниатюры
+    читаются из хранилища sorl одним обращением к кэшу (и одним запросом
+    к базе, если в кэше их нет), недостающие режутся get_thumbnail.
+    Возвращает {имя картинки: [ImageFile в порядке args]}.
+    """
+    names = [name for name in dict.fromkeys(names) if name]
+    files = {
+        (name, number): thumbnail_file(name, geometry, options)
+        for name in names
+        for number, (geometry, options) in enumerate(args)
+    }
+    found = {}
+    # хранилище без кэша читается по одной миниатюре
+    if hasattr(default.kvstore, 'cache'):
+        keys = {add_prefix(file.key): slot for slot, file in files.items()}
+        found = {
+            keys[key]: deserialize_image_file(value)
+            for key, value in _read_kvstore(list(keys)).items()
+        }
+    for name, number in files.keys() - found.keys():
+        geometry, options = args[number]
+        found[name, number] = get_thumbnail(name, geometry, **options)
+    return {
+        name: [found[name, number] for number in range(len(args))]
+        for name in names
+    }
+
+
+def pictures(names, preset):
+    """{имя картинки: Picture} для всех картинок в одном пресете."""
+    return {
+        name: Picture(preset, files)
+        for name, files in resolve(names, preset.thumbnail_args()).items()
+    }
+
+
+def image_names(batch_size):
+    """Имена всех картинок записей без повторов, по порядку имён.
+
+    Каждая порция читается отдельным запросом до конца, поэтому между
+    порциями соединение с базой можно закрывать.
+    """
+    names = Post.objects.exclude(image='').order_by('image').values_list(
+        'image', flat=True
+    ).distinct()
+    batch = list(names[:batch_size])
+    while batch:
+        yield from batch
+        batch = list(names.filter(image__gt=batch[-1])[:batch_size])
+
+
+def generate_many(names, workers):
+    """generate_safely для многих файлов; результаты идут по порядку.
+
+    Pillow режет картинки в процессах пула, по одному на ядро. Пулу
+    отдаётся не больше IN_FLIGHT_PER_WORKER картинок на процесс, и
+    следующее имя берётся из names, только когда готова старейшая, так
+    что память не растёт с числом картинок. names не должен держать
+    открытый курсор: перед пулом соединения закрываются.
+    """
+    if workers <= 1:
+        # без пула: в одном процессе с соединением вызывающего
+        yield from map(generate_safely, names)
+        return
+    names = iter(names)
+    # первые имена читаются до пула: fork при первой задаче иначе унёс
+    # бы в детей соединение, открытое этим чтением
+    first = list(islice(names, workers * IN_FLIGHT_PER_WORKER))
+    connections.close_all()
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker
+    ) as pool:
+        pending = deque(
+            pool.submit(generate_in_worker, name) for name in first
+        )
+        for name in names:
+            yield pending.popleft().result()
+            pending.append(pool.submit(generate_in_worker, name))
+        while pending:
+            yield pending.popleft().result()
+
+
+def schedule(name):
+    """Ставит файл в очередь; задача фиксируется вместе с записью."""
+    if name:
+        ThumbnailJob.objects.bulk_create(
+            [ThumbnailJob(image=name)], ignore_conflicts=True
+        )
+
+
+def process_queue(workers, batch_size):
+    """Разбирает очередь до конца; возвращает (готово, ошибок).
+
+    Ошибки пишутся в лог, а задача всё равно снимается: битую картинку
+    незачем пробовать снова, остальные повторит generate_thumbnails.
+    """
+    done = failed = 0
+    while True:
+        jobs = list(
+            ThumbnailJob.objects.order_by('pk').values_list(
+                'pk', 'image'
+            )[:batch_size]
+        )
+        if not jobs:
+            return done, failed
+        for ok in generate_many([image for _, image in jobs], workers):
+            done += ok
+            failed += not ok
+        ThumbnailJob.objects.filter(pk__in=[pk for pk, _ in jobs]).delete()
@@ -0,0 +1,205 @@
+import heapq
+from itertools import islice
+
+from django.conf import settings  # type: ignore
+from django.db import transaction  # type: ignore
+from django.db.models import Count, Q  # type: ignore
+
+from .functions import CURSOR_NEXT, CursorPage, decode_cursor
+from .models import Follow, Post, PullAuthor, TimelineEntry
+
+
+def timelines_enabled():
+    return settings.FOLLOW_FEED == 'timeline'
+
+
+def merge_enabled():
+    return settings.FOLLOW_FEED == 'merge'
+
+
+def is_pull_author(author_id):
+    return PullAuthor.objects.filter(author_id=author_id).exists()
+
+
+def _bulk_insert(entries):
+    TimelineEntry.objects.bulk_create(
+        entries,
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True
+    )
+
+
+def fan_out(post):
+    """Раскладывает новую запись по лентам подписчиков автора."""
+    if is_pull_author(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    batch = []
+    for user_id in followers.iterator():
+        batch.append(
+            TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+        )
+        if len(batch) >= settings.TIMELINE_BATCH_SIZE:
+            _bulk_insert(batch)
+            batch = []
+    _bulk_insert(batch)
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту последние записи автора после подписки."""
+    if Follow.objects.filter(author_id=author_id).count() > (
+        settings.TIMELINE_FANOUT_LIMIT
+    ):
+        PullAuthor.objects.get_or_create(author_id=author_id)
+    if is_pull_author(author_id):
+        return
+    posts = Post.objects.filter(author_id=author_id).values_list(
+        'pk', 'pub_date'
+    )[:settings.TIMELINE_LENGTH]
+    _bulk_insert(
+        TimelineEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+        for pk, pub_date in posts
+    )
+
+
+def trim(user_id, author_id):
+    """Убирает из ленты записи автора после отписки."""
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+def rebuild(user_ids=None):
+    """Пересобирает ленты заново; возвращает число обработанных лент."""
+    heavy_ids = [
+        row['author_id'] for row in Follow.objects.order_by().values(
+            'author_id'
+        ).annotate(
+            followers=Count('user')
+        ).filter(followers__gt=settings.TIMELINE_FANOUT_LIMIT)
+    ]
+    with transaction.atomic():
+        PullAuthor.objects.exclude(author_id__in=heavy_ids).delete()
+        PullAuthor.objects.bulk_create(
+            [PullAuthor(author_id=author_id) for author_id in heavy_ids],
+            ignore_conflicts=True
+        )
+
+    stale = TimelineEntry.objects.exclude(
+        user_id__in=Follow.objects.values('user_id')
+    )
+    if user_ids is not None:
+        stale = stale.filter(user_id__in=user_ids)
+    stale.delete()
+
+    readers = Follow.objects.order_by('user_id').values_list(
+        'user_id', flat=True
+    ).distinct()
+    if user_ids is not None:
+        readers = readers.filter(user_id__in=user_ids)
+    rebuilt = 0
+    for user_id in readers.iterator():
+        posts = Post.objects.filter(
+            author__following__user_id=user_id,
+            author__pull_author__isnull=True
+        ).values_list('pk', 'pub_date')[:settings.TIMELINE_LENGTH]
+        with transaction.atomic():
+            TimelineEntry.objects.filter(user_id=user_id).delete()
+            _bulk_insert(
+                TimelineEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+                for pk, pub_date in posts
+            )
+        rebuilt += 1
+    return rebuilt
+
+
+def timeline_posts(user):
+    """Лента подписок, прочитанная из материализованной таблицы.
+
+    Записи авторов без рассылки подмешиваются при чтении.
+    """
+    posts = Post.objects.select_related('author', 'group')
+    pull_ids = list(
+        Follow.objects.filter(
+            user=user, author__pull_author__isnull=False
+        ).values_list('author_id', flat=True)
+    )
+    if not pull_ids:
+        return posts.filter(timeline_entries__user=user).order_by(
+            '-timeline_entries__pub_date', '-pk'
+        )
+    entries = TimelineEntry.objects.filter(user=user).values('post_id')
+    return posts.filter(Q(pk__in=entries) | Q(author_id__in=pull_ids))
+
+
+class MergedFollowPaginator:
+    """Лента подписок, собранная слиянием лент авторов.
+
+    Для каждого автора из индекса (author, pub_date) берутся только
+    ключи последних записей после курсора, затем они сливаются кучей.
+    Курсор страницы служит курсором для каждого автора: следующая
+    страница продолжает каждую ленту с позиции (pub_date, id).
+    """
+
+    is_cursor = True
+
+    def __init__(self, user, per_page):
+        self.user = user
+        self.per_page = int(per_page)
+
+    def author_ids(self):
+        return list(
+            Follow.objects.filter(user=self.user).order_by().values_list(
+                'author_id', flat=True
+            )
+        )
+
+    def _author_keys(self, author_id, position):
+        posts = Post.objects.filter(author_id=author_id)
+        order = ('-pub_date', '-pk')
+        if position is not None:
+            direction, pub_date, pk = position
+            if direction == CURSOR_NEXT:
+                posts = posts.filter(
+                    Q(pub_date__lt=pub_date)
+                    | Q(pub_date=pub_date, pk__lt=pk)
+                )
+            else:
+                posts = posts.filter(
+                    Q(pub_date__gt=pub_date)
+                    | Q(pub_date=pub_date, pk__gt=pk)
+                )
+                order = ('pub_date', 'pk')
+        return list(
+            posts.order_by(*order).values_list(
+                'pub_date', 'pk'
+            )[:self.per_page + 1]
+        )
+
+    def get_page(self, cursor=None):
+        position = decode_cursor(cursor)
+        backwards = position is not None and position[0] != CURSOR_NEXT
+        streams = [
+            self._author_keys(author_id, position)
+            for author_id in self.author_ids()
+        ]
+        keys = list(islice(
+            heapq.merge(*streams, reverse=not backwards),
+            self.per_page + 1
+        ))
+        has_more = len(keys) > self.per_page
+        keys = keys[:self.per_page]
+        if backwards:
+            keys.reverse()
+
+        posts = Post.objects.select_related('author', 'group').in_bulk(
+            [pk for _, pk in keys]
+        )
+        page_posts = [posts[pk] for _, pk in keys if pk in posts]
+        if backwards:
+            return CursorPage(page_posts, self, cursor, True, has_more)
+        return CursorPage(
+            page_posts, self, cursor, has_more, position is not None
+        )
@@ -0,0 +1,163 @@
+"""Приём картинок записей.
+
+Загрузка пишется на диск порциями (TemporaryFileUploadHandler), а
+порции слишком большого файла перестают сохраняться, как только он
+превысил предел: остаток тела запроса Django всё равно дочитывает,
+но никуда не пишет. Перед
+сохранением картинка проверяется по заголовку (размер в пикселях -
+защита от бомб-декомпрессоров), поворачивается по EXIF, теряет
+метаданные и уменьшается до POST_IMAGE_MAX_SIDE. Память воркера
+ограничена POST_IMAGE_MAX_PIXELS, а не размером загрузки.
+"""
+import os
+import tempfile
+from io import BytesIO
+
+from django.conf import settings  # type: ignore
+from django.core.exceptions import ValidationError  # type: ignore
+from django.core.files.uploadedfile import UploadedFile  # type: ignore
+from django.core.files.uploadhandler import FileUploadHandler  # type: ignore
+from django.template.defaultfilters import (  # type: ignore
+    filesizeformat,
+    floatformat
+)
+from PIL import Image, ImageOps  # type: ignore
+
+# форматы, которые сохраняются как есть, и их расширения; прочие - в PNG
+SAVE_FORMATS = {
+    'JPEG': ('jpg', 'jpeg'),
+    'PNG': ('png',),
+    'GIF': ('gif',),
+    'WEBP': ('webp',),
+}
+# несколько кадров JPEG с камер телефонов
+FORMAT_ALIASES = {'MPO': 'JPEG'}
+# всё остальное из image.info - метаданные (EXIF, XMP, комментарии);
+# без профиля исказятся цвета, без прозрачности - фон палитровых картинок
+KEEP_INFO = ('icc_profile', 'transparency')
+
+
+class OversizedUpload(UploadedFile):
+    """Файл, отброшенный при загрузке: известен только его размер."""
+
+    def __init__(self, name, content_type, size):
+        super().__init__(BytesIO(), name, content_type, size)
+
+
+class LimitedUploadHandler(FileUploadHandler):
+    """Перестаёт сохранять файл, как только он превысил предел.
+
+    Остальные поля формы читаются как обычно, а вместо файла форма
+    получает OversizedUpload и сообщает пользователю о размере.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+        self.oversized = False
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > settings.POST_IMAGE_MAX_BYTES:
+            self.oversized = True
+        # None не пускает порцию к следующим обработчикам
+        return None if self.oversized else raw_data
+
+    def file_complete(self, file_size):
+        if not self.oversized:
+            return None
+        return OversizedUpload(
+            self.file_name, self.content_type, self.received
+        )
+
+
+def oversized_error():
+    return ValidationError(
+        'Файл больше %(limit)s.',
+        code='file_too_large',
+        params={'limit': filesizeformat(settings.POST_IMAGE_MAX_BYTES)}
+    )
+
+
+def pixels_format(pixels):
+    """«24 Мп», «0,5 Мп» или, для совсем малых пределов, «100 пикселей»."""
+    if pixels >= 10 ** 5:
+        return f'{floatformat(pixels / 10 ** 6, -1)} Мп'
+    return f'{pixels} пикселей'
+
+
+def check_pixels(image):
+    """Размер в пикселях известен из заголовка, без распаковки."""
+    width, height = image.size
+    if width * height > settings.POST_IMAGE_MAX_PIXELS:
+        raise ValidationError(
+            'Картинка больше %(limit)s.',
+            code='too_many_pixels',
+            params={'limit': pixels_format(settings.POST_IMAGE_MAX_PIXELS)}
+        )
+
+
+def _open(upload):
+    if hasattr(upload, 'temporary_file_path'):
+        return Image.open(upload.temporary_file_path())
+    upload.seek(0)
+    return Image.open(upload)
+
+
+def _output_name(name, fmt):
+    root, extension = os.path.splitext(os.path.basename(name))
+    if extension.lower().lstrip('.') in SAVE_FORMATS[fmt]:
+        return f'{root}{extension}'
+    return f'{root}.{SAVE_FORMATS[fmt][0]}'
+
+
+def _rebuild(image, name):
+    fmt = FORMAT_ALIASES.get(image.format, image.format)
+    if fmt not in SAVE_FORMATS:
+        fmt = 'PNG'
+    max_side = settings.POST_IMAGE_MAX_SIDE
+    # JPEG умеет распаковываться сразу в уменьшенном масштабе
+    image.draft(image.mode, (max_side, max_side))
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((max_side, max_side), Image.LANCZOS)
+    if fmt == 'JPEG' and image.mode not in ('RGB', 'L', 'CMYK'):
+        image = image.convert('RGB')
+
+    image.info = {
+        key: value for key, value in image.info.items() if key in KEEP_INFO
+    }
+    options = {}
+    if fmt == 'JPEG' and 'icc_profile' in image.info:
+        # JPEG берёт профиль только из параметров сохранения
+        options['icc_profile'] = image.info['icc_profile']
+    if fmt in ('JPEG', 'WEBP'):
+        options['quality'] = settings.POST_IMAGE_QUALITY
+
+    # безымянный временный файл: хранилище скопирует его порциями
+    output = tempfile.TemporaryFile(dir=settings.FILE_UPLOAD_TEMP_DIR)
+    image.save(output, fmt, **options)
+    size = output.tell()
+    output.seek(0)
+    return UploadedFile(
+        output, _output_name(name, fmt), Image.MIME[fmt], size
+    )
+
+
+def normalize(upload):
+    """Картинка без метаданных, повёрнутая по EXIF и не больше предела.
+
+    Анимированные картинки сохраняются как есть: пересборка оставила
+    бы от них один кадр.
+    """
+    with _open(upload) as image:
+        check_pixels(image)
+        if getattr(image, 'is_animated', False):
+            upload.seek(0)
+            return upload
+        try:
+            return _rebuild(image, upload.name)
+        except OSError:
+            # заголовок цел, а данные обрезаны или испорчены
+            raise ValidationError(
+                'Картинка повреждена.', code='invalid_image'
+            )
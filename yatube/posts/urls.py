@@ -1,6 +1,6 @@
 from django.urls import path  # type: ignore
 
-from . import views
+from . import feeds, views
 
 
 app_name = 'posts'
@@ -10,6 +10,18 @@ urlpatterns = [
     path('group/<slug:slug>/', views.group_posts, name='group'),
     path('profile/<str:username>/', views.profile, name='profile'),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
+    path('search/', views.search, name='search'),
+    path('feed/<str:feed_format>/', feeds.index_feed, name='feed'),
+    path(
+        'group/<slug:slug>/feed/<str:feed_format>/',
+        feeds.group_feed,
+        name='group_feed'
+    ),
+    path(
+        'profile/<str:username>/feed/<str:feed_format>/',
+        feeds.author_feed,
+        name='profile_feed'
+    ),
     path('create/', views.post_create, name='post_create'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
     path(
@@ -1,3 +1,4 @@
+from django.conf import settings  # type: ignore
 from django.contrib.auth.decorators import login_required  # type: ignore
 from django.shortcuts import (  # type: ignore
     get_object_or_404,
@@ -5,68 +6,122 @@ from django.shortcuts import (  # type: ignore
     render
 )
 
+from core.conditional import tagged_condition
+
+from .cache_keys import (
+    group_tags,
+    index_tags,
+    post_detail_tags,
+    profile_tags
+)
+from .counters import author_stats
 from .forms import CommentForm, PostForm
-from .functions import get_page
+from .functions import CachedCountPaginator, get_page
+from .timelines import (
+    MergedFollowPaginator,
+    merge_enabled,
+    timeline_posts,
+    timelines_enabled
+)
 from .models import Follow, Group, Post, User
+from .search import search_posts
 
 
+@tagged_condition(index_tags)
 def index(request):
     post_list = Post.objects.select_related('author', 'group')
-    page_obj = get_page(request, post_list)
-    return render(request, 'posts/index.html', {'page_obj': page_obj})
+    page_obj = get_page(request, post_list, tags=index_tags(request))
+    return render(
+        request,
+        'posts/index.html',
+        {
+            'page_obj': page_obj,
+            'cache_tags': index_tags(request),
+        },
+    )
 
 
+@tagged_condition(group_tags)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
     post_list = Post.objects.select_related('author').filter(group=group)
-    page_obj = get_page(request, post_list)
+    page_obj = get_page(request, post_list, count=group.posts_count)
     return render(
         request,
         'posts/group_list.html',
         {
             'group': group,
             'page_obj': page_obj,
+            'cache_tags': [f'group:{group.pk}'],
         },
     )
 
 
+@tagged_condition(profile_tags)
 def profile(request, username):
-    author = User.objects.get(username=username)
-    post_list = author.posts.all()
-    page_obj = get_page(request, post_list)
-    following = (
-        Follow.objects.filter(
-            user=User.objects.filter(username=request.user).first(),
-            author=author
-        )
-    ).exists()
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    stats = author_stats(author)
+    post_list = author.posts.select_related('group')
+    page_obj = get_page(request, post_list, count=stats.posts_count)
+    following = request.user.is_authenticated and (
+        Follow.objects.filter(user=request.user, author=author).exists()
+    )
     return render(
         request,
         'posts/profile.html',
         {
             'author': author,
             'page_obj': page_obj,
-            'following': following
+            'following': following,
+            'cache_tags': [f'author:{author.pk}', 'groups'],
         },
     )
 
 
+@tagged_condition(post_detail_tags)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'),
+        pk=post_id
+    )
+    author_stats(post.author)
     form = CommentForm(request.POST or None)
-    comments = post.comments.all()
+    comments = post.comments.select_related('author')
     return render(
         request,
         'posts/post_detail.html',
         {
             'post': post,
             'comments': comments,
-            'form': form
+            'form': form,
+            'cache_tags': [f'post:{post.pk}'],
         }
 
     )
 
 
+def search(request):
+    query = request.GET.get('q', '').strip()
+    page_obj = None
+    if query:
+        post_list = search_posts(
+            Post.objects.select_related('author', 'group'), query
+        )
+        # у выдачи по релевантности нет ключа для курсора
+        paginator = CachedCountPaginator(post_list, settings.POSTS_PER_PAGE)
+        page_obj = paginator.get_page(request.GET.get('page'))
+    return render(
+        request,
+        'posts/search.html',
+        {
+            'query': query,
+            'page_obj': page_obj,
+        },
+    )
+
+
 @login_required
 def post_create(request):
     if request.method == 'POST':
@@ -87,7 +142,7 @@ def post_create(request):
 @login_required
 def post_edit(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
-    if post.author == request.user:
+    if post.author_id == request.user.pk:
         form = PostForm(
             request.POST or None,
             files=request.FILES or None,
@@ -122,9 +177,18 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    post_list = Post.objects.select_related("author").filter(
-        author__following__user=request.user
-    )
+    if merge_enabled():
+        paginator = MergedFollowPaginator(
+            request.user, settings.POSTS_PER_PAGE
+        )
+        page_obj = paginator.get_page(request.GET.get('cursor'))
+        return render(request, 'posts/follow.html', {'page_obj': page_obj})
+    if timelines_enabled():
+        post_list = timeline_posts(request.user)
+    else:
+        post_list = Post.objects.select_related('author', 'group').filter(
+            author__following__user=request.user
+        )
     page_obj = get_page(request, post_list)
     return render(request, 'posts/follow.html', {'page_obj': page_obj})
 
@@ -0,0 +1,159 @@
+"""Архив с данными пользователя, который собирается на лету.
+
+ZIP пишется в буфер без seek (zipfile тогда сам ставит дескрипторы
+данных после каждого файла), а буфер опустошается кусками по мере
+записи. Строки таблиц читаются через iterator() порциями, картинки -
+из хранилища блоками, так что в памяти не бывает больше одного куска.
+Строки posts.jsonl, comments.jsonl и follows.jsonl подходят для
+команды import_content.
+"""
+import json
+import time
+import zipfile
+
+from django.core.serializers.json import DjangoJSONEncoder  # type: ignore
+
+from posts.models import Comment, Follow, Post
+
+# размер куска ответа и блока чтения картинки
+CHUNK_SIZE = 64 * 1024
+# сколько строк базы читать за раз
+ITERATOR_CHUNK_SIZE = 2000
+
+
+class StreamBuffer:
+    """Файл только для записи, из которого забирают накопленное."""
+
+    def __init__(self):
+        self.parts = []
+        self.size = 0
+        self.position = 0
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.size += len(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b''.join(self.parts)
+        self.parts = []
+        self.size = 0
+        return data
+
+
+def post_rows(user):
+    posts = Post.objects.filter(author=user).order_by('pk').values_list(
+        'pk', 'text', 'pub_date', 'group__slug', 'image'
+    )
+    for pk, text, pub_date, group, image in posts.iterator(
+        chunk_size=ITERATOR_CHUNK_SIZE
+    ):
+        yield {
+            'id': pk,
+            'author': user.username,
+            'text': text,
+            'pub_date': pub_date,
+            'group': group,
+            'image': image,
+        }
+
+
+def comment_rows(user):
+    comments = Comment.objects.filter(author=user).order_by('pk').values_list(
+        'post_id', 'text', 'created'
+    )
+    for post_id, text, created in comments.iterator(
+        chunk_size=ITERATOR_CHUNK_SIZE
+    ):
+        yield {
+            'post': post_id,
+            'author': user.username,
+            'text': text,
+            'created': created,
+        }
+
+
+def follow_rows(user):
+    authors = Follow.objects.filter(user=user).order_by('pk').values_list(
+        'author__username', flat=True
+    )
+    for author in authors.iterator(chunk_size=ITERATOR_CHUNK_SIZE):
+        yield {'user': user.username, 'author': author}
+
+
+def image_names(user):
+    # одинаковые картинки лежат в хранилище одним файлом
+    return Post.objects.filter(author=user).exclude(image='').order_by(
+        'image'
+    ).values_list('image', flat=True).distinct().iterator(
+        chunk_size=ITERATOR_CHUNK_SIZE
+    )
+
+
+def _entry(archive, name, compress_type):
+    info = zipfile.ZipInfo(name, time.localtime()[:6])
+    info.compress_type = compress_type
+    # размер заранее неизвестен
+    return archive.open(info, 'w', force_zip64=True)
+
+
+def _json_lines(rows):
+    for row in rows:
+        yield (
+            json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+        ).encode()
+
+
+def _file_blocks(storage, name):
+    with storage.open(name) as file:
+        while True:
+            block = file.read(CHUNK_SIZE)
+            if not block:
+                return
+            yield block
+
+
+def _profile(user):
+    yield json.dumps({
+        'username': user.username,
+        'first_name': user.first_name,
+        'last_name': user.last_name,
+        'email': user.email,
+        'date_joined': user.date_joined,
+    }, cls=DjangoJSONEncoder, ensure_ascii=False).encode()
+
+
+def _entries(user):
+    """Тройки (имя в архиве, куски содержимого, сжатие)."""
+    yield 'profile.json', _profile(user), zipfile.ZIP_DEFLATED
+    for name, rows in (
+        ('posts.jsonl', post_rows(user)),
+        ('comments.jsonl', comment_rows(user)),
+        ('follows.jsonl', follow_rows(user)),
+    ):
+        yield name, _json_lines(rows), zipfile.ZIP_DEFLATED
+    storage = Post._meta.get_field('image').storage
+    for image in image_names(user):
+        if storage.exists(image):
+            # картинки уже сжаты
+            yield image, _file_blocks(storage, image), zipfile.ZIP_STORED
+
+
+def stream_archive(user):
+    """Куски ZIP-архива с записями, комментариями, подписками и картинками."""
+    buffer = StreamBuffer()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        for name, chunks, compress_type in _entries(user):
+            with _entry(archive, name, compress_type) as entry:
+                for chunk in chunks:
+                    entry.write(chunk)
+                    if buffer.size >= CHUNK_SIZE:
+                        yield buffer.pop()
+    yield buffer.pop()
@@ -0,0 +1,40 @@
+from django.contrib.auth import get_user_model  # type: ignore
+from django.core.management.base import (  # type: ignore
+    BaseCommand,
+    CommandError
+)
+
+from users.export import stream_archive
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает записи, комментарии, подписки и картинки '
+        'пользователя в ZIP-архив.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument(
+            '--output',
+            help='Куда записать архив; по умолчанию yatube-<username>.zip.'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(
+                f'Пользователь {options["username"]} не найден'
+            )
+        output = options['output'] or f'yatube-{user.username}.zip'
+        size = 0
+        with open(output, 'wb') as file:
+            for chunk in stream_archive(user):
+                file.write(chunk)
+                size += len(chunk)
+        self.stdout.write(
+            self.style.SUCCESS(f'Архив {output}: {size} байт')
+        )
@@ -0,0 +1,136 @@
+# users/tests/test_export.py
+import io
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+from io import StringIO
+
+from django.conf import settings  # type: ignore
+from django.contrib.auth import get_user_model  # type: ignore
+from django.core.files.uploadedfile import SimpleUploadedFile  # type: ignore
+from django.core.management import call_command  # type: ignore
+from django.core.serializers.json import DjangoJSONEncoder  # type: ignore
+from django.test import Client, TestCase, override_settings  # type: ignore
+from django.urls import reverse  # type: ignore
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ExportTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create_user(username='author')
+        cls.other = User.objects.create_user(username='other')
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+        group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание'
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Запись с картинкой',
+            group=group,
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif')
+        )
+        Post.objects.create(
+            author=cls.user,
+            text='Та же картинка',
+            image=SimpleUploadedFile('copy.gif', SMALL_GIF, 'image/gif')
+        )
+        Comment.objects.create(post=cls.post, author=cls.user, text='Ответ')
+        Follow.objects.create(user=cls.user, author=cls.other)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def download(self, client, username):
+        response = client.get(reverse('users:export', args=[username]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        return zipfile.ZipFile(
+            io.BytesIO(b''.join(response.streaming_content))
+        )
+
+    def lines(self, archive, name):
+        return [
+            json.loads(line)
+            for line in archive.read(name).decode().splitlines()
+        ]
+
+    def test_archive_contents(self):
+        """Архив содержит записи, комментарии, подписки и картинки."""
+        client = Client()
+        client.force_login(self.user)
+        archive = self.download(client, 'author')
+        self.assertIsNone(archive.testzip())
+        self.assertEqual(
+            [row['text'] for row in self.lines(archive, 'posts.jsonl')],
+            ['Запись с картинкой', 'Та же картинка']
+        )
+        self.assertEqual(
+            self.lines(archive, 'posts.jsonl')[0]['group'], 'test-slug'
+        )
+        self.assertEqual(
+            self.lines(archive, 'comments.jsonl'),
+            [{
+                'post': self.post.pk,
+                'author': 'author',
+                'text': 'Ответ',
+                'created': DjangoJSONEncoder().default(
+                    Comment.objects.get().created
+                ),
+            }]
+        )
+        self.assertEqual(
+            self.lines(archive, 'follows.jsonl'),
+            [{'user': 'author', 'author': 'other'}]
+        )
+        images = [
+            name for name in archive.namelist() if name.startswith('posts/')
+        ]
+        self.assertEqual(images, [self.post.image.name])
+        self.assertEqual(archive.read(images[0]), SMALL_GIF)
+
+    def test_access(self):
+        """Чужой архив доступен только персоналу."""
+        client = Client()
+        client.force_login(self.other)
+        response = client.get(reverse('users:export', args=['author']))
+        self.assertEqual(response.status_code, 404)
+        client.force_login(self.staff)
+        archive = self.download(client, 'author')
+        self.assertIn('posts.jsonl', archive.namelist())
+
+    def test_command(self):
+        """Команда пишет тот же архив в файл."""
+        output = os.path.join(TEMP_MEDIA_ROOT, 'export.zip')
+        out = StringIO()
+        call_command('export_user', 'author', output=output, stdout=out)
+        self.assertIn(f'Архив {output}', out.getvalue())
+        with zipfile.ZipFile(output) as archive:
+            self.assertEqual(
+                json.loads(archive.read('profile.json'))['username'],
+                'author'
+            )
@@ -74,4 +74,5 @@ urlpatterns = [
         ),
         name='password_reset_complete'
     ),
+    path('export/<str:username>/', views.export, name='export'),
 ]
@@ -1,11 +1,33 @@
+from django.contrib.auth import get_user_model  # type: ignore
+from django.contrib.auth.decorators import login_required  # type: ignore
+from django.http import Http404, StreamingHttpResponse  # type: ignore
+from django.shortcuts import get_object_or_404  # type: ignore
 from django.views.generic import CreateView  # type: ignore
 
 from django.urls import reverse_lazy  # type: ignore
 
+from .export import stream_archive
 from .forms import CreationForm
 
+User = get_user_model()
+
 
 class SignUp(CreateView):
     form_class = CreationForm
     success_url = reverse_lazy('posts:index')
     template_name = 'users/signup.html'
+
+
+@login_required
+def export(request, username):
+    # свои данные выгружает сам пользователь, чужие - только персонал
+    if request.user.username != username and not request.user.is_staff:
+        raise Http404
+    user = get_object_or_404(User, username=username)
+    response = StreamingHttpResponse(
+        stream_archive(user), content_type='application/zip'
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="yatube-{user.username}.zip"'
+    )
+    return response
@@ -52,6 +52,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -67,7 +68,7 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.template_backends.TimedDjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -77,6 +78,7 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'core.context_processors.year.year',
+                'core.context_processors.cache.fragment_cache',
             ],
         },
     },
@@ -88,12 +90,32 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# core.db_backend - SQLite с WAL и PRAGMA на каждое соединение;
+# replica - тот же файл, открытый только на чтение (core.db_router).
+# CONN_MAX_AGE держит по соединению каждого вида на поток воркера.
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'core.db_backend',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
-    }
+        'CONN_MAX_AGE': 600,
+        'OPTIONS': {
+            'timeout': 20,
+        },
+    },
+    'replica': {
+        'ENGINE': 'core.db_backend',
+        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': 600,
+        'OPTIONS': {
+            'timeout': 20,
+            'read_only': True,
+        },
+        'TEST': {
+            'MIRROR': 'default',
+        },
+    },
 }
+DATABASE_ROUTERS = ['core.db_router.ReadReplicaRouter']
 
 
 # Password validation
@@ -141,6 +163,30 @@ STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 
 POSTS_PER_PAGE = 10
 
+# 'offset' - номера страниц (Paginator), 'cursor' - курсор по (pub_date, id)
+POSTS_PAGINATION = 'offset'
+# сколько секунд кэшируется количество записей в ленте
+POSTS_COUNT_CACHE_TIMEOUT = 60
+# сколько номеров страниц показывать по обе стороны от текущей
+POSTS_PAGE_WINDOW = 3
+# сколько записей в лентах RSS и Atom
+FEED_ITEMS = 20
+# записей на странице API по умолчанию и самое большее
+API_PAGE_SIZE = 50
+API_MAX_PAGE_SIZE = 100
+# до скольких строк админка считает результат точно
+ADMIN_COUNT_LIMIT = 1000
+
+# лента подписок: 'join' - запрос через Follow,
+# 'timeline' - материализованные ленты (см. rebuild_timelines),
+# 'merge' - слияние лент авторов (см. benchmark_follow_feed)
+FOLLOW_FEED = 'join'
+# авторы с большим числом подписчиков подмешиваются при чтении
+TIMELINE_FANOUT_LIMIT = 1000
+# сколько последних записей хранится при заполнении ленты
+TIMELINE_LENGTH = 1000
+TIMELINE_BATCH_SIZE = 1000
+
 POSTS_TEXT_LEN = 15
 
 LOGIN_URL = 'users:login'
@@ -157,11 +203,63 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# загрузки пишутся на диск порциями, большие файлы отбрасываются сразу
+FILE_UPLOAD_HANDLERS = [
+    'posts.uploads.LimitedUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+POST_IMAGE_MAX_BYTES = 20 * 2 ** 20
+# предел по заголовку картинки - защита от бомб-декомпрессоров
+POST_IMAGE_MAX_PIXELS = 50 * 10 ** 6
+# оригиналы уменьшаются до этой стороны и теряют метаданные
+POST_IMAGE_MAX_SIDE = 2560
+POST_IMAGE_QUALITY = 90
+
+# общий для воркеров SQLite с LRU в памяти каждого процесса
+CACHE_DIR = os.path.join(BASE_DIR, 'cache')
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+        'BACKEND': 'core.cache_backends.TieredCache',
+        'LOCATION': os.path.join(CACHE_DIR, 'default.sqlite3'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+            'L1_MAX_ENTRIES': 1000,
+        },
+    },
+    'thumbnails': {
+        'BACKEND': 'core.cache_backends.TieredCache',
+        'LOCATION': os.path.join(CACHE_DIR, 'thumbnails.sqlite3'),
+        'TIMEOUT': None,
+        'OPTIONS': {
+            'MAX_ENTRIES': 1000000,
+            'L1_MAX_ENTRIES': 5000,
+        },
+    },
+}
+THUMBNAIL_CACHE = 'thumbnails'
+# тесты пишут кэши во временный каталог, а не в файлы сервера разработки
+TEST_RUNNER = 'core.testing.IsolatedTestRunner'
+
+# пресеты картинок записей (posts.presets): пропорции кадра, ширины
+# для srcset и подсказка sizes; все варианты готовят сразу после загрузки
+POST_IMAGE_PRESETS = {
+    'card': {
+        'size': (960, 339),
+        'widths': (320, 480, 720, 960),
+        'sizes': '(max-width: 960px) 100vw, 960px',
+        'options': {'crop': 'top', 'upscale': True},
+    },
 }
+THUMBNAIL_WORKERS = 2
+
+# фрагменты сбрасываются по тегам (core.cache_tags), поэтому живут долго
+FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 6
+
+# метрики запросов (core.metrics): общий файл всех воркеров, как часто
+# процесс дописывает в него накопленное и границы бакетов времени ответа
+METRICS_DB = os.path.join(CACHE_DIR, 'metrics.sqlite3')
+METRICS_FLUSH_INTERVAL = 10
+METRICS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
 
 INTERNAL_IPS = [
     '127.0.0.1',
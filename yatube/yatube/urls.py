@@ -18,6 +18,7 @@ from django.conf.urls.static import static  # type: ignore
 from django.contrib import admin  # type: ignore
 from django.urls import include, path  # type: ignore
 
+from core import views as core_views
 
 urlpatterns = [
     path('', include('posts.urls', namespace='posts')),
@@ -25,6 +26,8 @@ urlpatterns = [
     path('auth/', include('users.urls', namespace='users')),
     path('auth/', include('django.contrib.auth.urls')),
     path('about/', include('about.urls', namespace='about')),
+    path('api/v1/', include('posts.api_urls', namespace='api')),
+    path('metrics/', core_views.metrics, name='metrics'),
 ]
 
 handler404 = 'core.views.page_not_found'